@@ -1,8 +1,12 @@
+import os
 import tkinter as tk
 from tkinter import filedialog, messagebox
 import xml.etree.ElementTree as et
 from xml.dom import minidom
 
+# Objetos lidos entre uma atualização e outra do progresso do carregamento
+PASSO_PROGRESSO = 10000
+
 
 class Visualizador:
     def __init__(self, root):
@@ -11,10 +15,10 @@ class Visualizador:
 
         menu = tk.Menu(root)
         root.config(menu=menu)
-        file_menu = tk.Menu(menu, tearoff=0)
-        menu.add_cascade(label="Arquivo", menu=file_menu)
-        file_menu.add_command(label="Abrir", command=self.abrir_arquivo)
-        file_menu.add_command(label="Salvar", command=self.salvar_arquivo)
+        self.file_menu = tk.Menu(menu, tearoff=0)
+        menu.add_cascade(label="Arquivo", menu=self.file_menu)
+        self.file_menu.add_command(label="Abrir", command=self.abrir_arquivo)
+        self.file_menu.add_command(label="Salvar", command=self.salvar_arquivo)
 
         frame_principal = tk.Frame(root, bg="darkgray")
         frame_principal.pack(fill="both", expand=True)
@@ -27,6 +31,7 @@ class Visualizador:
         self.viewport = (0, 0, 800, 600)
         self.objetos = []
         self.mover_window = 1
+        self._carregando = False  # Leitura em andamento (a lista de objetos está pela metade)
 
         self.root.bind("<Left>", lambda e: self.mover_window_direcao(-self.mover_window, 0))
         self.root.bind("<Right>", lambda e: self.mover_window_direcao(self.mover_window, 0))
@@ -34,67 +39,92 @@ class Visualizador:
         self.root.bind("<Down>", lambda e: self.mover_window_direcao(0, -self.mover_window))
 
     def abrir_arquivo(self):
+        if self._carregando:
+            return
         caminho = filedialog.askopenfilename(filetypes=[("Arquivos XML", "*.xml")])
         if caminho:
-            if not self.carregar_arquivo(caminho):
+            # O progresso processa os eventos do Tk no meio da leitura: até ela
+            # terminar, o menu fica desativado e as teclas são ignoradas
+            self._carregando = True
+            self._ativar_menu(False)
+            try:
+                carregou = self.carregar_arquivo(caminho, progresso=self._mostrar_progresso)
+            finally:
+                self._carregando = False
+                self._ativar_menu(True)
+            if not carregou:
                 messagebox.showerror("Erro", "Falha ao carregar o arquivo.")
             else:
                 self.desenhar_viewport()
                 self.desenhar_minimapa()
+            self.root.title("Visualizador de Objetos 2D")
+
+    def _ativar_menu(self, ativo):
+        for entrada in range(self.file_menu.index("end") + 1):
+            self.file_menu.entryconfig(entrada, state="normal" if ativo else "disabled")
+
+    def _mostrar_progresso(self, fracao):
+        self.root.title(f"Visualizador de Objetos 2D - carregando {fracao:.0%}")
+        self.root.update()
 
     def salvar_arquivo(self):
         caminho = filedialog.asksaveasfilename(defaultextension=".xml", filetypes=[("Arquivos XML", "*.xml")])
         if caminho:
             self.gerar_arquivo_saida(caminho)
 
-    def carregar_arquivo(self, caminho):
+    def carregar_arquivo(self, caminho, progresso=None):
         try:
             self.objetos.clear()
-            tree = et.parse(caminho)
-            root = tree.getroot()
-
-            self.viewport = self._carregar_viewport(root)
-            self.window = self._carregar_window(root)
-
-            self.objetos.extend(self._carregar_objetos(root))
-
+            self.viewport = (0, 0, 800, 600)
+            self.window = (0, 0, 10, 7.5)
+            self._carregar_streaming(caminho, progresso)
             return True
         except Exception as e:
             print(f"Erro ao carregar o arquivo: {e}")
             return False
 
-    def _carregar_viewport(self, root):
-        vpmin = root.find("./viewport/vpmin")
-        vpmax = root.find("./viewport/vpmax")
-        if vpmin is not None and vpmax is not None:
-            return (float(vpmin.get("x")), float(vpmin.get("y")),
-                    float(vpmax.get("x")), float(vpmax.get("y")))
-        return (0, 0, 800, 600)
-
-    def _carregar_window(self, root):
-        wmin = root.find("./window/wmin")
-        wmax = root.find("./window/wmax")
-        if wmin is not None and wmax is not None:
-            return (float(wmin.get("x")), float(wmin.get("y")),
-                    float(wmax.get("x")), float(wmax.get("y")))
-        return (0, 0, 10, 7.5)
-
-    def _carregar_objetos(self, root):
-        objetos = []
-        for ponto in root.findall("ponto"):
-            x = float(ponto.get("x"))
-            y = float(ponto.get("y"))
-            objetos.append(("ponto", [(x, y)]))
-
-        for reta in root.findall("reta"):
-            pontos_reta = [(float(p.get("x")), float(p.get("y"))) for p in reta.findall("ponto")]
-            objetos.append(("reta", pontos_reta))
-
-        for poligono in root.findall("poligono"):
-            pontos_poligono = [(float(p.get("x")), float(p.get("y"))) for p in poligono.findall("ponto")]
-            objetos.append(("poligono", pontos_poligono))
-
-        return objetos
+    # Lê o arquivo numa passada só com iterparse, na ordem do documento,
+    # descartando cada elemento de primeiro nível depois de consumido
+    def _carregar_streaming(self, caminho, progresso=None):
+        cantos = {}
+        pilha = []
+        pontos = []
+        tamanho = os.path.getsize(caminho) or 1
+        proximo_relatorio = PASSO_PROGRESSO
+
+        with open(caminho, "rb") as arquivo:
+            raiz = None
+            for evento, elem in et.iterparse(arquivo, events=("start", "end")):
+                if evento == "start":
+                    if raiz is None:
+                        raiz = elem
+                    pilha.append(elem.tag)
+                    if elem.tag in ("reta", "poligono"):
+                        pontos = []
+                    continue
+
+                pilha.pop()
+                if elem.tag == "ponto":
+                    p = (float(elem.get("x")), float(elem.get("y")))
+                    if pilha and pilha[-1] in ("reta", "poligono"):
+                        pontos.append(p)
+                    else:
+                        self.objetos.append(("ponto", [p]))
+                elif elem.tag in ("reta", "poligono"):
+                    self.objetos.append((elem.tag, pontos))
+                elif elem.tag in ("vpmin", "vpmax", "wmin", "wmax"):
+                    cantos[elem.tag] = (float(elem.get("x")), float(elem.get("y")))
+
+                if len(pilha) == 1:
+                    raiz.clear()
+                    if progresso is not None and len(self.objetos) >= proximo_relatorio:
+                        proximo_relatorio = (len(self.objetos) // PASSO_PROGRESSO + 1) * PASSO_PROGRESSO
+                        progresso(min(arquivo.tell() / tamanho, 1.0))
+
+        if "vpmin" in cantos and "vpmax" in cantos:
+            self.viewport = cantos["vpmin"] + cantos["vpmax"]
+        if "wmin" in cantos and "wmax" in cantos:
+            self.window = cantos["wmin"] + cantos["wmax"]
 
     def window2viewport(self, ponto):
         x, y = ponto
@@ -161,6 +191,8 @@ class Visualizador:
                 self.minimap.create_polygon(pontos_mini, outline="red", fill="", width=1)
 
     def mover_window_direcao(self, dx, dy):
+        if self._carregando:
+            return
         wx_min, wy_min, wx_max, wy_max = self.window
 
         nova_wx_min = wx_min + dx
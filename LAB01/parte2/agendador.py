@@ -0,0 +1,60 @@
+import time
+
+FPS_PADRAO = 60
+
+
+# Agenda o redesenho da tela com o after do Tk. Os eventos (teclas, botões) só
+# marcam a tela como suja; o redesenho acontece uma vez por intervalo de quadro,
+# não importa quantos eventos cheguem nesse meio tempo. Como pan, zoom e rotação
+# já são compostos na matriz de visão na hora do evento, o quadro seguinte
+# desenha o efeito acumulado de todos eles.
+class AgendadorRedesenho:
+    def __init__(self, root, desenhar, fps=FPS_PADRAO):
+        self.root = root
+        self.desenhar = desenhar
+        self.fps = fps
+        self._pendente = None  # id do after agendado (None: nada agendado)
+        self._ultimo_quadro = None  # time.perf_counter() do último redesenho
+        self.quadros = 0
+        self.eventos = 0  # Pedidos de redesenho recebidos (inclusive os agrupados)
+
+    @property
+    def fps(self):
+        return self._fps
+
+    @fps.setter
+    def fps(self, fps):
+        if fps <= 0:
+            raise ValueError("o FPS alvo deve ser positivo")
+        self._fps = fps
+        self.intervalo = 1.0 / fps
+
+    @property
+    def pendente(self):
+        return self._pendente is not None
+
+    # Marca a tela como suja; agenda o redesenho para o próximo quadro, se ainda não houver um
+    def marcar(self):
+        self.eventos += 1
+        if self._pendente is not None:
+            return
+        espera = 0.0
+        if self._ultimo_quadro is not None:
+            espera = max(0.0, self._ultimo_quadro + self.intervalo - time.perf_counter())
+        self._pendente = self.root.after(int(espera * 1000), self._executar)
+
+    # Redesenha agora, descartando o redesenho agendado (se houver)
+    def agora(self):
+        self.cancelar()
+        self._executar()
+
+    def cancelar(self):
+        if self._pendente is not None:
+            self.root.after_cancel(self._pendente)
+            self._pendente = None
+
+    def _executar(self):
+        self._pendente = None
+        self._ultimo_quadro = time.perf_counter()
+        self.quadros += 1
+        self.desenhar()
@@ -0,0 +1,284 @@
+import asyncio
+import errno
+import os
+import socket
+import stat
+import struct
+import threading
+
+import numpy as np
+
+from cena import TIPO_PONTO, TIPO_RETA, TIPO_POLIGONO
+
+# Protocolo da cena ao vivo: uma sequência de quadros [uint32 tamanho][mensagem],
+# little-endian. A mensagem começa pelo código da operação:
+#   COR       : op, uint16 código, nome UTF-8 (define um código de cor da conexão)
+#   ADICIONAR : op, uint8 tipo, uint16 cor, uint32 id, float64 [n, 2] vértices
+#               (cria o objeto id ou troca a sua geometria e cor)
+#   MOVER     : op, uint32 id, float64 dx, float64 dy
+#   RECOLORIR : op, uint16 cor, uint32 id
+#   REMOVER   : op, uint32 id
+# Os ids são escolhidos por quem envia; a cor de um código não definido é preta.
+OP_COR = 1
+OP_ADICIONAR = 2
+OP_MOVER = 3
+OP_RECOLORIR = 4
+OP_REMOVER = 5
+TAMANHO = struct.Struct("<I")
+CAB_COR = struct.Struct("<BH")
+CAB_ADICIONAR = struct.Struct("<BBHI")
+MSG_MOVER = struct.Struct("<BIdd")
+MSG_RECOLORIR = struct.Struct("<BHI")
+MSG_REMOVER = struct.Struct("<BI")
+MAX_MENSAGEM = 64 * 1024 * 1024
+PORTA_PADRAO = 7391
+COR_PADRAO = "black"
+# Bytes lidos do socket por vez
+LEITURA = 1 << 16
+# Mensagens à espera da interface a partir das quais as conexões param de ser
+# lidas (quem envia fica bloqueado pelo próprio socket até a fila esvaziar)
+MAX_PENDENTES = 200_000
+# Intervalo (s) entre verificações da fila cheia
+ESPERA_FILA = 0.005
+
+
+def _quadro(mensagem):
+    return TAMANHO.pack(len(mensagem)) + mensagem
+
+
+# Mensagens já em quadros, para quem envia (simulações, testes)
+def quadro_cor(codigo, nome):
+    return _quadro(CAB_COR.pack(OP_COR, codigo) + nome.encode("utf-8"))
+
+
+def quadro_adicionar(id_objeto, tipo, vertices, cor=0):
+    vertices = np.ascontiguousarray(vertices, dtype="<f8").reshape(-1, 2)
+    return _quadro(CAB_ADICIONAR.pack(OP_ADICIONAR, tipo, cor, id_objeto) + vertices.tobytes())
+
+
+def quadro_mover(id_objeto, dx, dy):
+    return _quadro(MSG_MOVER.pack(OP_MOVER, id_objeto, dx, dy))
+
+
+def quadro_recolorir(id_objeto, cor):
+    return _quadro(MSG_RECOLORIR.pack(OP_RECOLORIR, cor, id_objeto))
+
+
+def quadro_remover(id_objeto):
+    return _quadro(MSG_REMOVER.pack(OP_REMOVER, id_objeto))
+
+
+# Separa os quadros de uma conexão à medida que os bytes chegam (um quadro pode
+# vir partido entre leituras) e os converte em mensagens:
+#   (OP_ADICIONAR, id, tipo, vértices, cor), (OP_MOVER, id, dx, dy),
+#   (OP_RECOLORIR, id, cor) e (OP_REMOVER, id), com as cores já como nomes
+class DecodificadorQuadros:
+    def __init__(self):
+        self._dados = bytearray()
+        self._cores = {}  # código -> nome, definidos pela conexão
+        self.erro = None
+
+    # Devolve as mensagens completas recebidas até aqui. Um quadro inválido
+    # encerra a decodificação: as mensagens anteriores a ele ainda são
+    # devolvidas, e o erro fica em self.erro
+    def alimentar(self, dados):
+        if self.erro is not None:
+            raise self.erro
+        self._dados += dados
+        buffer = self._dados
+        mensagens = []
+        posicao = 0
+        try:
+            while len(buffer) - posicao >= TAMANHO.size:
+                (tamanho,) = TAMANHO.unpack_from(buffer, posicao)
+                if tamanho == 0 or tamanho > MAX_MENSAGEM:
+                    raise ValueError(f"tamanho de mensagem inválido: {tamanho}")
+                if len(buffer) - posicao - TAMANHO.size < tamanho:
+                    break
+                inicio = posicao + TAMANHO.size
+                mensagem = self._decodificar(buffer, inicio, tamanho)
+                if mensagem is not None:
+                    mensagens.append(mensagem)
+                posicao = inicio + tamanho
+        except ValueError as e:
+            self.erro = e
+            buffer.clear()
+            return mensagens
+        del buffer[:posicao]
+        return mensagens
+
+    def _decodificar(self, buffer, inicio, tamanho):
+        op = buffer[inicio]
+        if op == OP_ADICIONAR and tamanho >= CAB_ADICIONAR.size:
+            _, tipo, cor, id_objeto = CAB_ADICIONAR.unpack_from(buffer, inicio)
+            corpo = tamanho - CAB_ADICIONAR.size
+            if tipo not in (TIPO_PONTO, TIPO_RETA, TIPO_POLIGONO) or corpo % 16:
+                raise ValueError("mensagem ADICIONAR inválida")
+            vertices = np.frombuffer(buffer, dtype="<f8", count=corpo // 8,
+                                     offset=inicio + CAB_ADICIONAR.size).reshape(-1, 2).astype(np.float64)
+            return OP_ADICIONAR, id_objeto, tipo, vertices, self._cores.get(cor, COR_PADRAO)
+        if op == OP_MOVER and tamanho == MSG_MOVER.size:
+            _, id_objeto, dx, dy = MSG_MOVER.unpack_from(buffer, inicio)
+            return OP_MOVER, id_objeto, dx, dy
+        if op == OP_RECOLORIR and tamanho == MSG_RECOLORIR.size:
+            _, cor, id_objeto = MSG_RECOLORIR.unpack_from(buffer, inicio)
+            return OP_RECOLORIR, id_objeto, self._cores.get(cor, COR_PADRAO)
+        if op == OP_REMOVER and tamanho == MSG_REMOVER.size:
+            _, id_objeto = MSG_REMOVER.unpack_from(buffer, inicio)
+            return OP_REMOVER, id_objeto
+        if op == OP_COR and tamanho >= CAB_COR.size:
+            _, codigo = CAB_COR.unpack_from(buffer, inicio)
+            self._cores[codigo] = bytes(buffer[inicio + CAB_COR.size:inicio + tamanho]).decode("utf-8")
+            return None
+        raise ValueError(f"mensagem inválida (operação {op}, {tamanho} bytes)")
+
+
+# Junta as mensagens de um quadro num estado final por id (na ordem em que os
+# ids apareceram): [geometria (tipo, vértices) ou None, cor ou None, dx, dy,
+# remover]. Várias mensagens para o mesmo objeto viram uma única edição.
+def consolidar(mensagens):
+    estados = {}
+    for mensagem in mensagens:
+        op, id_objeto = mensagem[0], mensagem[1]
+        estado = estados.get(id_objeto)
+        if estado is None:
+            estado = estados[id_objeto] = [None, None, 0.0, 0.0, False]
+        if op == OP_ADICIONAR:
+            estado[:] = [(mensagem[2], mensagem[3]), mensagem[4], 0.0, 0.0, False]
+        elif op == OP_MOVER:
+            if estado[4]:
+                continue
+            if estado[0] is not None:
+                estado[0] = (estado[0][0], estado[0][1] + (mensagem[2], mensagem[3]))
+            else:
+                estado[2] += mensagem[2]
+                estado[3] += mensagem[3]
+        elif op == OP_RECOLORIR:
+            if not estado[4]:
+                estado[1] = mensagem[2]
+        elif op == OP_REMOVER:
+            estado[:] = [None, None, 0.0, 0.0, True]
+    return estados
+
+
+# Servidor da cena ao vivo num socket local (TCP, com endereco = (host, porta),
+# ou Unix, com endereco = caminho). O loop do asyncio roda numa thread própria,
+# recebendo e decodificando as mensagens sem ocupar a interface; a thread do Tk
+# retira o que chegou uma vez por quadro. O caminho de um socket Unix é apagado
+# ao encerrar (e, se sobrou de um servidor que não está mais rodando, ao abrir).
+class ServidorAlimentacao:
+    def __init__(self, endereco=("127.0.0.1", PORTA_PADRAO)):
+        self._mensagens = []
+        self._trava = threading.Lock()
+        self._loop = asyncio.new_event_loop()
+        self._servidor = None
+        self._conexoes = {}  # Conexões abertas: escritor -> tarefa
+        self._socket_unix = None  # (caminho, (dispositivo, inode)) do socket Unix criado
+        self._erro = None
+        self._pronto = threading.Event()
+        self.recebidas = 0  # Mensagens recebidas desde o início
+        self._thread = threading.Thread(target=self._executar, args=(endereco,), name="alimentacao", daemon=True)
+        self._thread.start()
+        self._pronto.wait()
+        if self._erro is not None:
+            raise self._erro
+
+    # Endereço em que o servidor escuta (com a porta de fato, se foi pedida a 0)
+    @property
+    def endereco(self):
+        return self._servidor.sockets[0].getsockname()
+
+    def _executar(self, endereco):
+        asyncio.set_event_loop(self._loop)
+        try:
+            if isinstance(endereco, str):
+                _remover_socket_abandonado(endereco)
+                abrir = asyncio.start_unix_server(self._atender, path=endereco)
+            else:
+                abrir = asyncio.start_server(self._atender, *endereco)
+            self._servidor = self._loop.run_until_complete(abrir)
+            if isinstance(endereco, str):
+                estado = os.stat(endereco)
+                self._socket_unix = (endereco, (estado.st_dev, estado.st_ino))
+        except Exception as e:
+            self._erro = e
+            self._pronto.set()
+            self._loop.close()
+            return
+        self._pronto.set()
+        try:
+            self._loop.run_forever()
+        finally:
+            # Conexões ainda abertas são fechadas (a leitura delas termina) antes do loop
+            self._servidor.close()
+            for escritor in self._conexoes:
+                escritor.close()
+            self._loop.run_until_complete(asyncio.gather(*self._conexoes.values(), return_exceptions=True))
+            self._loop.close()
+            self._remover_socket_unix()
+
+    # Apaga o socket Unix criado, se o caminho ainda for ele (outro servidor pode tê-lo trocado)
+    def _remover_socket_unix(self):
+        if self._socket_unix is None:
+            return
+        caminho, identidade = self._socket_unix
+        self._socket_unix = None
+        try:
+            estado = os.stat(caminho)
+            if (estado.st_dev, estado.st_ino) == identidade:
+                os.unlink(caminho)
+        except FileNotFoundError:
+            pass
+
+    async def _atender(self, leitor, escritor):
+        decodificador = DecodificadorQuadros()
+        self._conexoes[escritor] = asyncio.current_task()
+        try:
+            while True:
+                dados = await leitor.read(LEITURA)
+                if not dados:
+                    break
+                mensagens = decodificador.alimentar(dados)
+                if mensagens:
+                    with self._trava:
+                        self._mensagens += mensagens
+                        self.recebidas += len(mensagens)
+                if decodificador.erro is not None:
+                    raise decodificador.erro
+                # Fila cheia: a conexão espera a interface retirar as mensagens
+                while len(self._mensagens) >= MAX_PENDENTES:
+                    await asyncio.sleep(ESPERA_FILA)
+        except (ValueError, ConnectionError) as e:
+            print(f"Conexão da cena ao vivo encerrada: {e}")
+        finally:
+            self._conexoes.pop(escritor, None)
+            escritor.close()
+
+    # Mensagens recebidas desde a última chamada (na ordem de chegada)
+    def retirar(self):
+        with self._trava:
+            mensagens, self._mensagens = self._mensagens, []
+        return mensagens
+
+    def encerrar(self):
+        if self._loop.is_running():
+            self._loop.call_soon_threadsafe(self._loop.stop)
+        self._thread.join(timeout=1.0)
+
+
+# O asyncio apaga qualquer socket que já esteja no caminho; aqui só é apagado o
+# que sobrou de um servidor encerrado (ninguém atende nele). Um servidor ainda
+# rodando no caminho é um erro, e um arquivo que não é socket fica para o bind falhar.
+def _remover_socket_abandonado(caminho):
+    try:
+        if not stat.S_ISSOCK(os.stat(caminho).st_mode):
+            return
+    except FileNotFoundError:
+        return
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as cliente:
+        try:
+            cliente.connect(caminho)
+        except ConnectionRefusedError:
+            os.unlink(caminho)
+            return
+    raise OSError(errno.EADDRINUSE, "já há um servidor da cena ao vivo neste socket", caminho)
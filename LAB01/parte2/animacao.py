@@ -0,0 +1,74 @@
+import time
+
+from transformacoes import interpolar_visao
+
+# Duração padrão (s) de uma transição de visão
+DURACAO_PADRAO = 0.25
+
+
+# Curva de aceleração/desaceleração suave (smoothstep)
+def suavizar(t):
+    return t * t * (3 - 2 * t)
+
+
+# Anima a visão de onde ela está até uma matriz alvo ao longo de um tempo fixo.
+# A cada passo (no ritmo do agendador) chama aplicar(matriz) com a visão
+# interpolada; no fim, chama terminar(matriz) com o alvo, que é quando o quadro
+# definitivo deve ser desenhado. Pedir um novo alvo no meio da animação
+# recomeça a transição a partir da visão exibida naquele momento; interrompê-la
+# (parar) chama interromper(), para que quem desenha troque os quadros
+# provisórios por um definitivo.
+class AnimadorVisao:
+    def __init__(self, root, aplicar, terminar, intervalo=1 / 60, duracao=DURACAO_PADRAO, interromper=None):
+        self.root = root
+        self.aplicar = aplicar
+        self.terminar = terminar
+        self.interromper = interromper
+        self.intervalo = intervalo
+        self.duracao = duracao
+        self.alvo = None  # Matriz final da animação em andamento (None: parado)
+        self._inicio = None
+        self._matriz_inicio = None
+        self._passo = None  # id do after do próximo passo
+
+    @property
+    def animando(self):
+        return self.alvo is not None
+
+    def animar(self, matriz_atual, alvo):
+        self.alvo = alvo
+        self._matriz_inicio = matriz_atual
+        self._inicio = time.perf_counter()
+        if self.duracao <= 0:
+            self._concluir()
+        elif self._passo is None:
+            self._passo = self.root.after(0, self._avancar)
+
+    # Interrompe a animação onde ela estiver (a visão exibida fica como está)
+    def parar(self):
+        animando = self.animando
+        self._parar()
+        if animando and self.interromper is not None:
+            self.interromper()
+
+    def _parar(self):
+        if self._passo is not None:
+            self.root.after_cancel(self._passo)
+            self._passo = None
+        self.alvo = None
+
+    def _avancar(self):
+        self._passo = None
+        if self.alvo is None:
+            return
+        t = (time.perf_counter() - self._inicio) / self.duracao
+        if t >= 1:
+            self._concluir()
+            return
+        self.aplicar(interpolar_visao(self._matriz_inicio, self.alvo, suavizar(t)))
+        self._passo = self.root.after(max(1, int(self.intervalo * 1000)), self._avancar)
+
+    def _concluir(self):
+        alvo = self.alvo
+        self._parar()
+        self.terminar(alvo)
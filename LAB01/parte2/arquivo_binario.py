@@ -0,0 +1,144 @@
+import os
+import struct
+import sys
+import tempfile
+
+import numpy as np
+
+from arquivo_xml import carregar_xml
+from cena import Cena
+
+# Formato binário da cena (.cena), little-endian, com o mesmo conteúdo do XML:
+#   cabeçalho: assinatura, versão, contagens, viewport e window
+#   bloco de vértices  : float64 [n_vertices, 2]
+#   bloco de offsets   : int64   [n_objetos + 1]
+#   bloco de tipos     : uint8   [n_objetos]
+#   bloco de cores     : uint16  [n_objetos] (índices da tabela de cores)
+#   tabela de cores    : n_cores x (uint16 tamanho + nome em UTF-8)
+# Todo bloco começa num deslocamento múltiplo de 8, para que possa ser mapeado
+# direto da memória (mmap) como array, sem cópia.
+ASSINATURA = b"CGCENA\x00\x01"
+VERSAO = 1
+CABECALHO = struct.Struct("<8sIIQQI4x4d4d")
+EXTENSAO = ".cena"
+
+
+def _alinhar(deslocamento):
+    return (deslocamento + 7) & ~7
+
+
+# Deslocamento de cada bloco no arquivo a partir das contagens do cabeçalho
+def _blocos(n_objetos, n_vertices):
+    blocos = {}
+    posicao = _alinhar(CABECALHO.size)
+    for nome, dtype, forma in (("coords", np.float64, (n_vertices, 2)),
+                               ("offsets", np.int64, (n_objetos + 1,)),
+                               ("tipos", np.uint8, (n_objetos,)),
+                               ("cores", np.uint16, (n_objetos,))):
+        blocos[nome] = (posicao, dtype, forma)
+        posicao = _alinhar(posicao + int(np.prod(forma)) * np.dtype(dtype).itemsize)
+    blocos["tabela_cores"] = (posicao, None, None)
+    return blocos
+
+
+# Grava num arquivo temporário na mesma pasta e só no fim o troca pelo destino:
+# o destino pode ser o próprio arquivo de onde a cena foi carregada, ainda
+# mapeado na memória (os arrays da cena apontam para ele), e truncá-lo durante
+# a escrita destruiria os dados sendo gravados.
+def salvar_binario(caminho, cena, viewport, window):
+    descritor, temporario = tempfile.mkstemp(suffix=EXTENSAO, dir=os.path.dirname(os.path.abspath(caminho)))
+    try:
+        with os.fdopen(descritor, "wb") as arquivo:
+            _escrever_binario(arquivo, cena, viewport, window)
+        os.chmod(temporario, _modo_arquivo(caminho))
+        os.replace(temporario, caminho)
+    except BaseException:
+        os.unlink(temporario)
+        raise
+
+
+# Permissões do arquivo gravado: as do arquivo substituído ou, se for novo, as
+# de um open() comum (o mkstemp cria o temporário só para o dono)
+def _modo_arquivo(caminho):
+    try:
+        return os.stat(caminho).st_mode & 0o777
+    except FileNotFoundError:
+        mascara = os.umask(0)
+        os.umask(mascara)
+        return 0o666 & ~mascara
+
+
+def _escrever_binario(arquivo, cena, viewport, window):
+    n_objetos, n_vertices = len(cena), cena.n_vertices
+    blocos = _blocos(n_objetos, n_vertices)
+    arrays = {"coords": cena.coords, "offsets": cena.offsets, "tipos": cena.tipos, "cores": cena.cores}
+
+    arquivo.write(CABECALHO.pack(ASSINATURA, VERSAO, 0, n_objetos, n_vertices, len(cena.paleta),
+                                 *map(float, viewport), *map(float, window)))
+    for nome, (posicao, dtype, _) in blocos.items():
+        arquivo.write(b"\x00" * (posicao - arquivo.tell()))
+        if dtype is not None:
+            arquivo.write(np.ascontiguousarray(arrays[nome], dtype=np.dtype(dtype).newbyteorder("<")).tobytes())
+    for cor in cena.paleta:
+        nome = cor.encode("utf-8")
+        arquivo.write(struct.pack("<H", len(nome)) + nome)
+
+
+# Mapeia o arquivo na memória (cópia-na-escrita, o arquivo nunca é alterado) e
+# entrega à cena os blocos como arrays, sem copiar os dados. Devolve (viewport, window).
+def carregar_binario(caminho, cena):
+    mapa = np.memmap(caminho, dtype=np.uint8, mode="c")
+    if len(mapa) < CABECALHO.size:
+        raise ValueError("arquivo de cena binária truncado")
+    assinatura, versao, _, n_objetos, n_vertices, n_cores, *limites = CABECALHO.unpack_from(mapa)
+    if assinatura != ASSINATURA:
+        raise ValueError("não é um arquivo de cena binária")
+    if versao != VERSAO:
+        raise ValueError(f"versão de cena binária não suportada: {versao}")
+
+    arrays = {}
+    blocos = _blocos(n_objetos, n_vertices)
+    for nome, (posicao, dtype, forma) in blocos.items():
+        if dtype is None:
+            continue
+        tamanho = int(np.prod(forma)) * np.dtype(dtype).itemsize
+        if posicao + tamanho > len(mapa):
+            raise ValueError("arquivo de cena binária truncado")
+        arrays[nome] = mapa[posicao:posicao + tamanho].view(np.dtype(dtype).newbyteorder("<")).reshape(forma)
+
+    paleta = []
+    posicao = blocos["tabela_cores"][0]
+    for _ in range(n_cores):
+        (tamanho,) = struct.unpack_from("<H", mapa, posicao)
+        paleta.append(bytes(mapa[posicao + 2:posicao + 2 + tamanho]).decode("utf-8"))
+        posicao += 2 + tamanho
+
+    cena.adotar(arrays["coords"], arrays["offsets"], arrays["tipos"], arrays["cores"], paleta)
+    return tuple(limites[:4]), tuple(limites[4:])
+
+
+# Carrega na cena um arquivo XML ou binário, conforme a extensão. Devolve (viewport, window).
+def carregar_cena(caminho, cena, progresso=None):
+    if caminho.lower().endswith(EXTENSAO):
+        # Cena binária: os arrays vêm direto do arquivo mapeado na memória
+        return carregar_binario(caminho, cena)
+    # Leitura incremental: uma passada só, preenchendo a cena na ordem do documento
+    return carregar_xml(caminho, cena, progresso)
+
+
+def converter_xml_para_binario(origem, destino):
+    cena = Cena()
+    viewport, window = carregar_xml(origem, cena)
+    salvar_binario(destino, cena, viewport, window)
+    return len(cena)
+
+
+if __name__ == "__main__":
+    # Uso: python arquivo_binario.py entrada.xml [saida.cena]
+    if len(sys.argv) not in (2, 3):
+        print("Uso: python arquivo_binario.py entrada.xml [saida.cena]")
+        sys.exit(1)
+    origem = sys.argv[1]
+    destino = sys.argv[2] if len(sys.argv) == 3 else origem.rsplit(".", 1)[0] + EXTENSAO
+    n = converter_xml_para_binario(origem, destino)
+    print(f"{n} objetos convertidos para {destino}")
@@ -0,0 +1,147 @@
+import os
+import xml.etree.ElementTree as et
+from xml.sax.saxutils import escape
+
+from cena import TIPO_PONTO, TIPO_RETA, TIPO_POLIGONO
+
+VIEWPORT_PADRAO = (0, 0, 800, 600)
+WINDOW_PADRAO = (0, 0, 10, 7.5)
+COR_PADRAO = {TIPO_PONTO: "black", TIPO_RETA: "blue", TIPO_POLIGONO: "green"}
+
+# Objetos serializados por bloco de escrita no arquivo
+OBJETOS_POR_BLOCO = 10000
+ENTIDADES_ATRIBUTO = {'"': "&quot;"}
+TAGS = {TIPO_PONTO: "ponto", TIPO_RETA: "reta", TIPO_POLIGONO: "poligono"}
+
+# De quantos em quantos objetos a cena recebe o lote lido e o progresso é informado
+INTERVALO_PROGRESSO = 10000
+
+
+# Lê o XML de forma incremental (iterparse), preenchendo a cena numa única
+# passada e na ordem do documento. Cada elemento é descartado assim que é
+# consumido, então a memória não cresce com o tamanho do arquivo.
+# progresso(fração) é chamado periodicamente com a fração do arquivo já lida.
+# Devolve (viewport, window).
+def carregar_xml(caminho, cena, progresso=None):
+    cantos = {}
+    vertices = []  # Vértices da reta/polígono sendo lido
+    # Lote de objetos lidos que ainda não foram passados para a cena
+    tipos, coords, tamanhos, cores = [], [], [], []
+    pilha = []  # Tags abertas, do elemento raiz até o atual
+    n_objetos = 0
+
+    tamanho_arquivo = os.path.getsize(caminho) or 1
+    with open(caminho, "rb") as arquivo:
+        raiz = None
+        for evento, elem in et.iterparse(arquivo, events=("start", "end")):
+            if evento == "start":
+                if raiz is None:
+                    raiz = elem
+                pilha.append(elem.tag)
+                if elem.tag in ("reta", "poligono"):
+                    vertices = []
+                continue
+
+            pilha.pop()
+            dentro_de_objeto = bool(pilha) and pilha[-1] in ("reta", "poligono")
+            tag = elem.tag
+            novo_objeto = True
+
+            if tag == "ponto":
+                x = float(elem.get("x"))
+                y = float(elem.get("y"))
+                if dentro_de_objeto:
+                    vertices.append((x, y))
+                    novo_objeto = False
+                else:
+                    tipos.append(TIPO_PONTO)
+                    coords.append((x, y))
+                    tamanhos.append(1)
+                    cores.append(elem.get("cor", COR_PADRAO[TIPO_PONTO]))
+            elif tag in ("reta", "poligono"):
+                tipo = TIPO_RETA if tag == "reta" else TIPO_POLIGONO
+                novo_objeto = tipo == TIPO_POLIGONO or len(vertices) == 2
+                if novo_objeto:
+                    tipos.append(tipo)
+                    coords.extend(vertices)
+                    tamanhos.append(len(vertices))
+                    cores.append(elem.get("cor", COR_PADRAO[tipo]))
+            else:
+                if tag in ("vpmin", "vpmax", "wmin", "wmax"):
+                    cantos[tag] = (float(elem.get("x")), float(elem.get("y")))
+                novo_objeto = False
+
+            # Elementos de primeiro nível já consumidos (com seus filhos) saem da árvore
+            if len(pilha) == 1:
+                raiz.clear()
+
+            if novo_objeto:
+                n_objetos += 1
+                if n_objetos % INTERVALO_PROGRESSO == 0:
+                    cena.adicionar_lote(tipos, coords, tamanhos, cores)
+                    tipos, coords, tamanhos, cores = [], [], [], []
+                    if progresso is not None:
+                        progresso(min(arquivo.tell() / tamanho_arquivo, 1.0))
+
+    cena.adicionar_lote(tipos, coords, tamanhos, cores)
+    if progresso is not None:
+        progresso(1.0)
+
+    viewport = VIEWPORT_PADRAO
+    if "vpmin" in cantos and "vpmax" in cantos:
+        viewport = cantos["vpmin"] + cantos["vpmax"]
+    window = WINDOW_PADRAO
+    if "wmin" in cantos and "wmax" in cantos:
+        window = cantos["wmin"] + cantos["wmax"]
+    return viewport, window
+
+
+# Escreve a cena no mesmo formato lido por carregar_xml, direto num arquivo com
+# buffer e sem montar a árvore na memória. O modo normal gera a mesma saída
+# indentada que o toprettyxml do minidom; o modo compacto não tem espaços.
+def salvar_xml(caminho, cena, viewport, window, compacto=False):
+    recuo = "" if compacto else "  "
+    fim = "" if compacto else "\n"
+
+    def ponto(x, y):
+        return f'{recuo * 2}<ponto x="{x!r}" y="{y!r}"/>{fim}'
+
+    with open(caminho, "w", encoding="utf-8", buffering=1 << 20) as arquivo:
+        arquivo.write(f'<?xml version="1.0" ?>\n<dados>{fim}')
+        vx_min, vy_min, vx_max, vy_max = (str(v) for v in viewport)
+        wx_min, wy_min, wx_max, wy_max = (str(v) for v in window)
+        arquivo.write(
+            f'{recuo}<viewport>{fim}'
+            f'{recuo * 2}<vpmin x="{vx_min}" y="{vy_min}"/>{fim}'
+            f'{recuo * 2}<vpmax x="{vx_max}" y="{vy_max}"/>{fim}'
+            f'{recuo}</viewport>{fim}'
+            f'{recuo}<window>{fim}'
+            f'{recuo * 2}<wmin x="{wx_min}" y="{wy_min}"/>{fim}'
+            f'{recuo * 2}<wmax x="{wx_max}" y="{wy_max}"/>{fim}'
+            f'{recuo}</window>{fim}')
+
+        offsets = cena.offsets
+        paleta = [escape(cor, ENTIDADES_ATRIBUTO) for cor in cena.paleta]
+        for inicio in range(0, len(cena), OBJETOS_POR_BLOCO):
+            fim_bloco = min(inicio + OBJETOS_POR_BLOCO, len(cena))
+            coords = cena.coords[offsets[inicio]:offsets[fim_bloco]].tolist()
+            offs = (offsets[inicio:fim_bloco + 1] - offsets[inicio]).tolist()
+            tipos = cena.tipos[inicio:fim_bloco].tolist()
+            cores = cena.cores[inicio:fim_bloco].tolist()
+
+            partes = []
+            for i, tipo in enumerate(tipos):
+                vertices = coords[offs[i]:offs[i + 1]]
+                cor = paleta[cores[i]]
+                if tipo == TIPO_PONTO:
+                    x, y = vertices[0]
+                    partes.append(f'{recuo}<ponto x="{x!r}" y="{y!r}" cor="{cor}"/>{fim}')
+                elif not vertices:
+                    partes.append(f'{recuo}<{TAGS[tipo]} cor="{cor}"/>{fim}')
+                else:
+                    partes.append(f'{recuo}<{TAGS[tipo]} cor="{cor}">{fim}')
+                    partes.extend(ponto(x, y) for x, y in vertices)
+                    partes.append(f'{recuo}</{TAGS[tipo]}>{fim}')
+            arquivo.write("".join(partes))
+
+        arquivo.write("</dados>\n")
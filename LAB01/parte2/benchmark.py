@@ -0,0 +1,266 @@
+import argparse
+import json
+import os
+import platform
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+from arquivo_binario import carregar_cena, EXTENSAO
+from arquivo_xml import VIEWPORT_PADRAO
+from cena import Cena
+from gerador_cenas import gerar_cena, salvar_cena, window_mundo, MUNDO
+from indice_espacial import GradeUniforme
+from rasterizador import novo_quadro, rasterizar_recorte, codificar_png
+from recorte import recortar_objetos
+from selecao import escolher_objeto
+from simplificacao import CacheNiveisDetalhe
+from transformacoes import matriz_window_ncs, matriz_ncs_viewport, aplicar_matriz, translacao
+
+# Mede o tempo de cada etapa do visualizador (gerar, salvar, carregar, indexar,
+# transformar, recortar, rasterizar) com cenas sintéticas de vários tamanhos,
+# sem interface e, opcionalmente, com o Tk (num display virtual Xvfb, se não
+# houver um). Os resultados saem em JSON; com --comparar, o script falha se
+# alguma etapa ficou mais lenta que a referência além da tolerância.
+# Uso: python benchmark.py [--tamanhos 1000 10000 ...] [--tk] [--saida r.json] [--comparar base.json]
+
+TAMANHOS_PADRAO = (1_000, 10_000, 100_000, 1_000_000)
+REPETICOES_PADRAO = 3
+TOLERANCIA_PADRAO = 0.25  # Fração de piora aceita em relação à referência
+CURSORES = 200  # Posições sorteadas para medir a escolha de objeto sob o cursor
+
+
+# Executa funcao() repeticoes vezes e devolve os tempos (s) e o último retorno
+def cronometrar(funcao, repeticoes):
+    tempos = []
+    retorno = None
+    for _ in range(repeticoes):
+        inicio = time.perf_counter()
+        retorno = funcao()
+        tempos.append(time.perf_counter() - inicio)
+    return tempos, retorno
+
+
+class Resultados:
+    def __init__(self):
+        self.linhas = []
+
+    def registrar(self, modo, n_objetos, etapa, tempos, **extra):
+        linha = {"modo": modo, "n_objetos": n_objetos, "etapa": etapa,
+                 "min": min(tempos), "mediana": statistics.median(tempos), "repeticoes": len(tempos)}
+        linha.update(extra)
+        self.linhas.append(linha)
+        print(f"{modo:8} {n_objetos:>10} {etapa:24} {linha['mediana'] * 1000:10.2f} ms", file=sys.stderr)
+
+
+# Etapas sem interface: as mesmas funções que o Visualizador usa por baixo
+def medir_sem_interface(n_objetos, pasta, repeticoes, resultados, semente=0):
+    tempos, cena = cronometrar(lambda: gerar_cena(n_objetos, semente), 1)
+    resultados.registrar("headless", n_objetos, "gerar", tempos, n_vertices=cena.n_vertices)
+
+    viewport = VIEWPORT_PADRAO
+    window = window_mundo()
+    for extensao in (".xml", EXTENSAO):
+        caminho = os.path.join(pasta, f"cena_{n_objetos}{extensao}")
+        tempos, _ = cronometrar(lambda: salvar_cena(caminho, cena, viewport, window), repeticoes)
+        resultados.registrar("headless", n_objetos, "salvar" + extensao, tempos,
+                             bytes=os.path.getsize(caminho))
+        tempos, _ = cronometrar(lambda: carregar_cena(caminho, Cena()), repeticoes)
+        resultados.registrar("headless", n_objetos, "carregar" + extensao, tempos)
+
+    indice = GradeUniforme()
+    tempos, _ = cronometrar(lambda: indice.construir(cena), repeticoes)
+    resultados.registrar("headless", n_objetos, "indexar", tempos)
+
+    matriz_ncs = matriz_window_ncs(window)
+    matriz = matriz_ncs_viewport(viewport) @ matriz_ncs
+    tempos, _ = cronometrar(lambda: aplicar_matriz(matriz, cena.coords), repeticoes)
+    resultados.registrar("headless", n_objetos, "transformar", tempos)
+
+    # Recorte com a cena inteira na window e com um zoom num quarto do mundo
+    x_min, y_min, x_max, y_max = window
+    zoom = (x_min, y_min, (x_min + x_max) / 2, (y_min + y_max) / 2)
+    lod = CacheNiveisDetalhe()
+    tempos, _ = cronometrar(lambda: lod.preparar(cena), 1)  # Na interface, roda em segundo plano na carga
+    resultados.registrar("headless", n_objetos, "preparar_lod", tempos)
+    for nome, janela in (("inteira", window), ("zoom", zoom)):
+        matriz_janela = matriz_window_ncs(janela)
+        nivel = lod.nivel_para(matriz_ncs_viewport(viewport) @ matriz_janela)
+        candidatos = indice.consultar(janela)
+        tempos, _ = cronometrar(lambda: indice.consultar(janela), repeticoes)
+        resultados.registrar("headless", n_objetos, "consultar_" + nome, tempos, candidatos=len(candidatos))
+        tempos, recorte = cronometrar(lambda: recortar_objetos(cena, matriz_janela, candidatos, lod, nivel),
+                                      repeticoes)
+        resultados.registrar("headless", n_objetos, "recortar_" + nome, tempos,
+                             visiveis=int(recorte.visivel.sum()))
+
+        # Tempo por posição do cursor (o que conta para o destaque ao passar o mouse)
+        matriz_vp = matriz_ncs_viewport(viewport) @ matriz_janela
+        cursores = np.random.default_rng(semente).uniform(viewport[:2], viewport[2:], (CURSORES, 2)).tolist()
+        tempos, _ = cronometrar(lambda: [escolher_objeto(cena, indice, matriz_vp, x, y) for x, y in cursores],
+                                repeticoes)
+        resultados.registrar("headless", n_objetos, "escolher_" + nome, [t / len(cursores) for t in tempos],
+                             cursores=len(cursores))
+
+        largura, altura = int(viewport[2] - viewport[0]), int(viewport[3] - viewport[1])
+        pixels = aplicar_matriz(matriz_ncs_viewport((0, 0, largura, altura)), recorte.coords)
+
+        def rasterizar():
+            quadro = novo_quadro(largura, altura)
+            rasterizar_recorte(quadro, cena, recorte, pixels)
+            return quadro
+
+        tempos, quadro = cronometrar(rasterizar, repeticoes)
+        resultados.registrar("headless", n_objetos, "rasterizar_" + nome, tempos)
+    tempos, _ = cronometrar(lambda: codificar_png(quadro), repeticoes)
+    resultados.registrar("headless", n_objetos, "codificar_png", tempos)
+
+
+# Mesmas operações pelo Visualizador, num Tk de verdade. desenhar_viewport pode
+# terminar em segundo plano, então o tempo vai até o quadro estar no canvas.
+def medir_com_tk(n_objetos, pasta, repeticoes, resultados):
+    import tkinter as tk
+    from main import Visualizador
+
+    caminho = os.path.join(pasta, f"cena_{n_objetos}{EXTENSAO}")
+    if not os.path.exists(caminho):
+        salvar_cena(caminho, gerar_cena(n_objetos))
+
+    root = tk.Tk()
+    try:
+        app = Visualizador(root)
+        root.update()
+
+        def esperar_quadro():
+            while app.preparador.ocupado:
+                root.update()
+                time.sleep(0.001)
+            root.update_idletasks()
+
+        tempos, _ = cronometrar(lambda: app.carregar_arquivo(caminho), repeticoes)
+        resultados.registrar("tk", n_objetos, "carregar_arquivo", tempos)
+        app.window = window_mundo()
+
+        pontos = app.objetos.coords
+        tempos, _ = cronometrar(lambda: app.window2viewport_lote(pontos), repeticoes)
+        resultados.registrar("tk", n_objetos, "window2viewport", tempos)
+
+        for modo in ("canvas", "quadro", "blocos"):
+            app.modo_renderizacao.set(modo)
+            app.trocar_renderizador()
+            app.agendador.cancelar()
+
+            def primeiro_quadro():
+                app.renderizador.limpar()
+                app.preparador.invalidar()
+                app.desenhar_viewport()
+                esperar_quadro()
+
+            def deslocar():
+                app.matriz_visao = app.matriz_visao @ translacao(-1.0, 0.0)
+                app._atualizar_window()
+                app.desenhar_viewport()
+                esperar_quadro()
+
+            tempos, _ = cronometrar(primeiro_quadro, repeticoes)
+            resultados.registrar("tk", n_objetos, f"desenhar_viewport_{modo}", tempos)
+            tempos, _ = cronometrar(deslocar, repeticoes)
+            resultados.registrar("tk", n_objetos, f"deslocar_{modo}", tempos)
+
+        def minimapa_inteiro():
+            app.minimapa.rasterizar(app.objetos)
+            root.update_idletasks()
+
+        tempos, _ = cronometrar(minimapa_inteiro, repeticoes)
+        resultados.registrar("tk", n_objetos, "desenhar_minimapa", tempos)
+        tempos, _ = cronometrar(app.desenhar_minimapa, repeticoes)
+        resultados.registrar("tk", n_objetos, "desenhar_minimapa_quadro", tempos)
+
+        saida = os.path.join(pasta, f"saida_{n_objetos}.xml")
+        tempos, _ = cronometrar(lambda: app.gerar_arquivo_saida(saida), repeticoes)
+        resultados.registrar("tk", n_objetos, "gerar_arquivo_saida", tempos)
+        app.preparador.encerrar()
+    finally:
+        root.destroy()
+
+
+# Garante um display para o Tk: usa o atual ou sobe um Xvfb. Devolve o processo
+# do Xvfb (ou None) e se há display disponível.
+def preparar_display():
+    if os.environ.get("DISPLAY"):
+        return None, True
+    if shutil.which("Xvfb") is None:
+        return None, False
+    numero = ":%d" % (90 + os.getpid() % 100)
+    processo = subprocess.Popen(["Xvfb", numero, "-screen", "0", "1280x1024x24"],
+                                stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    os.environ["DISPLAY"] = numero
+    time.sleep(0.5)
+    return processo, processo.poll() is None
+
+
+# Etapas que pioraram além da tolerância em relação a um JSON de referência
+def regressoes(linhas, referencia, tolerancia):
+    base = {(l["modo"], l["n_objetos"], l["etapa"]): l["mediana"] for l in referencia["resultados"]}
+    piores = []
+    for linha in linhas:
+        anterior = base.get((linha["modo"], linha["n_objetos"], linha["etapa"]))
+        if anterior and linha["mediana"] > anterior * (1 + tolerancia):
+            piores.append((linha, anterior))
+    return piores
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark do visualizador com cenas sintéticas.")
+    parser.add_argument("--tamanhos", type=int, nargs="+", default=TAMANHOS_PADRAO)
+    parser.add_argument("--repeticoes", type=int, default=REPETICOES_PADRAO)
+    parser.add_argument("--semente", type=int, default=0)
+    parser.add_argument("--tk", action="store_true", help="mede também pelo Tk (usa Xvfb se não houver display)")
+    parser.add_argument("--saida", help="arquivo JSON com os resultados (padrão: saída padrão)")
+    parser.add_argument("--comparar", help="JSON de uma execução anterior para detectar regressões")
+    parser.add_argument("--tolerancia", type=float, default=TOLERANCIA_PADRAO)
+    args = parser.parse_args()
+
+    resultados = Resultados()
+    xvfb = None
+    with tempfile.TemporaryDirectory(prefix="benchmark_cenas_") as pasta:
+        try:
+            for n_objetos in args.tamanhos:
+                medir_sem_interface(n_objetos, pasta, args.repeticoes, resultados, args.semente)
+            tk_disponivel = False
+            if args.tk:
+                xvfb, tk_disponivel = preparar_display()
+                if not tk_disponivel:
+                    print("Sem display nem Xvfb: etapas com Tk não medidas", file=sys.stderr)
+                for n_objetos in args.tamanhos if tk_disponivel else ():
+                    medir_com_tk(n_objetos, pasta, args.repeticoes, resultados)
+        finally:
+            if xvfb is not None:
+                xvfb.terminate()
+
+    relatorio = {
+        "ambiente": {"python": platform.python_version(), "numpy": np.__version__,
+                     "plataforma": platform.platform(), "nucleos": os.cpu_count()},
+        "parametros": {"tamanhos": args.tamanhos, "repeticoes": args.repeticoes, "semente": args.semente,
+                       "mundo": MUNDO, "tk": args.tk and tk_disponivel},
+        "resultados": resultados.linhas,
+    }
+    texto = json.dumps(relatorio, indent=2)
+    if args.saida:
+        with open(args.saida, "w", encoding="utf-8") as arquivo:
+            arquivo.write(texto + "\n")
+    else:
+        print(texto)
+
+    if args.comparar:
+        with open(args.comparar, encoding="utf-8") as arquivo:
+            piores = regressoes(resultados.linhas, json.load(arquivo), args.tolerancia)
+        for linha, anterior in piores:
+            print(f"REGRESSÃO {linha['modo']} {linha['n_objetos']} {linha['etapa']}: "
+                  f"{anterior * 1000:.2f} ms -> {linha['mediana'] * 1000:.2f} ms", file=sys.stderr)
+        sys.exit(1 if piores else 0)
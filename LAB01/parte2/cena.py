@@ -0,0 +1,397 @@
+import numpy as np
+
+# Códigos de tipo guardados no array de tipos da cena
+TIPO_PONTO = 0
+TIPO_RETA = 1
+TIPO_POLIGONO = 2
+# Maior índice de cor da paleta (as cores são guardadas como uint16)
+MAX_CORES = np.iinfo(np.uint16).max
+
+
+# Classe base dos objetos geométricos. Um objeto pode estar "solto" (criado pelo
+# usuário, guarda os próprios dados) ou ser uma vista de uma posição da Cena,
+# caso em que todos os atributos são lidos/escritos direto nos arrays da cena.
+class ObjetoGeometrico:
+    tipo = None
+
+    def __init__(self, vertices, cor):
+        self._cena = None
+        self._indice = None
+        self._vertices = [(float(x), float(y)) for x, y in vertices]
+        self._cor = cor
+        self._visivel = True
+        self._ncs = None
+
+    @classmethod
+    def _vista(cls, cena, indice):
+        objeto = cls.__new__(cls)
+        objeto._cena = cena
+        objeto._indice = indice
+        return objeto
+
+    @property
+    def indice(self):
+        return self._indice
+
+    @property
+    def vertices(self):
+        if self._cena is None:
+            return self._vertices
+        return [tuple(p) for p in self._cena.vertices(self._indice).tolist()]
+
+    @property
+    def coordenadas_mundo(self):
+        return self.vertices
+
+    @property
+    def cor(self):
+        if self._cena is None:
+            return self._cor
+        return self._cena.paleta[self._cena.cores[self._indice]]
+
+    @property
+    def visivel(self):
+        if self._cena is None:
+            return self._visivel
+        return bool(self._cena.visivel[self._indice])
+
+    @visivel.setter
+    def visivel(self, valor):
+        if self._cena is None:
+            self._visivel = valor
+        else:
+            self._cena.visivel[self._indice] = valor
+
+    @property
+    def coordenadas_ncs(self):
+        if self._cena is None:
+            return self._ncs
+        if self._cena.recorte is None:
+            return None
+        ncs = self._cena.recorte.coordenadas_ncs(self._indice)
+        if ncs is None:
+            return None
+        return [tuple(p) for p in ncs.tolist()]
+
+    @coordenadas_ncs.setter
+    def coordenadas_ncs(self, valor):
+        if self._cena is not None:
+            raise AttributeError("coordenadas_ncs de objetos da cena são preenchidas pelo recorte")
+        self._ncs = valor
+
+    def __eq__(self, outro):
+        if self._cena is None or not isinstance(outro, ObjetoGeometrico):
+            return self is outro
+        return self._cena is outro._cena and self._indice == outro._indice
+
+    def __hash__(self):
+        if self._cena is None:
+            return id(self)
+        return hash((id(self._cena), self._indice))
+
+
+class Ponto(ObjetoGeometrico):
+    tipo = TIPO_PONTO
+
+    def __init__(self, x, y, cor="black"):
+        super().__init__([(x, y)], cor)
+
+    @property
+    def coordenadas_mundo(self):
+        return self.vertices[0]  # O ponto guarda uma única tupla (x, y)
+
+
+class Reta(ObjetoGeometrico):
+    tipo = TIPO_RETA
+
+    def __init__(self, x1, y1, x2, y2, cor="blue"):
+        super().__init__([(x1, y1), (x2, y2)], cor)
+
+
+class Poligono(ObjetoGeometrico):
+    tipo = TIPO_POLIGONO
+
+    def __init__(self, vertices, cor="green"):
+        super().__init__(vertices, cor)
+
+
+CLASSES_POR_TIPO = {TIPO_PONTO: Ponto, TIPO_RETA: Reta, TIPO_POLIGONO: Poligono}
+
+
+# Índices inicio[k], inicio[k]+1, ..., inicio[k]+tamanho[k]-1 de todas as faixas, concatenados
+def faixas(inicios, tamanhos):
+    total = int(np.sum(tamanhos))
+    if total == 0:
+        return np.zeros(0, dtype=np.int64)
+    deslocamento = np.concatenate([[0], np.cumsum(tamanhos)[:-1]])
+    return np.repeat(inicios - deslocamento, tamanhos) + np.arange(total)
+
+
+# Armazena a cena em colunas: um buffer contíguo com todos os vértices, um array
+# de offsets (o objeto i usa coords[offsets[i]:offsets[i+1]]), códigos de tipo e
+# cores como índices de uma paleta. Os objetos Ponto/Reta/Poligono devolvidos na
+# iteração são apenas vistas sobre esses arrays.
+class Cena:
+    def __init__(self, capacidade_objetos=1024, capacidade_vertices=4096):
+        self._coords = np.empty((capacidade_vertices, 2), dtype=np.float64)
+        self._offsets = np.zeros(capacidade_objetos + 1, dtype=np.int64)
+        self._tipos = np.empty(capacidade_objetos, dtype=np.uint8)
+        self._cores = np.empty(capacidade_objetos, dtype=np.uint16)
+        self._visivel = np.ones(capacidade_objetos, dtype=bool)
+        self._revisoes = np.zeros(capacidade_objetos, dtype=np.uint32)  # Mudanças (geometria ou cor) por objeto
+        self._removidos = np.zeros(capacidade_objetos, dtype=bool)
+        self.n_objetos = 0
+        self.n_removidos = 0
+        self.n_vertices = 0
+        self.paleta = []
+        self._indice_cor = {}
+        self.recorte = None  # Último resultado do recorte (coordenadas no NCS)
+        self.versao = 0  # Incrementada a cada mudança de geometria ou de cor
+        self.geracao = 0  # Incrementada quando a cena inteira é trocada (índices deixam de valer)
+
+    # Vistas sobre a parte usada dos buffers
+    @property
+    def coords(self):
+        return self._coords[:self.n_vertices]
+
+    @property
+    def offsets(self):
+        return self._offsets[:self.n_objetos + 1]
+
+    @property
+    def tipos(self):
+        return self._tipos[:self.n_objetos]
+
+    @property
+    def cores(self):
+        return self._cores[:self.n_objetos]
+
+    @property
+    def visivel(self):
+        return self._visivel[:self.n_objetos]
+
+    @property
+    def revisoes(self):
+        return self._revisoes[:self.n_objetos]
+
+    # Objetos removidos continuam ocupando a sua posição (os índices dos demais
+    # não mudam), mas ficam fora da iteração, das caixas e do recorte
+    @property
+    def removidos(self):
+        return self._removidos[:self.n_objetos]
+
+    def __len__(self):
+        return self.n_objetos
+
+    def __getitem__(self, indice):
+        if indice < 0:
+            indice += self.n_objetos
+        if not 0 <= indice < self.n_objetos:
+            raise IndexError("índice de objeto fora da cena")
+        return CLASSES_POR_TIPO[int(self._tipos[indice])]._vista(self, indice)
+
+    def __iter__(self):
+        removidos = self.removidos.tolist() if self.n_removidos else None
+        for indice, tipo in enumerate(self.tipos.tolist()):
+            if removidos is None or not removidos[indice]:
+                yield CLASSES_POR_TIPO[tipo]._vista(self, indice)
+
+    def vertices(self, indice):
+        return self._coords[self._offsets[indice]:self._offsets[indice + 1]]
+
+    # Caixas envolventes (x_min, y_min, x_max, y_max) dos objetos indicados (todos, se None)
+    def caixas(self, indices=None):
+        if indices is None:
+            indices = np.arange(self.n_objetos, dtype=np.int64)
+        indices = np.asarray(indices, dtype=np.int64)
+        caixas = np.full((len(indices), 4), np.nan)
+
+        inicios = self._offsets[indices]
+        tamanhos = self._offsets[indices + 1] - inicios
+        com_vertices = tamanhos > 0
+        if np.any(com_vertices):
+            inicios, tamanhos = inicios[com_vertices], tamanhos[com_vertices]
+            deslocamento = np.concatenate([[0], np.cumsum(tamanhos)[:-1]])
+            vertices = self._coords[faixas(inicios, tamanhos)]
+            caixas[com_vertices, :2] = np.minimum.reduceat(vertices, deslocamento, axis=0)
+            caixas[com_vertices, 2:] = np.maximum.reduceat(vertices, deslocamento, axis=0)
+        if self.n_removidos:
+            caixas[self._removidos[indices]] = np.nan
+        return caixas
+
+    def indice_cor(self, cor):
+        codigo = self._indice_cor.get(cor)
+        if codigo is None:
+            codigo = len(self.paleta)
+            if codigo > MAX_CORES:
+                raise ValueError(f"a cena comporta no máximo {MAX_CORES + 1} cores distintas")
+            self.paleta.append(cor)
+            self._indice_cor[cor] = codigo
+        return codigo
+
+    def clear(self):
+        self.n_objetos = 0
+        self.n_vertices = 0
+        self.n_removidos = 0
+        self.paleta = []
+        self._indice_cor = {}
+        self.recorte = None
+        self.versao += 1
+        self.geracao += 1
+
+    # Passa a usar arrays já prontos (por exemplo, mapeados de um arquivo) como
+    # buffers da cena, sem copiá-los. A cópia só acontece se a cena crescer.
+    def adotar(self, coords, offsets, tipos, cores, paleta):
+        self._coords = coords
+        self._offsets = offsets
+        self._tipos = tipos
+        self._cores = cores
+        self._visivel = np.ones(len(tipos), dtype=bool)
+        self._revisoes = np.zeros(len(tipos), dtype=np.uint32)
+        self._removidos = np.zeros(len(tipos), dtype=bool)
+        self.n_objetos = len(tipos)
+        self.n_vertices = len(coords)
+        self.n_removidos = 0
+        self.paleta = list(paleta)
+        self._indice_cor = {cor: i for i, cor in enumerate(self.paleta)}
+        self.recorte = None
+        self.versao += 1
+        self.geracao += 1
+
+    # Capacidade dos buffers: (objetos, vértices) que cabem sem realocar
+    @property
+    def capacidade(self):
+        return len(self._tipos), len(self._coords)
+
+    # Garante espaço para mais objetos/vértices dobrando a capacidade dos buffers
+    def _reservar(self, n_objetos, n_vertices):
+        objetos, vertices = self.n_objetos + n_objetos, self.n_vertices + n_vertices
+        self.reservar(max(2 * len(self._tipos), objetos) if objetos > len(self._tipos) else objetos,
+                      max(2 * len(self._coords), vertices) if vertices > len(self._coords) else vertices)
+
+    # Garante capacidade para capacidade_objetos/capacidade_vertices no total,
+    # sem folga (quem chama decide quanto sobra)
+    def reservar(self, capacidade_objetos, capacidade_vertices):
+        if capacidade_vertices > len(self._coords):
+            coords = np.empty((capacidade_vertices, 2), dtype=np.float64)
+            coords[:self.n_vertices] = self.coords
+            self._coords = coords
+        if capacidade_objetos > len(self._tipos):
+            capacidade = capacidade_objetos
+            offsets = np.zeros(capacidade + 1, dtype=np.int64)
+            offsets[:self.n_objetos + 1] = self.offsets
+            self._offsets = offsets
+            for nome, dtype in (("_tipos", np.uint8), ("_cores", np.uint16)):
+                novo = np.empty(capacidade, dtype=dtype)
+                novo[:self.n_objetos] = getattr(self, nome)[:self.n_objetos]
+                setattr(self, nome, novo)
+            visivel = np.ones(capacidade, dtype=bool)
+            visivel[:self.n_objetos] = self.visivel
+            self._visivel = visivel
+            revisoes = np.zeros(capacidade, dtype=np.uint32)
+            revisoes[:self.n_objetos] = self.revisoes
+            self._revisoes = revisoes
+            removidos = np.zeros(capacidade, dtype=bool)
+            removidos[:self.n_objetos] = self.removidos
+            self._removidos = removidos
+
+    # Inclui um objeto a partir do tipo, da lista de vértices e da cor e devolve seu índice
+    def adicionar(self, tipo, vertices, cor):
+        vertices = np.asarray(vertices, dtype=np.float64).reshape(-1, 2)
+        self._reservar(1, len(vertices))
+
+        indice = self.n_objetos
+        inicio = self.n_vertices
+        self._coords[inicio:inicio + len(vertices)] = vertices
+        self._offsets[indice + 1] = inicio + len(vertices)
+        self._tipos[indice] = tipo
+        self._cores[indice] = self.indice_cor(cor)
+        self._visivel[indice] = True
+        self._revisoes[indice] = 0
+        self._removidos[indice] = False
+
+        self.n_objetos += 1
+        self.n_vertices += len(vertices)
+        self.versao += 1
+        return indice
+
+    # Inclui vários objetos de uma vez: tipos e tamanhos (número de vértices) por
+    # objeto, vertices com todos os vértices concatenados e cores por objeto
+    # (nomes ou, se paleta for dada, códigos dessa paleta)
+    def adicionar_lote(self, tipos, vertices, tamanhos, cores, paleta=None):
+        vertices = np.asarray(vertices, dtype=np.float64).reshape(-1, 2)
+        tamanhos = np.asarray(tamanhos, dtype=np.int64)
+        n = len(tamanhos)
+        if n == 0:
+            return np.zeros(0, dtype=np.int64)
+        self._reservar(n, len(vertices))
+
+        i0, v0 = self.n_objetos, self.n_vertices
+        self._coords[v0:v0 + len(vertices)] = vertices
+        self._offsets[i0 + 1:i0 + n + 1] = v0 + np.cumsum(tamanhos)
+        self._tipos[i0:i0 + n] = tipos
+        if paleta is None:
+            self._cores[i0:i0 + n] = [self.indice_cor(cor) for cor in cores]
+        else:
+            self._cores[i0:i0 + n] = np.array([self.indice_cor(cor) for cor in paleta], dtype=np.uint16)[cores]
+        self._visivel[i0:i0 + n] = True
+        self._revisoes[i0:i0 + n] = 0
+        self._removidos[i0:i0 + n] = False
+
+        self.n_objetos += n
+        self.n_vertices += len(vertices)
+        self.versao += 1
+        return np.arange(i0, i0 + n, dtype=np.int64)
+
+    def append(self, objeto):
+        return self.adicionar(objeto.tipo, objeto.vertices, objeto.cor)
+
+    def extend(self, objetos):
+        for objeto in objetos:
+            self.append(objeto)
+
+    # Edição de objetos já na cena; indices pode ser um índice ou um array deles.
+    # Mudanças de geometria ou de cor incrementam a revisão dos objetos (invalidando as
+    # versões simplificadas e os itens desenhados) e a versão da cena.
+    def mover(self, indices, dx, dy):
+        indices = np.unique(np.asarray(indices, dtype=np.int64))
+        inicios = self._offsets[indices]
+        self._coords[faixas(inicios, self._offsets[indices + 1] - inicios)] += (dx, dy)
+        self._revisoes[indices] += 1
+        self.versao += 1
+
+    # Troca os vértices dos objetos (sem repetição) por outros em mesmo número;
+    # vertices traz os novos de todos eles concatenados, na ordem de indices
+    def substituir_vertices(self, indices, vertices):
+        indices = np.asarray(indices, dtype=np.int64)
+        inicios = self._offsets[indices]
+        self._coords[faixas(inicios, self._offsets[indices + 1] - inicios)] = np.asarray(vertices).reshape(-1, 2)
+        self._revisoes[indices] += 1
+        self.versao += 1
+
+    def recolorir(self, indices, cor):
+        indices = np.unique(np.asarray(indices, dtype=np.int64))
+        self._cores[indices] = self.indice_cor(cor)
+        self._revisoes[indices] += 1
+        self.versao += 1
+
+    def remover(self, indices):
+        indices = np.unique(np.asarray(indices, dtype=np.int64))
+        indices = indices[~self._removidos[indices]]
+        self._removidos[indices] = True
+        self._visivel[indices] = False
+        self._revisoes[indices] += 1
+        self.n_removidos += len(indices)
+        self.versao += 1
+
+    # Cópia só com os objetos não removidos (os índices são renumerados), para
+    # salvar em arquivo
+    def compactada(self):
+        ativos = np.flatnonzero(~self.removidos)
+        inicios = self.offsets[ativos]
+        tamanhos = self.offsets[ativos + 1] - inicios
+        cena = Cena(0, 0)
+        cena.adotar(self.coords[faixas(inicios, tamanhos)],
+                    np.concatenate([[0], np.cumsum(tamanhos)]).astype(np.int64),
+                    self.tipos[ativos], self.cores[ativos], self.paleta)
+        return cena
@@ -0,0 +1,46 @@
+import numpy as np
+
+
+# União de duas caixas (x_min, y_min, x_max, y_max); None é a caixa vazia
+def unir_caixas(a, b):
+    if a is None:
+        return b
+    if b is None:
+        return a
+    return (min(a[0], b[0]), min(a[1], b[1]), max(a[2], b[2]), max(a[3], b[3]))
+
+
+# Se duas caixas se tocam
+def caixas_intersectam(a, b):
+    return a[0] <= b[2] and a[2] >= b[0] and a[1] <= b[3] and a[3] >= b[1]
+
+
+# Edições da cena feitas desde o último quadro: os objetos alterados e a região
+# suja do mundo (união das caixas de antes e de depois de cada edição). O
+# quadro seguinte retira tudo de uma vez e redesenha só o que foi afetado.
+class EdicoesPendentes:
+    def __init__(self):
+        self._indices = []
+        self.regiao = None
+
+    def __bool__(self):
+        return bool(self._indices)
+
+    # caixas: caixas envolventes (no mundo) dos objetos antes ou depois da
+    # edição; caixas com NaN (objetos sem vértices ou removidos) são ignoradas
+    def registrar(self, indices, *caixas):
+        self._indices.append(np.atleast_1d(np.asarray(indices, dtype=np.int64)))
+        for caixa in caixas:
+            caixa = np.asarray(caixa, dtype=np.float64).reshape(-1, 4)
+            caixa = caixa[~np.isnan(caixa).any(axis=1)]
+            if len(caixa):
+                self.regiao = unir_caixas(self.regiao, tuple(caixa[:, :2].min(axis=0).tolist()) +
+                                          tuple(caixa[:, 2:].max(axis=0).tolist()))
+
+    # Devolve (índices sem repetição, região) e esvazia a lista
+    def retirar(self):
+        indices = np.unique(np.concatenate(self._indices)) if self._indices else np.zeros(0, dtype=np.int64)
+        regiao = self.regiao
+        self._indices = []
+        self.regiao = None
+        return indices, regiao
@@ -0,0 +1,180 @@
+import argparse
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from xml.sax.saxutils import quoteattr
+
+import numpy as np
+
+from arquivo_binario import carregar_cena, EXTENSAO
+from cena import Cena, TIPO_PONTO, TIPO_RETA, TIPO_POLIGONO
+from rasterizador import novo_quadro, rasterizar_recorte, codificar_png
+from recorte import recortar_objetos
+from transformacoes import matriz_window_ncs, matriz_ncs_viewport, aplicar_matriz
+
+# Renderização sem Tk: a mesma cadeia window -> NCS -> viewport e o mesmo
+# recorte do visualizador, desenhando num quadro em memória (PNG) ou em SVG.
+# Uso: python exportar.py entrada [entrada ...] -o pasta_saida [-f png|svg] [-j processos] [--preencher]
+# (cada entrada pode ser um arquivo .xml/.cena ou uma pasta com eles)
+
+FORMATOS = ("png", "svg")
+FUNDO = (255, 255, 255)
+RAIO_PONTO = 2  # Mesmos tamanhos do RenderizadorRetido
+LARGURA_POLIGONO = 2
+
+
+# Recorta a cena na window e leva o que sobrou para pixels de uma imagem do
+# tamanho da viewport. Devolve (recorte, pixels, largura, altura).
+def projetar(cena, viewport, window):
+    largura = max(1, int(round(viewport[2] - viewport[0])))
+    altura = max(1, int(round(viewport[3] - viewport[1])))
+    recorte = recortar_objetos(cena, matriz_window_ncs(window))
+    pixels = aplicar_matriz(matriz_ncs_viewport((0, 0, largura, altura)), recorte.coords)
+    return recorte, pixels, largura, altura
+
+
+# Rasteriza a cena num quadro RGB (mesmo desenho do RenderizadorQuadro)
+def renderizar_quadro(cena, viewport, window, fundo=FUNDO, preencher=False):
+    recorte, pixels, largura, altura = projetar(cena, viewport, window)
+    quadro = novo_quadro(largura, altura, fundo)
+    rasterizar_recorte(quadro, cena, recorte, pixels, RAIO_PONTO, LARGURA_POLIGONO, preencher)
+    return quadro
+
+
+# Documento SVG com os objetos visíveis, na ordem da cena (como no canvas)
+def gerar_svg(cena, viewport, window, fundo="white"):
+    recorte, pixels, largura, altura = projetar(cena, viewport, window)
+    posicoes = np.flatnonzero(recorte.visivel)
+    indices = recorte.indices[posicoes]
+    tipos = cena.tipos[indices].tolist()
+    cores = cena.cores[indices].tolist()
+    offsets = recorte.offsets.tolist()
+    pixels = np.round(pixels, 3).tolist()
+    paleta = [quoteattr(cor) for cor in cena.paleta]
+
+    partes = [f'<svg xmlns="http://www.w3.org/2000/svg" width="{largura}" height="{altura}" '
+              f'viewBox="0 0 {largura} {altura}">',
+              f'<rect width="100%" height="100%" fill={quoteattr(fundo)}/>']
+    for posicao, tipo, cor in zip(posicoes.tolist(), tipos, cores):
+        pontos = pixels[offsets[posicao]:offsets[posicao + 1]]
+        if tipo == TIPO_PONTO:
+            x, y = pontos[0]
+            partes.append(f'<circle cx="{x}" cy="{y}" r="{RAIO_PONTO}" fill={paleta[cor]}/>')
+        elif tipo == TIPO_RETA:
+            (x1, y1), (x2, y2) = pontos[:2]
+            partes.append(f'<line x1="{x1}" y1="{y1}" x2="{x2}" y2="{y2}" stroke={paleta[cor]}/>')
+        else:
+            coordenadas = " ".join(f"{x},{y}" for x, y in pontos)
+            partes.append(f'<polygon points="{coordenadas}" fill="none" stroke={paleta[cor]} '
+                          f'stroke-width="{LARGURA_POLIGONO}"/>')
+    partes.append("</svg>")
+    return "\n".join(partes) + "\n"
+
+
+# Carrega um arquivo de cena e grava a imagem (formato pela extensão do destino).
+# Devolve (quantidade de objetos, segundos gastos).
+def renderizar_arquivo(origem, destino, preencher=False):
+    inicio = time.perf_counter()
+    cena = Cena()
+    viewport, window = carregar_cena(origem, cena)
+    if destino.lower().endswith(".svg"):
+        with open(destino, "w", encoding="utf-8") as arquivo:
+            arquivo.write(gerar_svg(cena, viewport, window))
+    else:
+        with open(destino, "wb") as arquivo:
+            arquivo.write(codificar_png(renderizar_quadro(cena, viewport, window, preencher=preencher)))
+    return len(cena), time.perf_counter() - inicio
+
+
+# Arquivos de cena indicados (pastas são percorridas, sem recursão)
+def listar_cenas(entradas):
+    arquivos = []
+    for entrada in entradas:
+        if os.path.isdir(entrada):
+            arquivos.extend(os.path.join(entrada, nome) for nome in sorted(os.listdir(entrada))
+                            if nome.lower().endswith((".xml", EXTENSAO)))
+        else:
+            arquivos.append(entrada)
+    return arquivos
+
+
+# Destino de cada arquivo na pasta de saída: o nome sem extensão ou, quando
+# dois arquivos dariam o mesmo nome (a.xml e a.cena, ou cena.xml em pastas
+# diferentes), o caminho a partir da pasta comum, com a extensão, trocando
+# separadores e pontos por "_". Arquivos repetidos são renderizados uma vez;
+# se ainda sobrar destino repetido, nada é renderizado (ValueError).
+def destinos_lote(arquivos, pasta_saida, formato):
+    origens = list({os.path.abspath(origem): origem for origem in arquivos}.items())
+    grupos = {}
+    for caminho, _ in origens:
+        grupos.setdefault(os.path.splitext(os.path.basename(caminho))[0].lower(), []).append(caminho)
+
+    destinos = {}
+    for caminho, origem in origens:
+        grupo = grupos[os.path.splitext(os.path.basename(caminho))[0].lower()]
+        if len(grupo) == 1:
+            nome = os.path.splitext(os.path.basename(caminho))[0]
+        else:
+            relativo = os.path.relpath(caminho, os.path.commonpath([os.path.dirname(c) for c in grupo]))
+            nome = relativo.replace(os.sep, "_").replace(".", "_")
+        destinos[origem] = os.path.join(pasta_saida, nome + "." + formato)
+
+    origens_por_destino = {}
+    for origem, destino in destinos.items():
+        origens_por_destino.setdefault(os.path.normcase(destino).lower(), []).append(origem)
+    repetidos = [origens for origens in origens_por_destino.values() if len(origens) > 1]
+    if repetidos:
+        raise ValueError("arquivos com o mesmo destino: " + "; ".join(", ".join(origens) for origens in repetidos))
+    return destinos
+
+
+# Renderiza vários arquivos em paralelo, um processo por núcleo (por padrão).
+# relatar(origem, destino, n_objetos, segundos, erro) é chamado a cada arquivo terminado.
+# Devolve (arquivos renderizados, falhas).
+def renderizar_lote(arquivos, pasta_saida, formato="png", processos=None, relatar=None, preencher=False):
+    destinos = destinos_lote(arquivos, pasta_saida, formato)
+    os.makedirs(pasta_saida, exist_ok=True)
+    falhas = 0
+    with ProcessPoolExecutor(max_workers=processos) as executor:
+        futuros = {executor.submit(renderizar_arquivo, origem, destino, preencher): origem
+                   for origem, destino in destinos.items()}
+        for futuro in as_completed(futuros):
+            origem = futuros[futuro]
+            try:
+                n_objetos, segundos = futuro.result()
+                erro = None
+            except Exception as e:
+                n_objetos, segundos, erro = 0, 0.0, e
+                falhas += 1
+            if relatar is not None:
+                relatar(origem, destinos[origem], n_objetos, segundos, erro)
+    return len(destinos), falhas
+
+
+def _relatar(origem, destino, n_objetos, segundos, erro):
+    if erro is not None:
+        print(f"{origem}: erro: {erro}", file=sys.stderr)
+    else:
+        print(f"{origem} -> {destino}: {n_objetos} objetos em {segundos * 1000:.1f} ms")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Renderiza cenas (.xml/.cena) em PNG ou SVG, sem interface gráfica.")
+    parser.add_argument("entradas", nargs="+", help="arquivos de cena ou pastas com eles")
+    parser.add_argument("-o", "--saida", required=True, help="pasta onde as imagens são gravadas")
+    parser.add_argument("-f", "--formato", choices=FORMATOS, default="png")
+    parser.add_argument("-j", "--processos", type=int, default=None, help="processos em paralelo (padrão: núcleos)")
+    parser.add_argument("--preencher", action="store_true", help="preenche os polígonos (só PNG)")
+    args = parser.parse_args()
+
+    arquivos = listar_cenas(args.entradas)
+    inicio = time.perf_counter()
+    try:
+        n_arquivos, falhas = renderizar_lote(arquivos, args.saida, args.formato, args.processos, _relatar,
+                                             args.preencher)
+    except ValueError as e:
+        print(f"Erro: {e}", file=sys.stderr)
+        sys.exit(1)
+    print(f"{n_arquivos - falhas}/{n_arquivos} arquivos em {time.perf_counter() - inicio:.2f} s")
+    sys.exit(1 if falhas else 0)
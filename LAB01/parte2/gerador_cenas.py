@@ -0,0 +1,91 @@
+import argparse
+
+import numpy as np
+
+from arquivo_binario import salvar_binario, EXTENSAO
+from arquivo_xml import salvar_xml, VIEWPORT_PADRAO
+from cena import Cena, TIPO_PONTO, TIPO_RETA, TIPO_POLIGONO
+
+# Gerador de cenas sintéticas e reprodutíveis (mesma semente, mesma cena), para
+# medir o desempenho do visualizador com cenas de qualquer tamanho.
+# Uso: python gerador_cenas.py n_objetos saida.xml|saida.cena [--semente S]
+
+MUNDO = (0.0, 0.0, 1000.0, 750.0)
+PROPORCAO = (0.4, 0.3, 0.3)  # Fração de pontos, retas e polígonos
+VERTICES_POLIGONO = (3, 12)  # Mínimo e máximo de vértices por polígono
+PALETA = ["black", "blue", "green", "red", "orange", "purple", "brown", "gray"]
+
+
+# Monta uma cena com n_objetos primitivas sorteadas no mundo. As retas têm
+# comprimento de até tamanho e os polígonos são estrelados (vértices em ângulos
+# crescentes em volta de um centro), com raio de até tamanho, então nunca se cruzam.
+def gerar_cena(n_objetos, semente=0, proporcao=PROPORCAO, vertices_poligono=VERTICES_POLIGONO,
+               mundo=MUNDO, tamanho=None):
+    gerador = np.random.default_rng(semente)
+    x_min, y_min, x_max, y_max = mundo
+    if tamanho is None:
+        tamanho = 0.01 * max(x_max - x_min, y_max - y_min)
+
+    pesos = np.asarray(proporcao, dtype=np.float64)
+    tipos = gerador.choice([TIPO_PONTO, TIPO_RETA, TIPO_POLIGONO], size=n_objetos,
+                           p=pesos / pesos.sum()).astype(np.uint8)
+    minimo, maximo = vertices_poligono
+    tamanhos = np.where(tipos == TIPO_PONTO, 1, 2).astype(np.int64)
+    poligonos = tipos == TIPO_POLIGONO
+    tamanhos[poligonos] = gerador.integers(minimo, maximo + 1, size=int(poligonos.sum()))
+
+    offsets = np.concatenate([[0], np.cumsum(tamanhos)]).astype(np.int64)
+    objeto = np.repeat(np.arange(n_objetos), tamanhos)
+    k = np.arange(offsets[-1]) - offsets[objeto]  # Posição do vértice dentro do objeto
+
+    # Âncora de cada objeto (ponto, início da reta, centro do polígono)
+    ancoras = np.column_stack([gerador.uniform(x_min, x_max, n_objetos),
+                               gerador.uniform(y_min, y_max, n_objetos)])
+    raio = gerador.uniform(0.2, 1.0, offsets[-1]) * tamanho
+    angulo = gerador.uniform(0.0, 2 * np.pi, offsets[-1])
+
+    # Polígonos: ângulos crescentes, em fatias iguais com uma variação dentro de cada uma
+    de_poligono = poligonos[objeto]
+    fatia = 2 * np.pi / tamanhos[objeto]
+    angulo[de_poligono] = ((k + gerador.uniform(0.1, 0.9, offsets[-1])) * fatia)[de_poligono]
+    # Retas: o primeiro vértice fica na âncora
+    raio[(tipos[objeto] == TIPO_RETA) & (k == 0)] = 0.0
+    raio[tipos[objeto] == TIPO_PONTO] = 0.0
+
+    coords = ancoras[objeto] + raio[:, None] * np.column_stack([np.cos(angulo), np.sin(angulo)])
+    cores = gerador.integers(0, len(PALETA), size=n_objetos).astype(np.uint16)
+
+    cena = Cena()
+    cena.adotar(coords, offsets, tipos, cores, PALETA)
+    return cena
+
+
+# Window inicial que mostra o mundo inteiro com a proporção da viewport padrão
+def window_mundo(mundo=MUNDO, viewport=VIEWPORT_PADRAO):
+    x_min, y_min, x_max, y_max = mundo
+    altura = (x_max - x_min) * (viewport[3] - viewport[1]) / (viewport[2] - viewport[0])
+    return (x_min, y_min, x_max, y_min + altura)
+
+
+def salvar_cena(caminho, cena, viewport=VIEWPORT_PADRAO, window=None):
+    if window is None:
+        window = window_mundo()
+    if caminho.lower().endswith(EXTENSAO):
+        salvar_binario(caminho, cena, viewport, window)
+    else:
+        salvar_xml(caminho, cena, viewport, window, compacto=True)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Gera uma cena sintética reprodutível.")
+    parser.add_argument("n_objetos", type=int)
+    parser.add_argument("saida", help="arquivo .xml ou " + EXTENSAO)
+    parser.add_argument("--semente", type=int, default=0)
+    parser.add_argument("--proporcao", type=float, nargs=3, default=PROPORCAO, metavar=("PONTOS", "RETAS", "POLIGONOS"))
+    parser.add_argument("--vertices", type=int, nargs=2, default=VERTICES_POLIGONO, metavar=("MIN", "MAX"),
+                        help="vértices por polígono")
+    args = parser.parse_args()
+
+    cena = gerar_cena(args.n_objetos, args.semente, args.proporcao, args.vertices)
+    salvar_cena(args.saida, cena)
+    print(f"{len(cena)} objetos ({cena.n_vertices} vértices) gravados em {args.saida}")
@@ -0,0 +1,87 @@
+import time
+
+import numpy as np
+
+# Quantidade máxima de estados guardados (os mais antigos são descartados)
+LIMITE_PADRAO = 200
+# Operações iguais seguidas dentro desse intervalo (s) viram um único estado,
+# para que segurar uma tecla de movimento não encha o histórico
+INTERVALO_AGRUPAR = 0.75
+
+
+# Histórico das visões (matrizes mundo -> NCS) com desfazer/refazer e marcadores
+# com nome. Cada estado guarda só as 6 entradas não triviais da matriz; ir para
+# qualquer estado é trocar a matriz e pedir um único redesenho.
+class HistoricoVisao:
+    def __init__(self, limite=LIMITE_PADRAO, intervalo_agrupar=INTERVALO_AGRUPAR):
+        self.limite = limite
+        self.intervalo_agrupar = intervalo_agrupar
+        self._estados = []  # Visões, da mais antiga para a mais nova
+        self._atual = -1  # Posição da visão exibida em _estados
+        self._ultima_operacao = None  # (tipo, instante) do último registro
+        self.marcadores = {}  # nome -> visão
+
+    @staticmethod
+    def _compactar(matriz):
+        return tuple(np.asarray(matriz, dtype=np.float64)[:2].ravel().tolist())
+
+    @staticmethod
+    def _expandir(estado):
+        return np.array([estado[0:3], estado[3:6], (0.0, 0.0, 1.0)])
+
+    # Recomeça o histórico a partir de uma visão (por exemplo, ao abrir outra cena)
+    def reiniciar(self, matriz):
+        self._estados = [self._compactar(matriz)]
+        self._atual = 0
+        self._ultima_operacao = None
+
+    # Registra a visão resultante de uma operação; descarta o que podia ser refeito
+    def registrar(self, matriz, tipo=None):
+        estado = self._compactar(matriz)
+        instante = time.monotonic()
+        del self._estados[self._atual + 1:]
+
+        anterior = self._ultima_operacao
+        agrupar = (tipo is not None and anterior is not None and anterior[0] == tipo
+                   and instante - anterior[1] <= self.intervalo_agrupar and len(self._estados) > 1)
+        if agrupar:
+            self._estados[-1] = estado
+        elif not self._estados or self._estados[-1] != estado:
+            self._estados.append(estado)
+            if len(self._estados) > self.limite:
+                del self._estados[:len(self._estados) - self.limite]
+        self._atual = len(self._estados) - 1
+        self._ultima_operacao = (tipo, instante)
+
+    @property
+    def pode_desfazer(self):
+        return self._atual > 0
+
+    @property
+    def pode_refazer(self):
+        return self._atual < len(self._estados) - 1
+
+    # Visão anterior (None se não houver)
+    def desfazer(self):
+        if not self.pode_desfazer:
+            return None
+        self._atual -= 1
+        self._ultima_operacao = None
+        return self._expandir(self._estados[self._atual])
+
+    def refazer(self):
+        if not self.pode_refazer:
+            return None
+        self._atual += 1
+        self._ultima_operacao = None
+        return self._expandir(self._estados[self._atual])
+
+    def marcar(self, nome, matriz):
+        self.marcadores[nome] = self._compactar(matriz)
+
+    def marcador(self, nome):
+        estado = self.marcadores.get(nome)
+        return None if estado is None else self._expandir(estado)
+
+    def __len__(self):
+        return len(self._estados)
@@ -0,0 +1,178 @@
+import numpy as np
+
+# Objetos que cobrem mais células que isso ficam numa lista à parte, testada em toda consulta
+MAX_CELULAS_POR_OBJETO = 64
+
+
+# Ids ordenados e sem repetição (ordenar e comparar vizinhos sai bem mais
+# barato que o np.unique para inteiros)
+def sem_repeticao(ids):
+    ids = np.sort(ids)
+    return ids[np.concatenate([[True], ids[1:] != ids[:-1]])] if len(ids) else ids
+
+
+# Índice espacial em grade uniforme sobre as caixas envolventes dos objetos.
+# A carga em lote monta uma estrutura compacta (ids ordenados por célula, no
+# estilo CSR); inserções e remoções posteriores vão para uma camada incremental
+# que é incorporada à estrutura compacta quando cresce demais.
+class GradeUniforme:
+    def __init__(self, objetos_por_celula=8):
+        self.objetos_por_celula = objetos_por_celula
+        self.limpar()
+
+    def limpar(self):
+        self.limites = (0.0, 0.0, 1.0, 1.0)
+        self.nx = self.ny = 1
+        self._tamanho_celula = (1.0, 1.0)
+        self._caixas = np.empty((0, 4))
+        self._ativo = np.zeros(0, dtype=bool)
+        self._inicio_celula = np.zeros(2, dtype=np.int64)
+        self._ids = np.zeros(0, dtype=np.int64)
+        self._grandes = set()
+        self._array_grandes = None  # (ids ordenados, caixas) de _grandes, refeito quando o conjunto muda
+        self._inseridos = {}  # célula -> lista de ids inseridos depois da carga
+        self._n_inseridos = 0
+
+    def __len__(self):
+        return int(np.count_nonzero(self._ativo))
+
+    # Carga em lote a partir de todas as caixas da cena
+    def construir(self, cena):
+        self.construir_com_caixas(cena.caixas())
+
+    def construir_com_caixas(self, caixas):
+        caixas = np.asarray(caixas, dtype=np.float64).reshape(-1, 4)
+        validas = ~np.isnan(caixas).any(axis=1)
+
+        self._caixas = caixas.copy()
+        self._ativo = validas.copy()
+        self._grandes = set()
+        self._array_grandes = None
+        self._inseridos = {}
+        self._n_inseridos = 0
+
+        # Dimensiona a grade pela extensão da cena e pelo número de objetos
+        if np.any(validas):
+            x_min, y_min = caixas[validas, :2].min(axis=0)
+            x_max, y_max = caixas[validas, 2:].max(axis=0)
+        else:
+            x_min, y_min, x_max, y_max = 0.0, 0.0, 1.0, 1.0
+        largura = max(x_max - x_min, 1e-9)
+        altura = max(y_max - y_min, 1e-9)
+        n_celulas = max(1, min(int(np.count_nonzero(validas) / self.objetos_por_celula), 1 << 22))
+        tamanho = np.sqrt(largura * altura / n_celulas)
+        self.nx = max(1, min(int(np.ceil(largura / tamanho)), 4096))
+        self.ny = max(1, min(int(np.ceil(altura / tamanho)), 4096))
+        self.limites = (x_min, y_min, x_max, y_max)
+        self._tamanho_celula = (largura / self.nx, altura / self.ny)
+
+        ids = np.flatnonzero(validas)
+        cx0, cy0, cx1, cy1 = self._faixa_celulas(caixas[ids])
+        n_por_objeto = (cx1 - cx0 + 1) * (cy1 - cy0 + 1)
+
+        grandes = n_por_objeto > MAX_CELULAS_POR_OBJETO
+        self._grandes = set(ids[grandes].tolist())
+        ids, cx0, cy0, cx1, cy1, n_por_objeto = (
+            a[~grandes] for a in (ids, cx0, cy0, cx1, cy1, n_por_objeto))
+
+        # Expande cada objeto em pares (objeto, célula) e ordena por célula
+        objeto_do_par = np.repeat(np.arange(len(ids)), n_por_objeto)
+        primeiro_par = np.concatenate([[0], np.cumsum(n_por_objeto)[:-1]]).astype(np.int64)
+        k = np.arange(len(objeto_do_par)) - primeiro_par[objeto_do_par]
+        largura_faixa = (cx1 - cx0 + 1)[objeto_do_par]
+        cx = cx0[objeto_do_par] + k % largura_faixa
+        cy = cy0[objeto_do_par] + k // largura_faixa
+        celulas = cy * self.nx + cx
+
+        ordem = np.argsort(celulas, kind="stable")
+        self._ids = ids[objeto_do_par[ordem]]
+        contagem = np.bincount(celulas, minlength=self.nx * self.ny)
+        self._inicio_celula = np.concatenate([[0], np.cumsum(contagem)]).astype(np.int64)
+
+    def _faixa_celulas(self, caixas):
+        x_min, y_min = self.limites[0], self.limites[1]
+        tx, ty = self._tamanho_celula
+        cx0 = np.clip(np.floor((caixas[:, 0] - x_min) / tx), 0, self.nx - 1).astype(np.int64)
+        cy0 = np.clip(np.floor((caixas[:, 1] - y_min) / ty), 0, self.ny - 1).astype(np.int64)
+        cx1 = np.clip(np.floor((caixas[:, 2] - x_min) / tx), 0, self.nx - 1).astype(np.int64)
+        cy1 = np.clip(np.floor((caixas[:, 3] - y_min) / ty), 0, self.ny - 1).astype(np.int64)
+        return cx0, cy0, cx1, cy1
+
+    # Inserção incremental de um objeto (ou atualização da caixa de um já existente)
+    def inserir(self, indice, caixa):
+        if indice >= len(self._caixas):
+            capacidade = max(2 * len(self._caixas), indice + 1)
+            caixas = np.full((capacidade, 4), np.nan)
+            caixas[:len(self._caixas)] = self._caixas
+            ativo = np.zeros(capacidade, dtype=bool)
+            ativo[:len(self._ativo)] = self._ativo
+            self._caixas, self._ativo = caixas, ativo
+
+        caixa = np.asarray(caixa, dtype=np.float64)
+        self._grandes.discard(indice)
+        self._array_grandes = None
+        self._caixas[indice] = caixa
+        self._ativo[indice] = not np.isnan(caixa).any()
+        if not self._ativo[indice]:
+            return
+
+        cx0, cy0, cx1, cy1 = (int(c[0]) for c in self._faixa_celulas(caixa[None, :]))
+        if (cx1 - cx0 + 1) * (cy1 - cy0 + 1) > MAX_CELULAS_POR_OBJETO:
+            self._grandes.add(indice)
+        else:
+            for cy in range(cy0, cy1 + 1):
+                for cx in range(cx0, cx1 + 1):
+                    self._inseridos.setdefault(cy * self.nx + cx, []).append(indice)
+            self._n_inseridos += 1
+
+        # Muitas inserções fora da estrutura compacta: reconstrói tudo
+        if self._n_inseridos > max(1024, len(self._ids) // 4):
+            self.construir_com_caixas(np.where(self._ativo[:, None], self._caixas, np.nan))
+
+    # Remoção incremental: as entradas antigas ficam na grade, mas são filtradas pelo _ativo
+    def remover(self, indice):
+        if indice < len(self._ativo):
+            self._ativo[indice] = False
+            self._grandes.discard(indice)
+            self._array_grandes = None
+
+    # Devolve (ordenados) os ids dos objetos cuja caixa envolvente intersecta a caixa dada
+    def consultar(self, caixa):
+        x_min, y_min, x_max, y_max = caixa
+        caixa = np.array([[min(x_min, x_max), min(y_min, y_max), max(x_min, x_max), max(y_min, y_max)]])
+        cx0, cy0, cx1, cy1 = (int(c[0]) for c in self._faixa_celulas(caixa))
+
+        # Em cada linha da grade as células consultadas são contíguas na estrutura compacta
+        partes = [self._ids[self._inicio_celula[cy * self.nx + cx0]:self._inicio_celula[cy * self.nx + cx1 + 1]]
+                  for cy in range(cy0, cy1 + 1)]
+        if self._inseridos:
+            for cy in range(cy0, cy1 + 1):
+                for cx in range(cx0, cx1 + 1):
+                    inseridos = self._inseridos.get(cy * self.nx + cx)
+                    if inseridos:
+                        partes.append(np.array(inseridos, dtype=np.int64))
+        if partes:
+            candidatos = sem_repeticao(np.concatenate(partes))
+            candidatos = self._refinar(candidatos[self._ativo[candidatos]], caixa[0])
+        else:
+            candidatos = np.zeros(0, dtype=np.int64)
+
+        # Os grandes são poucos: testados direto pela caixa, sem passar pelo unique
+        if self._grandes:
+            if self._array_grandes is None:
+                ids = np.array(sorted(self._grandes), dtype=np.int64)
+                self._array_grandes = (ids, self._caixas[ids])
+            ids, caixas = self._array_grandes
+            grandes = ids[self._intersectam(caixas, caixa[0])]
+            if len(grandes):
+                candidatos = sem_repeticao(np.concatenate([candidatos, grandes]))
+        return candidatos
+
+    # Refinamento pelas caixas atuais dos objetos
+    def _refinar(self, ids, caixa):
+        return ids[self._intersectam(self._caixas[ids], caixa)]
+
+    @staticmethod
+    def _intersectam(caixas, caixa):
+        return ((caixas[:, 0] <= caixa[2]) & (caixas[:, 2] >= caixa[0]) &
+                (caixas[:, 1] <= caixa[3]) & (caixas[:, 3] >= caixa[1]))
@@ -0,0 +1,72 @@
+# Procedimentos Tcl que aplicam uma lista inteira de itens num só comando. As
+# listas vão do Python para o Tcl como listas nativas (números continuam
+# números), sem montar texto de script.
+PROCEDIMENTOS = """
+proc lote_criar {w tipo opcoes lista} {
+    set id {}
+    foreach coords $lista {set id [$w create $tipo $coords {*}$opcoes]}
+    return $id
+}
+proc lote_coords {w lista} {
+    foreach {item coords} $lista {$w coords $item $coords}
+}
+proc lote_configurar {w lista} {
+    foreach {item opcao valor} $lista {$w itemconfigure $item $opcao $valor}
+}
+"""
+
+
+# Comandos para um canvas acumulados e enviados ao interpretador Tcl em lotes,
+# em vez de uma chamada do tkinter (conversão de opções e ida e volta ao Tcl)
+# por item. As criações são agrupadas por tipo e estilo e cada grupo vira uma
+# única chamada; atualizações de coordenadas, trocas de cor e remoções também
+# saem numa chamada cada.
+class LoteCanvas:
+    def __init__(self, canvas):
+        self.canvas = canvas
+        self._caminho = str(canvas)  # Nome do widget no Tcl (o comando do canvas)
+        canvas.tk.eval(PROCEDIMENTOS)
+        self._grupos = {}  # (tipo do item, opções) -> ([chave, ...], [coords, ...])
+        self._coords = []  # item, coords, item, coords, ...
+        self._configurar = []  # item, opção, valor, ...
+        self._apagar = []
+
+    # opcoes: tupla com as opções do item (ex.: ("-fill", "red", "-tags", "cena")),
+    # comum ao grupo; chave identifica o item na resposta do enviar
+    def criar(self, tipo, coords, opcoes, chave):
+        grupo = self._grupos.get((tipo, opcoes))
+        if grupo is None:
+            grupo = self._grupos[(tipo, opcoes)] = ([], [])
+        grupo[0].append(chave)
+        grupo[1].append(coords)
+
+    def mover_para(self, item, coords):
+        self._coords += (item, coords)
+
+    def configurar(self, item, opcao, valor):
+        self._configurar += (item, opcao, valor)
+
+    def apagar(self, item):
+        self._apagar.append(item)
+
+    # Executa os comandos acumulados e devolve {chave: id do item} dos criados.
+    # O canvas numera os itens em sequência, então os criados por um mesmo
+    # lote_criar têm ids consecutivos e o último id basta para saber os demais.
+    def enviar(self):
+        tk, caminho = self.canvas.tk, self._caminho
+        if self._apagar:
+            tk.call(caminho, "delete", *self._apagar)
+            self._apagar = []
+        if self._coords:
+            tk.call("lote_coords", caminho, self._coords)
+            self._coords = []
+        if self._configurar:
+            tk.call("lote_configurar", caminho, self._configurar)
+            self._configurar = []
+
+        criados = {}
+        for (tipo, opcoes), (chaves, coords) in self._grupos.items():
+            primeiro = int(tk.call("lote_criar", caminho, tipo, opcoes, coords)) - len(chaves) + 1
+            criados.update(zip(chaves, range(primeiro, primeiro + len(chaves))))
+        self._grupos = {}
+        return criados
@@ -1,39 +1,68 @@
 import tkinter as tk
-from tkinter import filedialog, messagebox
-import xml.etree.ElementTree as et
-from xml.dom import minidom
+from tkinter import filedialog, messagebox, simpledialog
 import math
 
-# Classes para os objetos geométricos
-class Ponto:
-    def __init__(self, x, y, cor="black"):
-        self.coordenadas_mundo = (x, y)  # Coordenadas no mundo
-        self.coordenadas_ncs = None  # Coordenadas no NCS (serão calculadas depois)
-        self.visivel = True  # Inicialmente, o ponto é visível
-        self.cor = cor  # Cor do ponto
-
-class Reta:
-    def __init__(self, x1, y1, x2, y2, cor="blue"):
-        self.coordenadas_mundo = [(x1, y1), (x2, y2)]  # Coordenadas dos dois pontos da reta
-        self.coordenadas_ncs = None  # Coordenadas no NCS
-        self.visivel = True  # Inicialmente, a reta é visível
-        self.cor = cor  # Cor da reta
-
-class Poligono:
-    def __init__(self, vertices, cor="green"):
-        self.coordenadas_mundo = vertices  # Lista de vértices do polígono
-        self.coordenadas_ncs = None  # Coordenadas no NCS
-        self.visivel = True  # Inicialmente, o polígono é visível
-        self.cor = cor  # Cor do polígono
+import numpy as np
+
+from agendador import AgendadorRedesenho, FPS_PADRAO
+from alimentacao import ServidorAlimentacao, consolidar, PORTA_PADRAO
+from animacao import AnimadorVisao
+from arquivo_binario import carregar_cena, salvar_binario, converter_xml_para_binario, EXTENSAO
+from arquivo_xml import salvar_xml
+from cena import Cena, ObjetoGeometrico, Ponto, Reta, Poligono, TIPO_PONTO, TIPO_RETA, TIPO_POLIGONO, faixas
+from edicao import EdicoesPendentes
+from historico import HistoricoVisao
+from indice_espacial import GradeUniforme
+from minimapa import Minimapa
+from paginacao import MundoPaginado, particionar_mundo, EXTENSAO_MUNDO
+from perfilador import Perfilador, PainelDesempenho
+from preparacao import PreparadorQuadros
+from recorte import aplicar_recorte, recortar_objetos, substituir_recortes
+from renderizador import RenderizadorRetido
+from renderizador_quadro import RenderizadorQuadro
+from renderizador_blocos import RenderizadorBlocos
+from selecao import escolher_objeto, TOLERANCIA_PADRAO
+from simplificacao import CacheNiveisDetalhe
+from transformacoes import (matriz_window_ncs, matriz_ncs_viewport, aplicar_matriz,
+                            translacao, escala, rotacao, cantos_window)
+
+# Quantos níveis de detalhe mais grosseiros os quadros provisórios (animação, arraste) usam
+NIVEIS_GROSSEIROS = 3
+# Fator de zoom de cada passo da roda do mouse
+FATOR_RODA = 1.1
+# Fator de zoom dos botões; o zoom_out usa o inverso, para que ir e voltar
+# retorne exatamente à escala anterior (e aos blocos já em cache)
+FATOR_ZOOM = 1.1
+
+TIPOS_ARQUIVO = [("Cenas", "*.xml *" + EXTENSAO + " *" + EXTENSAO_MUNDO), ("Arquivos XML", "*.xml"),
+                 ("Cena binária", "*" + EXTENSAO), ("Mundo paginado", "*" + EXTENSAO_MUNDO)]
+
+
+# Lê uma cena de um arquivo XML, binário ou de um mundo paginado e monta o seu
+# índice espacial, sem tocar na interface (pode rodar em segundo plano).
+# Devolve (cena, índice, viewport, window, mundo paginado ou None).
+def ler_cena(caminho, progresso=None):
+    if caminho.lower().endswith(EXTENSAO_MUNDO):
+        # Mundo paginado: só os setores em volta da window inicial
+        mundo = MundoPaginado(caminho)
+        cena, indice = mundo.montar(mundo.ler(mundo.window, progresso))
+        return cena, indice, mundo.viewport, mundo.window, mundo
+    cena = Cena()
+    viewport, window = carregar_cena(caminho, cena, progresso)
+    indice = GradeUniforme()
+    indice.construir(cena)
+    return cena, indice, viewport, window, None
 
 
 class Visualizador:
-    def __init__(self, root):
+    def __init__(self, root, fps=FPS_PADRAO):
         self.root = root
         self.root.title("Visualizador de Objetos 2D")
 
         self.window_original = (0, 0, 10, 7.5)
-        self.window = self.window_original;
+        self.window = self.window_original
+        self.historico = HistoricoVisao()  # Visões anteriores para desfazer/refazer
+        self.historico.reiniciar(self.matriz_visao)
 
         menu = tk.Menu(root)
         root.config(menu=menu)
@@ -41,6 +70,31 @@ class Visualizador:
         menu.add_cascade(label="Arquivo", menu=file_menu)
         file_menu.add_command(label="Abrir", command=self.abrir_arquivo)
         file_menu.add_command(label="Salvar", command=self.salvar_arquivo)
+        file_menu.add_command(label="Converter XML para binário", command=self.converter_arquivo)
+        file_menu.add_command(label="Particionar cena em mundo paginado", command=self.particionar_arquivo)
+        file_menu.add_command(label="Receber cena ao vivo...", command=self.abrir_alimentacao)
+        file_menu.add_command(label="Parar cena ao vivo", command=self.encerrar_alimentacao)
+        file_menu.add_command(label="Salvar trace de desempenho", command=self.salvar_trace)
+        exibir_menu = tk.Menu(menu, tearoff=0)
+        menu.add_cascade(label="Exibir", menu=exibir_menu)
+        self.modo_renderizacao = tk.StringVar(value="canvas")
+        exibir_menu.add_radiobutton(label="Itens do canvas", variable=self.modo_renderizacao, value="canvas",
+                                    command=self.trocar_renderizador)
+        exibir_menu.add_radiobutton(label="Quadro rasterizado", variable=self.modo_renderizacao, value="quadro",
+                                    command=self.trocar_renderizador)
+        exibir_menu.add_radiobutton(label="Blocos em cache", variable=self.modo_renderizacao, value="blocos",
+                                    command=self.trocar_renderizador)
+        self.preencher_poligonos = tk.BooleanVar(value=False)
+        exibir_menu.add_checkbutton(label="Preencher polígonos (quadro rasterizado/blocos)",
+                                    variable=self.preencher_poligonos, command=self.trocar_renderizador)
+        exibir_menu.add_command(label="Painel de desempenho (F3)", command=self.alternar_painel)
+        visao_menu = tk.Menu(menu, tearoff=0)
+        menu.add_cascade(label="Visão", menu=visao_menu)
+        visao_menu.add_command(label="Desfazer (Ctrl+Z)", command=self.desfazer_visao)
+        visao_menu.add_command(label="Refazer (Ctrl+Y)", command=self.refazer_visao)
+        visao_menu.add_command(label="Salvar marcador...", command=self.salvar_marcador)
+        self.menu_marcadores = tk.Menu(visao_menu, tearoff=0)
+        visao_menu.add_cascade(label="Marcadores", menu=self.menu_marcadores)
 
         frame_principal = tk.Frame(root, bg="darkgray")
         frame_principal.pack(fill="both", expand=True)
@@ -48,15 +102,41 @@ class Visualizador:
         self.canvas.pack(side="left", fill="both", expand=True)
         self.minimap = tk.Canvas(frame_principal, width=150, height=120, bg="lightgrey")
         self.minimap.pack(side="right", padx=10, pady=10)
+        self.renderizador = RenderizadorRetido(self.canvas)  # Itens do canvas reaproveitados entre quadros
+        self.minimapa = Minimapa(self.minimap)  # Cena rasterizada uma vez; por quadro só move a window
+        self.perfilador = Perfilador()  # Tempos por etapa dos últimos quadros
+        self.painel = PainelDesempenho(self.canvas, self.perfilador)
 
         self.criar_interface_movimentacao()
         self.criar_interface_rotacao()
         self.criar_interface_zoom()
         self.criar_interface_reset()
+        self.status = tk.Label(root, text="", anchor="w")  # Objeto sob o cursor / selecionado
+        self.status.pack(side="bottom", fill="x")
 
-        self.window = (0, 0, 10, 7.5)
         self.viewport = (0, 0, 800, 600)
-        self.objetos = []  # Lista de objetos (Ponto, Reta, Polígono)
+        self.objetos = Cena()  # Objetos (Ponto, Reta, Polígono) guardados em arrays
+        self.preparador = PreparadorQuadros(root)  # Carga e recorte em segundo plano
+        self.indice = GradeUniforme()  # Índice espacial para consultar só o que está na window
+        self.lod = CacheNiveisDetalhe(executor=self.preparador.executor)  # Polígonos simplificados por zoom
+        self.agendador = AgendadorRedesenho(root, self.redesenhar, fps)  # No máximo um redesenho por quadro
+        # Uma animação interrompida (tecla, arraste, reset...) deixa de pedir quadros
+        # provisórios: o próximo quadro é completo
+        self.animador = AnimadorVisao(root, self._passo_animacao, self._fim_animacao, self.agendador.intervalo,
+                                      interromper=self._pedir_quadro)
+        self._quadro_rapido = False  # Próximo quadro pode ser provisório (em movimento)
+        self._arraste = None  # Última posição do mouse durante um arraste
+        self._arrastou = False
+        self.edicoes = EdicoesPendentes()  # Objetos editados desde o último quadro
+        self.paginado = None  # MundoPaginado aberto (só os setores perto da window ficam na memória)
+        self._paginando = False  # Setores sendo carregados em segundo plano
+        self.alimentacao = None  # ServidorAlimentacao recebendo a cena ao vivo
+        self._id_alimentacao = None
+        self._ids_alimentacao = {}  # id do objeto ao vivo -> índice na cena
+        self._quadro_exibido = None  # (matriz mundo -> viewport, nível de detalhe) do último quadro completo
+        self.destacado = None  # Índice do objeto sob o cursor
+        self.selecionado = None  # Índice do último objeto clicado
+        self._item_destaque = None
         self.mover_window = 1
 
         # teclas de atalho
@@ -64,158 +144,517 @@ class Visualizador:
         self.root.bind("<Right>", lambda e: self.mover_window_direcao(self.mover_window, 0))  # → para mover à direita
         self.root.bind("<Up>", lambda e: self.mover_window_direcao(0, self.mover_window))  # ↑ para mover para cima
         self.root.bind("<Down>", lambda e: self.mover_window_direcao(0, -self.mover_window))  # ↓ para mover para baixo
-
+        self.root.bind("<F3>", lambda e: self.alternar_painel())  # F3 mostra/esconde o painel de desempenho
+        # mouse: roda para zoom em volta do cursor, botão esquerdo para arrastar a visão
+        self.canvas.bind("<MouseWheel>", self._girar_roda)
+        self.canvas.bind("<Button-4>", self._girar_roda)
+        self.canvas.bind("<Button-5>", self._girar_roda)
+        self.canvas.bind("<ButtonPress-1>", self._iniciar_arraste)
+        self.canvas.bind("<B1-Motion>", self._arrastar)
+        self.canvas.bind("<ButtonRelease-1>", self._terminar_arraste)
+        self.canvas.bind("<Motion>", self._mover_mouse)  # destaca o objeto sob o cursor
+        self.canvas.bind("<Leave>", lambda e: self._destacar(None))
+        self.root.bind("<Control-z>", lambda e: self.desfazer_visao())  # Ctrl+Z desfaz a última mudança de visão
+        self.root.bind("<Control-y>", lambda e: self.refazer_visao())  # Ctrl+Y refaz
+        self.root.bind("<Control-Z>", lambda e: self.refazer_visao())  # Ctrl+Shift+Z também refaz
+
+    # A leitura roda em segundo plano; a cena atual continua na tela até a nova ficar pronta
     def abrir_arquivo(self):
-        caminho = filedialog.askopenfilename(filetypes=[("Arquivos XML", "*.xml")])
+        caminho = filedialog.askopenfilename(filetypes=TIPOS_ARQUIVO)
         if caminho:
-            if not self.carregar_arquivo(caminho):
-                messagebox.showerror("Erro", "Falha ao carregar o arquivo.")
-            else:
-                self.desenhar_viewport()
-                self.desenhar_minimapa()
+            inicio = self.perfilador.agora()
+            self._paginando = False  # A nova carga cancela a dos setores
+            self.preparador.carregar(lambda progresso: ler_cena(caminho, progresso),
+                                     lambda lida: self._cena_carregada(lida, inicio),
+                                     self._falha_carregar, self._mostrar_progresso)
+
+    def _cena_carregada(self, lida, inicio):
+        self.usar_cena(*lida)
+        self.perfilador.registrar_evento("carregar_arquivo", inicio, self.perfilador.agora(),
+                                         objetos=len(self.objetos), vertices=self.objetos.n_vertices)
+        self.agendador.agora()
+        self.root.title("Visualizador de Objetos 2D")
+
+    def _falha_carregar(self, erro):
+        print(f"Erro ao carregar o arquivo: {erro}")
+        self.root.title("Visualizador de Objetos 2D")
+        messagebox.showerror("Erro", "Falha ao carregar o arquivo.")
+
+    # Mostra o andamento da leitura no título
+    def _mostrar_progresso(self, fracao):
+        self.root.title(f"Visualizador de Objetos 2D - carregando {fracao:.0%}")
 
     def salvar_arquivo(self):
-        caminho = filedialog.asksaveasfilename(defaultextension=".xml", filetypes=[("Arquivos XML", "*.xml")])
+        caminho = filedialog.asksaveasfilename(defaultextension=".xml", filetypes=TIPOS_ARQUIVO[:3])
         if caminho:
-            self.gerar_arquivo_saida(caminho)
-
-    def carregar_arquivo(self, caminho):
+            try:
+                self.gerar_arquivo_saida(caminho)
+            except ValueError as e:
+                messagebox.showerror("Erro", str(e))
+
+    def converter_arquivo(self):
+        origem = filedialog.askopenfilename(filetypes=[("Arquivos XML", "*.xml")])
+        if not origem:
+            return
+        destino = filedialog.asksaveasfilename(defaultextension=EXTENSAO,
+                                               filetypes=[("Cena binária", "*" + EXTENSAO)])
+        if destino:
+            try:
+                n = converter_xml_para_binario(origem, destino)
+                messagebox.showinfo("Conversão", f"{n} objetos convertidos.")
+            except Exception as e:
+                messagebox.showerror("Erro", f"Falha ao converter o arquivo: {e}")
+
+    # Divide uma cena grande em setores num diretório, para abrir como mundo paginado
+    def particionar_arquivo(self):
+        origem = filedialog.askopenfilename(filetypes=TIPOS_ARQUIVO[1:3])
+        if not origem:
+            return
+        pasta = filedialog.askdirectory(title="Pasta do mundo paginado")
+        if pasta:
+            try:
+                caminho = particionar_mundo(origem, pasta)
+                messagebox.showinfo("Particionamento", f"Mundo paginado gravado em {caminho}.")
+            except Exception as e:
+                messagebox.showerror("Erro", f"Falha ao particionar o arquivo: {e}")
+
+    def carregar_arquivo(self, caminho, progresso=None):
         try:
-            self.objetos.clear()
-            tree = et.parse(caminho)
-            root = tree.getroot()
-
-            self.viewport = self._carregar_viewport(root)
-            self.window = self._carregar_window(root)
-
-            self.objetos.extend(self._carregar_objetos(root))
-
+            inicio = self.perfilador.agora()
+            self.usar_cena(*ler_cena(caminho, progresso))
+            self.perfilador.registrar_evento("carregar_arquivo", inicio, self.perfilador.agora(),
+                                             objetos=len(self.objetos), vertices=self.objetos.n_vertices)
             return True
         except Exception as e:
             print(f"Erro ao carregar o arquivo: {e}")
             return False
 
-    def _carregar_viewport(self, root):
-        vpmin = root.find("./viewport/vpmin")
-        vpmax = root.find("./viewport/vpmax")
-        if vpmin is not None and vpmax is not None:
-            return (float(vpmin.get("x")), float(vpmin.get("y")),
-                    float(vpmax.get("x")), float(vpmax.get("y")))
-        return (0, 0, 800, 600)
-
-    def _carregar_window(self, root):
-        wmin = root.find("./window/wmin")
-        wmax = root.find("./window/wmax")
-        if wmin is not None and wmax is not None:
-            return (float(wmin.get("x")), float(wmin.get("y")),
-                    float(wmax.get("x")), float(wmax.get("y")))
-        return (0, 0, 10, 7.5)
-
-    def _carregar_objetos(self, root):
-        objetos = []
-        
-        # Carregar pontos
-        for ponto in root.findall("ponto"):
-            x = float(ponto.get("x"))
-            y = float(ponto.get("y"))
-            cor = ponto.get("cor", "black")  # Se não houver cor definida, será "black"
-            objetos.append(Ponto(x, y, cor))
-        
-        # Carregar retas
-        for reta in root.findall("reta"):
-            pontos_reta = [(float(p.get("x")), float(p.get("y"))) for p in reta.findall("ponto")]
-            if len(pontos_reta) == 2:
-                cor = reta.get("cor", "blue")  # Se não houver cor definida, será "blue"
-                objetos.append(Reta(pontos_reta[0][0], pontos_reta[0][1], pontos_reta[1][0], pontos_reta[1][1], cor))
-        
-        # Carregar polígonos
-        for poligono in root.findall("poligono"):
-            pontos_poligono = [(float(p.get("x")), float(p.get("y"))) for p in poligono.findall("ponto")]
-            cor = poligono.get("cor", "green")  # Se não houver cor definida, será "green"
-            objetos.append(Poligono(pontos_poligono, cor))
-        
-        return objetos
+    # Troca a cena exibida pela recém-lida. A Cena continua sendo o mesmo objeto
+    # (só adota os arrays da nova), então quem guarda referência a ela segue valendo.
+    def usar_cena(self, cena, indice, viewport, window, paginado=None):
+        self.paginado = paginado
+        self._paginando = False
+        self._trocar_objetos(cena, indice)
+        self._ids_alimentacao = {}
+        self.viewport = viewport
+        self.window = window
+        self.historico.reiniciar(self.matriz_visao)
+
+    # Os índices dos objetos mudam: quadros, itens e seleção da cena anterior são descartados
+    def _trocar_objetos(self, cena, indice):
+        self.preparador.invalidar()
+        self.renderizador.limpar()
+        self.edicoes.retirar()
+        self._quadro_exibido = None
+        self.destacado = self.selecionado = None
+        self.objetos.adotar(cena.coords, cena.offsets, cena.tipos, cena.cores, cena.paleta)
+        self.indice = indice
+        self.lod.agendar(self.objetos)  # Níveis de detalhe calculados em segundo plano
+
+    # Mundo paginado: quando a window se aproxima de setores fora da memória,
+    # eles são lidos em segundo plano e só então acrescentados à cena exibida
+    # (e os menos usados, descartados). A margem em volta da window faz isso
+    # acontecer antes de a window chegar aos setores novos.
+    def _paginar(self):
+        mundo = self.paginado
+        if self._paginando or self.preparador.carregando or not mundo.precisa_atualizar(self.window):
+            return
+        self._paginando = True
+        window = self.window
+        inicio = self.perfilador.agora()
+        self.preparador.carregar(lambda progresso: mundo.ler(window, progresso),
+                                 lambda lido: self._setores_carregados(mundo, lido, inicio),
+                                 self._falha_paginar)
+
+    def _setores_carregados(self, mundo, lido, inicio):
+        self._paginando = False
+        if mundo is not self.paginado:
+            return
+        self._descartar_quadro_em_preparo()
+        cena, indice, mudaram = mundo.aplicar(self.objetos, self.indice, lido)
+        if cena is not None:
+            self._trocar_objetos(cena, indice)
+        else:
+            # Só os setores que entraram ou saíram mudaram: os itens, blocos e
+            # níveis de detalhe dos demais continuam valendo
+            if self.destacado is not None and self.objetos.removidos[self.destacado]:
+                self.destacado = None
+            if self.selecionado is not None and self.objetos.removidos[self.selecionado]:
+                self.selecionado = None
+            if self.renderizador.recorte_proprio:
+                for caixa in mudaram.tolist():
+                    self.renderizador.invalidar_regiao(caixa)
+            self.lod.agendar(self.objetos)
+        self.perfilador.registrar_evento("paginar", inicio, self.perfilador.agora(), setores=len(mundo.carregados),
+                                         objetos=len(self.objetos), memoria=mundo.memoria_usada)
+        self.agendador.marcar()
+
+    def _falha_paginar(self, erro):
+        self._paginando = False
+        print(f"Erro ao carregar setores do mundo: {erro}")
+
+    # A window é guardada como uma única matriz de visão homogênea (mundo -> NCS),
+    # que compõe translação, escala e rotação em torno do centro da window.
+    # self.window é a caixa alinhada aos eixos que contém a window (rotacionada ou não).
+    @property
+    def window(self):
+        return self._window
+
+    @window.setter
+    def window(self, window):
+        self.matriz_visao = matriz_window_ncs(window)
+        self._window = tuple(window)
+
+    # Recalcula a caixa da window depois de uma mudança incremental da matriz de visão
+    def _atualizar_window(self):
+        cantos = np.round(cantos_window(self.matriz_visao), 12)
+        x_min, y_min = cantos.min(axis=0).tolist()
+        x_max, y_max = cantos.max(axis=0).tolist()
+        self._window = (x_min, y_min, x_max, y_max)
+
+    # Matriz mundo -> viewport do quadro atual
+    def matriz_mundo_viewport(self):
+        return matriz_ncs_viewport(self.viewport) @ self.matriz_visao
 
     def window2viewport(self, ponto):
-        x, y = ponto
-        wx_min, wy_min, wx_max, wy_max = self.window
-        vx_min, vy_min, vx_max, vy_max = self.viewport
-
-        sx = (vx_max - vx_min) / (wx_max - wx_min)
-        sy = (vy_max - vy_min) / (wy_max - wy_min)
-
-        vx = vx_min + (x - wx_min) * sx
-        vy = vy_min + (wy_max - y) * sy
+        vx, vy = self.window2viewport_lote([ponto])[0]
         return vx, vy
 
-    def desenhar_viewport(self):
-        self.canvas.delete("all")
-        
-        for objeto in self.objetos:
-            if not objeto.visivel:
-                continue  # Não desenha objetos invisíveis após clipping
-
-            # Desenhar pontos
-            if isinstance(objeto, Ponto):
-                x_vp, y_vp = self.window2viewport(objeto.coordenadas_mundo)
-                self.canvas.create_oval(x_vp - 2, y_vp - 2, x_vp + 2, y_vp + 2, fill=objeto.cor)
-            
-            # Desenhar retas
-            elif isinstance(objeto, Reta):
-                p1 = self.window2viewport(objeto.coordenadas_mundo[0])
-                p2 = self.window2viewport(objeto.coordenadas_mundo[1])
-                self.canvas.create_line(p1[0], p1[1], p2[0], p2[1], fill=objeto.cor)
-            
-            # Desenhar polígonos
-            elif isinstance(objeto, Poligono):
-                pontos_vp = [self.window2viewport(p) for p in objeto.coordenadas_mundo]
-                self.canvas.create_polygon(pontos_vp, outline=objeto.cor, fill="", width=2)
-
-    def desenhar_minimapa(self):
-        self.minimap.delete("all")
-
-        mini_vp_min_x, mini_vp_min_y, mini_vp_max_x, mini_vp_max_y = 0, 0, 150, 120
-        mini_width = mini_vp_max_x - mini_vp_min_x
-        mini_height = mini_vp_max_y - mini_vp_min_y
-
-        mundo_min_x, mundo_min_y = 0, 0
-        mundo_max_x, mundo_max_y = 25, 18.75
-
-        world_width = mundo_max_x - mundo_min_x
-        world_height = mundo_max_y - mundo_min_y
-        scale_x = mini_width / world_width
-        scale_y = mini_height / world_height
-
-        rect_min_x = mini_vp_min_x + (self.window[0] - mundo_min_x) * scale_x
-        rect_min_y = mini_height - (self.window[1] - mundo_min_y) * scale_y
-        rect_max_x = mini_vp_min_x + (self.window[2] - mundo_min_x) * scale_x
-        rect_max_y = mini_height - (self.window[3] - mundo_min_y) * scale_y
-
-        self.minimap.create_rectangle(
-            rect_min_x, rect_min_y, rect_max_x, rect_max_y,
-            outline="black", fill="", width=1, dash=(1,2)
-        )
-
-        for objeto in self.objetos:
-            if isinstance(objeto, Ponto):
-                # Desenhando ponto no minimapa
-                x, y = objeto.coordenadas_mundo
-                x_mini = mini_vp_min_x + (x - mundo_min_x) * scale_x
-                y_mini = mini_height - (y - mundo_min_y) * scale_y
-                self.minimap.create_oval(x_mini - 1, y_mini - 1, x_mini + 1, y_mini + 1, fill="black")
-            
-            elif isinstance(objeto, Reta):
-                # Desenhando reta no minimapa
-                p1, p2 = objeto.coordenadas_mundo
-                p1_mini = (mini_vp_min_x + (p1[0] - mundo_min_x) * scale_x, mini_height - (p1[1] - mundo_min_y) * scale_y)
-                p2_mini = (mini_vp_min_x + (p2[0] - mundo_min_x) * scale_x, mini_height - (p2[1] - mundo_min_y) * scale_y)
-                self.minimap.create_line(p1_mini[0], p1_mini[1], p2_mini[0], p2_mini[1], fill="blue")
-            
-            elif isinstance(objeto, Poligono):
-                # Desenhando polígono no minimapa
-                pontos_mini = [(mini_vp_min_x + (x - mundo_min_x) * scale_x, mini_height - (y - mundo_min_y) * scale_y) for x, y in objeto.coordenadas_mundo]
-                self.minimap.create_polygon(pontos_mini, outline="red", fill="", width=1)
+    # Transforma vários pontos de uma vez; a matriz pode ser reaproveitada no mesmo quadro
+    def window2viewport_lote(self, pontos, matriz=None):
+        if matriz is None:
+            matriz = self.matriz_mundo_viewport()
+        return aplicar_matriz(matriz, pontos)
+
+    # niveis_extra > 0 usa polígonos mais simplificados que o necessário (quadros provisórios)
+    def desenhar_viewport(self, niveis_extra=0):
+        cena = self.objetos
+
+        # Só os objetos cuja caixa envolvente toca a window são recortados no NCS
+        # (preenchendo visivel e coordenadas_ncs); o que sobrou vai para a viewport.
+        # Polígonos grandes usam a versão simplificada com erro menor que um pixel.
+        matriz_ncs = self.matriz_visao
+        matriz_vp = matriz_ncs_viewport(self.viewport)
+        matriz = matriz_vp @ matriz_ncs
+        if self.renderizador.recorte_proprio:
+            self.desenhar_blocos(matriz_vp, matriz)
+            return
+        with self.perfilador.etapa("consulta"):
+            candidatos = self.indice.consultar(self.window)
+        nivel = self.lod.nivel_para(matriz)
+        if niveis_extra:
+            nivel = min(self.lod.max_nivel, (-1 if nivel is None else nivel) + niveis_extra)
+
+        # Cenas grandes são recortadas em blocos em segundo plano; o quadro atual
+        # fica na tela até o novo estar completo
+        quadro = self.perfilador.quadro_atual
+        inicio = self.perfilador.agora()
+        self.preparador.preparar(cena, matriz_ncs, candidatos, self.lod, nivel,
+                                 lambda recorte: self._exibir_quadro(recorte, matriz_vp, matriz, quadro, inicio))
+
+    # Renderizador por blocos: cada bloco que falta consulta o índice, recorta e
+    # rasteriza a sua parte do mundo; os demais vêm do cache, sem recorte da window
+    def desenhar_blocos(self, matriz_vp, matriz):
+        self.preparador.cancelar_quadro()
+        renderizador = self.renderizador
+        rasterizados = renderizador.rasterizados
+        with self.perfilador.etapa("renderizar"):
+            renderizador.desenhar(self.objetos, None, matriz_vp, matriz)
+        self.perfilador.contar(objetos=len(self.objetos), vertices=self.objetos.n_vertices,
+                               itens=renderizador.n_itens, blocos_rasterizados=renderizador.rasterizados - rasterizados)
+
+    def _exibir_quadro(self, recorte, matriz_vp, matriz, quadro=None, inicio=None):
+        perfilador = self.perfilador
+        if inicio is not None:
+            perfilador.registrar_etapa("recorte", inicio, perfilador.agora(), quadro)
+        aplicar_recorte(self.objetos, recorte)
+        self._quadro_exibido = (matriz, recorte.nivel_detalhe)
+
+        # Os itens do canvas são mantidos: só entram/saem os objetos que mudaram de visibilidade
+        with perfilador.etapa("renderizar", quadro):
+            self.renderizador.desenhar(self.objetos, recorte, matriz_vp, matriz)
+        perfilador.contar(quadro, objetos=len(self.objetos), vertices=self.objetos.n_vertices,
+                          candidatos=len(recorte.indices), visiveis=int(recorte.visivel.sum()),
+                          itens=self.renderizador.n_itens)
+        self.desenhar_destaque()
+        self.painel.atualizar()
+
+    # Alterna entre um item do canvas por objeto, um único quadro rasterizado
+    # (melhor para cenas com muitos objetos visíveis) e blocos rasterizados em
+    # cache (melhor para navegar por mundos grandes)
+    def trocar_renderizador(self):
+        self.renderizador.limpar()
+        self._quadro_exibido = None
+        if self.modo_renderizacao.get() == "quadro":
+            self.renderizador = RenderizadorQuadro(self.canvas, preencher=self.preencher_poligonos.get())
+        elif self.modo_renderizacao.get() == "blocos":
+            self.renderizador = RenderizadorBlocos(self.canvas, lambda caixa: self.indice.consultar(caixa), self.lod,
+                                                   preencher=self.preencher_poligonos.get())
+        else:
+            self.renderizador = RenderizadorRetido(self.canvas)
+        self.agendador.marcar()
+
+    # Redesenho completo; chamado pelo agendador, uma vez por quadro
+    def redesenhar(self):
+        rapido = self._quadro_rapido
+        self._quadro_rapido = False
+        editados, regiao = self.edicoes.retirar() if self.edicoes else (None, None)
+        if self.paginado is not None and not rapido:
+            self._paginar()
+        if regiao is not None and self.renderizador.recorte_proprio:
+            self.renderizador.invalidar_regiao(regiao)
+        self.perfilador.iniciar_quadro()
+        if rapido:
+            self.desenhar_provisorio(editados is not None)
+        elif editados is not None and self._pode_desenhar_edicoes():
+            self.desenhar_edicoes(editados, regiao)
+        else:
+            self.desenhar_viewport()
+        self.desenhar_minimapa(editados, regiao)
+        self.desenhar_destaque()
+        self.perfilador.terminar_quadro()
+        self.painel.atualizar()
+
+    # Quadro barato enquanto a visão se move: transforma o que já está na tela
+    # (ou, se não der ou a cena foi editada, desenha com menos detalhe); o
+    # quadro completo vem quando parar
+    def desenhar_provisorio(self, editada=False):
+        transformado = False
+        if not editada:
+            with self.perfilador.etapa("provisorio"):
+                transformado = self.renderizador.transformar_rapido(self.matriz_mundo_viewport())
+        if not transformado:
+            self.desenhar_viewport(NIVEIS_GROSSEIROS)
+
+    # Edições só podem ser desenhadas à parte sobre um quadro completo na visão atual
+    def _pode_desenhar_edicoes(self):
+        exibido = self._quadro_exibido
+        if exibido is None or self.objetos.recorte is None or self.preparador.preparando:
+            return False
+        matriz = self.matriz_mundo_viewport()
+        return np.array_equal(exibido[0], matriz) and exibido[1] == self.lod.nivel_para(matriz)
+
+    # Quadro das edições: recorta só os objetos editados, troca as suas entradas
+    # no recorte do quadro exibido e atualiza só os itens (ou pixels) deles
+    def desenhar_edicoes(self, editados, regiao):
+        cena = self.objetos
+        matriz_ncs = self.matriz_visao
+        matriz_vp = matriz_ncs_viewport(self.viewport)
+        matriz = matriz_vp @ matriz_ncs
+        perfilador = self.perfilador
+        with perfilador.etapa("edicao"):
+            vivos = editados[~cena.removidos[editados]]
+            parcial = recortar_objetos(cena, matriz_ncs, vivos, self.lod, self._quadro_exibido[1])
+            recorte = substituir_recortes(cena.recorte, parcial, editados, len(cena))
+            aplicar_recorte(cena, recorte)
+        with perfilador.etapa("renderizar"):
+            self.renderizador.desenhar_parcial(cena, recorte, parcial, editados, regiao, matriz_vp, matriz)
+        perfilador.contar(objetos=len(cena), vertices=cena.n_vertices, editados=len(editados),
+                          visiveis=int(recorte.visivel.sum()), itens=self.renderizador.n_itens)
+
+    # Pede um redesenho; quadros provisórios só valem se nenhum completo estiver pendente
+    def _pedir_quadro(self, rapido=False):
+        if not rapido:
+            self._quadro_rapido = False
+        elif not self.agendador.pendente:
+            self._quadro_rapido = True
+        self.agendador.marcar()
+
+    # editados/regiao: edições do quadro, que o minimapa redesenha só na região afetada
+    def desenhar_minimapa(self, editados=None, regiao=None):
+        with self.perfilador.etapa("minimapa"):
+            # Mundo paginado: o minimapa mostra a visão geral pré-calculada
+            cena = self.objetos if self.paginado is None else self.paginado.visao_geral
+            if editados is not None and self.paginado is None:
+                self.minimapa.atualizar_regiao(cena, regiao, self.indice.consultar)
+            self.minimapa.desenhar(cena, cantos_window(self.matriz_visao))
+
+    # Edição incremental da cena. objeto é a vista devolvida pela cena (ou por
+    # adicionar_objeto), um índice ou um array de índices. Cada edição atualiza
+    # a cena e o índice espacial e guarda a região afetada; o próximo quadro
+    # redesenha só os objetos editados, no canvas e no minimapa.
+    def adicionar_objeto(self, objeto):
+        self._antes_de_editar()
+        indice = self.objetos.append(objeto)
+        caixa = self.objetos.caixas([indice])
+        self.indice.inserir(indice, caixa[0])
+        self._editado(indice, caixa)
+        return self.objetos[indice]
+
+    def remover_objeto(self, objeto):
+        indices = self._indices_editar(objeto)
+        caixas = self.objetos.caixas(indices)
+        self.objetos.remover(indices)
+        for indice in indices.tolist():
+            self.indice.remover(indice)
+        self._editado(indices, caixas)
+
+    def mover_objeto(self, objeto, dx, dy):
+        indices = self._indices_editar(objeto)
+        antes = self.objetos.caixas(indices)
+        self.objetos.mover(indices, dx, dy)
+        depois = self.objetos.caixas(indices)
+        for indice, caixa in zip(indices.tolist(), depois):
+            self.indice.inserir(indice, caixa)
+        self._editado(indices, antes, depois)
+
+    def recolorir_objeto(self, objeto, cor):
+        indices = self._indices_editar(objeto)
+        self.objetos.recolorir(indices, cor)
+        self._editado(indices, self.objetos.caixas(indices))
+
+    # Índices (sem os já removidos) dos objetos a editar
+    def _indices_editar(self, objeto):
+        self._antes_de_editar()
+        if isinstance(objeto, ObjetoGeometrico):
+            objeto = objeto.indice
+        indices = np.unique(np.asarray(objeto, dtype=np.int64))
+        return indices[~self.objetos.removidos[indices]]
+
+    # Um quadro em preparação leu a cena de antes da edição: é descartado, e o
+    # próximo quadro é completo
+    def _antes_de_editar(self):
+        if self.paginado is not None:
+            raise ValueError("o mundo paginado é somente leitura")
+        self._descartar_quadro_em_preparo()
+
+    def _descartar_quadro_em_preparo(self):
+        if self.preparador.preparando:
+            self.preparador.cancelar_quadro()
+            self._quadro_exibido = None
+
+    def _editado(self, indices, *caixas):
+        self.edicoes.registrar(indices, *caixas)
+        self.agendador.marcar()
+
+    # Cena ao vivo: um processo externo envia objetos e edições por um socket
+    # local (protocolo em alimentacao.py). A recepção roda num loop do asyncio
+    # em outra thread; aqui as mensagens chegadas são retiradas uma vez por
+    # quadro e aplicadas juntas, como uma única edição.
+    def abrir_alimentacao(self):
+        porta = simpledialog.askinteger("Cena ao vivo", "Porta (em 127.0.0.1):", initialvalue=PORTA_PADRAO,
+                                        minvalue=0, maxvalue=65535)
+        if porta is not None:
+            try:
+                endereco = self.iniciar_alimentacao(("127.0.0.1", porta))
+                self.status.config(text=f"Recebendo a cena ao vivo em {endereco[0]}:{endereco[1]}")
+            except (OSError, ValueError) as e:
+                messagebox.showerror("Erro", f"Falha ao receber a cena ao vivo: {e}")
+
+    # endereco: (host, porta) para TCP ou o caminho de um socket Unix; devolve o
+    # endereço em que o servidor escuta
+    def iniciar_alimentacao(self, endereco):
+        self._antes_de_editar()
+        self.encerrar_alimentacao()
+        self.alimentacao = ServidorAlimentacao(endereco)
+        self._agendar_alimentacao()
+        return self.alimentacao.endereco
+
+    def encerrar_alimentacao(self):
+        if self.alimentacao is not None:
+            self.alimentacao.encerrar()
+            self.alimentacao = None
+            self.root.after_cancel(self._id_alimentacao)
+            self._id_alimentacao = None
+
+    def _agendar_alimentacao(self):
+        self._id_alimentacao = self.root.after(max(1, int(self.agendador.intervalo * 1000)),
+                                               self._receber_alimentacao)
+
+    def _receber_alimentacao(self):
+        self._agendar_alimentacao()
+        mensagens = self.alimentacao.retirar()
+        if not mensagens:
+            return
+        inicio = self.perfilador.agora()
+        try:
+            self.aplicar_mensagens(mensagens)
+        except ValueError as e:
+            print(f"Cena ao vivo encerrada: {e}")
+            self.encerrar_alimentacao()
+            return
+        self.perfilador.registrar_evento("alimentacao", inicio, self.perfilador.agora(), mensagens=len(mensagens))
+
+    # Aplica um lote de mensagens da cena ao vivo. Várias mensagens para o mesmo
+    # objeto viram uma edição só; remoções, trocas de geometria (movimentos
+    # incluídos), cores e inclusões saem cada uma em uma operação da cena.
+    def aplicar_mensagens(self, mensagens):
+        self._antes_de_editar()
+        cena, ids = self.objetos, self._ids_alimentacao
+        removidos, trocados, geometrias, movidos, deslocamentos = [], [], [], [], []
+        recoloridos = {}  # cor -> índices
+        novos = []  # (id, tipo, vértices, cor)
+        for id_objeto, (geometria, cor, dx, dy, remover) in consolidar(mensagens).items():
+            indice = ids.get(id_objeto)
+            if remover:
+                if indice is not None:
+                    removidos.append(ids.pop(id_objeto))
+            elif geometria is not None:
+                tipo, vertices = geometria
+                if (indice is not None and cena.tipos[indice] == tipo
+                        and cena.offsets[indice + 1] - cena.offsets[indice] == len(vertices)):
+                    trocados.append(indice)
+                    geometrias.append(vertices)
+                    recoloridos.setdefault(cor, []).append(indice)
+                else:
+                    # Outro tipo ou outro número de vértices: o objeto antigo é
+                    # removido e o novo entra no fim da cena
+                    if indice is not None:
+                        removidos.append(ids.pop(id_objeto))
+                    novos.append((id_objeto, tipo, vertices, cor))
+            elif indice is not None:
+                if dx or dy:
+                    movidos.append(indice)
+                    deslocamentos.append((dx, dy))
+                if cor is not None:
+                    recoloridos.setdefault(cor, []).append(indice)
+
+        if movidos:
+            movidos = np.asarray(movidos, dtype=np.int64)
+            inicios = cena.offsets[movidos]
+            tamanhos = cena.offsets[movidos + 1] - inicios
+            trocados += movidos.tolist()
+            geometrias.append(cena.coords[faixas(inicios, tamanhos)] + np.repeat(deslocamentos, tamanhos, axis=0))
+        alterados = np.asarray(removidos + trocados + [i for lista in recoloridos.values() for i in lista],
+                               dtype=np.int64)
+        antes = cena.caixas(alterados)
+        if removidos:
+            cena.remover(removidos)
+            for indice in removidos:
+                self.indice.remover(indice)
+        if trocados:
+            cena.substituir_vertices(trocados, np.concatenate(geometrias))
+        for cor, indices in recoloridos.items():
+            cena.recolorir(indices, cor)
+        depois = cena.caixas(trocados)
+        for indice, caixa in zip(trocados, depois):
+            self.indice.inserir(indice, caixa)
+
+        incluidos = np.zeros(0, dtype=np.int64)
+        if novos:
+            incluidos = cena.adicionar_lote([n[1] for n in novos], np.concatenate([n[2] for n in novos]),
+                                            [len(n[2]) for n in novos], [n[3] for n in novos])
+            ids.update(zip([n[0] for n in novos], incluidos.tolist()))
+            caixas = cena.caixas(incluidos)
+            for indice, caixa in zip(incluidos.tolist(), caixas):
+                self.indice.inserir(indice, caixa)
+            depois = np.concatenate([depois, caixas])
+        if len(alterados) or len(incluidos):
+            self._editado(np.concatenate([alterados, incluidos]), antes, depois)
+
+    def alternar_painel(self):
+        self.painel.alternar()
+
+    def salvar_trace(self):
+        caminho = filedialog.asksaveasfilename(defaultextension=".json", filetypes=[("Trace JSON", "*.json")])
+        if caminho:
+            n = self.perfilador.salvar_trace(caminho)
+            print(f"{n} eventos de desempenho gravados em {caminho}")
 
+    # Limites do mundo: extensão real da cena, a mesma mostrada no minimapa
+    @property
+    def mundo(self):
+        return self.minimapa.mundo
 
     def definir_passo(self, passo):
         self.mover_window = passo
@@ -231,34 +670,22 @@ class Visualizador:
 
 
     def mover_window_direcao(self, dx, dy):
+        self.animador.parar()
         wx_min, wy_min, wx_max, wy_max = self.window
+        mundo_min_x, mundo_min_y, mundo_max_x, mundo_max_y = self.mundo
+
+        # Só limita a window ao mundo na direção em que ela cabe nele
+        if (wx_max - wx_min) <= (mundo_max_x - mundo_min_x):
+            dx = min(max(dx, mundo_min_x - wx_min), mundo_max_x - wx_max)
+        if (wy_max - wy_min) <= (mundo_max_y - mundo_min_y):
+            dy = min(max(dy, mundo_min_y - wy_min), mundo_max_y - wy_max)
+
+        # Mover a window por (dx, dy) no mundo equivale a transladar o mundo por (-dx, -dy)
+        self.matriz_visao = self.matriz_visao @ translacao(-dx, -dy)
+        self._atualizar_window()
+        self.historico.registrar(self.matriz_visao, "mover")
+        self.agendador.marcar()
 
-        nova_wx_min = wx_min + dx
-        nova_wy_min = wy_min + dy
-        nova_wx_max = wx_max + dx
-        nova_wy_max = wy_max + dy
-
-        mundo_min_x, mundo_min_y = 0, 0
-        mundo_max_x, mundo_max_y = 25, 18.75
-
-        if nova_wx_min < mundo_min_x:
-            nova_wx_min = mundo_min_x
-            nova_wx_max = nova_wx_min + (wx_max - wx_min)
-        if nova_wy_min < mundo_min_y:
-            nova_wy_min = mundo_min_y
-            nova_wy_max = nova_wy_min + (wy_max - wy_min)
-
-        if nova_wx_max > mundo_max_x:
-            nova_wx_max = mundo_max_x
-            nova_wx_min = nova_wx_max - (wx_max - wx_min)
-        if nova_wy_max > mundo_max_y:
-            nova_wy_max = mundo_max_y
-            nova_wy_min = nova_wy_max - (wy_max - wy_min)
-
-        self.window = (nova_wx_min, nova_wy_min, nova_wx_max, nova_wy_max)
-        self.desenhar_viewport()
-        self.desenhar_minimapa()
-  
 
     def criar_interface_movimentacao(self):
         # Frame para os botões de movimentação e o controle do passo
@@ -300,28 +727,16 @@ class Visualizador:
 
 
     def rotacionar_window(self, angulo):
-        # Calcula o centro da window
-        cx = (self.window[0] + self.window[2]) / 2
-        cy = (self.window[1] + self.window[3]) / 2
-
-        # Converte o ângulo para radianos
-        angulo_rad = math.radians(angulo)
-
-        # Função para rotacionar um ponto ao redor do centro
-        def rotacionar_ponto(x, y, cx, cy, angulo_rad):
-            x_rot = cx + (x - cx) * math.cos(angulo_rad) - (y - cy) * math.sin(angulo_rad)
-            y_rot = cy + (x - cx) * math.sin(angulo_rad) + (y - cy) * math.cos(angulo_rad)
-            return x_rot, y_rot
-
-        # Rotaciona os cantos da window
-        x_min_rot, y_min_rot = rotacionar_ponto(self.window[0], self.window[1], cx, cy, angulo_rad)
-        x_max_rot, y_max_rot = rotacionar_ponto(self.window[2], self.window[3], cx, cy, angulo_rad)
-
-        # Atualiza as coordenadas da window
-        self.window = (x_min_rot, y_min_rot, x_max_rot, y_max_rot)
-        self.desenhar_viewport()
-        self.desenhar_minimapa()
-    
+        self.animador.parar()
+        # Girar a window pelo ângulo em torno do seu centro é girar o mundo pelo
+        # ângulo oposto em torno do mesmo ponto. A rotação é feita no mundo (e não
+        # no NCS, onde a escala não é uniforme) para a window continuar retangular.
+        cx, cy = aplicar_matriz(np.linalg.inv(self.matriz_visao), [(0.0, 0.0)])[0]
+        self.matriz_visao = self.matriz_visao @ translacao(cx, cy) @ rotacao(-math.radians(angulo)) @ translacao(-cx, -cy)
+        self._atualizar_window()
+        self.historico.registrar(self.matriz_visao, "rotacionar")
+        self.agendador.marcar()
+
     def rotacionar_esquerda(self):
         try:
             angulo = float(self.entry_rotacao.get())  # Obtém o valor inserido na caixa de entrada
@@ -337,11 +752,43 @@ class Visualizador:
             messagebox.showerror("Erro", "Por favor, insira um valor numérico válido para a rotação.")
     
     def resetar_transformacoes(self):
+        self.animador.parar()
         self.window = self.window_original
-        self.desenhar_viewport()
-        self.desenhar_minimapa()
+        self.historico.registrar(self.matriz_visao)
+        self.agendador.marcar()
         print("Restaurado para a posição original.")
 
+    # Troca a visão de uma vez (um único redesenho, sem quadros intermediários)
+    def ir_para_visao(self, matriz):
+        self.animador.parar()
+        self.matriz_visao = matriz
+        self._atualizar_window()
+        self.agendador.marcar()
+
+    def desfazer_visao(self):
+        matriz = self.historico.desfazer()
+        if matriz is not None:
+            self.ir_para_visao(matriz)
+
+    def refazer_visao(self):
+        matriz = self.historico.refazer()
+        if matriz is not None:
+            self.ir_para_visao(matriz)
+
+    def salvar_marcador(self):
+        nome = simpledialog.askstring("Marcador", "Nome do marcador:", parent=self.root)
+        if not nome:
+            return
+        if nome not in self.historico.marcadores:
+            self.menu_marcadores.add_command(label=nome, command=lambda: self.ir_para_marcador(nome))
+        self.historico.marcar(nome, self.matriz_visao)
+
+    def ir_para_marcador(self, nome):
+        matriz = self.historico.marcador(nome)
+        if matriz is not None:
+            self.ir_para_visao(matriz)
+            self.historico.registrar(self.matriz_visao)
+
     def criar_interface_rotacao(self):
         # Criando um Frame separado para o uso de grid
         frame_rotacao = tk.Frame(self.root)
@@ -366,26 +813,128 @@ class Visualizador:
 
 
     def aplicar_zoom(self, fator):
-        # Calcula o centro da window
-        cx = (self.window[0] + self.window[2]) / 2
-        cy = (self.window[1] + self.window[3]) / 2
-
-        # Calcula a nova largura e altura da window com o fator de zoom
-        largura = (self.window[2] - self.window[0]) * fator
-        altura = (self.window[3] - self.window[1]) * fator
-
-        # Atualiza as coordenadas da window com base no zoom centrado
-        self.window = (cx - largura / 2, cy - altura / 2, cx + largura / 2, cy + altura / 2)
-        self.desenhar_viewport()
-        self.desenhar_minimapa()
-    
+        # A window passa a ter fator vezes o tamanho atual, com o mesmo centro (a origem do NCS)
+        self.animador.animar(self.matriz_visao, escala(1 / fator, 1 / fator) @ self._visao_alvo())
+
+    # Zoom em volta de um ponto do canvas, que fica parado na tela
+    def aplicar_zoom_em(self, fator, x, y):
+        px, py = aplicar_matriz(np.linalg.inv(matriz_ncs_viewport(self.viewport)), [(x, y)])[0]
+        zoom = translacao(px, py) @ escala(1 / fator, 1 / fator) @ translacao(-px, -py)
+        self.animador.animar(self.matriz_visao, zoom @ self._visao_alvo())
+
+    # Para onde a visão está indo (o alvo da animação em andamento, se houver)
+    def _visao_alvo(self):
+        return self.animador.alvo if self.animador.animando else self.matriz_visao
+
+    def _passo_animacao(self, matriz):
+        self.matriz_visao = matriz
+        self._atualizar_window()
+        self._pedir_quadro(rapido=True)
+
+    def _fim_animacao(self, matriz):
+        self.matriz_visao = matriz
+        self._atualizar_window()
+        self.historico.registrar(self.matriz_visao, "zoom")
+        self._pedir_quadro()
+
+    def _girar_roda(self, event):
+        aproximar = event.num == 4 or getattr(event, "delta", 0) > 0
+        self.aplicar_zoom_em(1 / FATOR_RODA if aproximar else FATOR_RODA, event.x, event.y)
+
+    def _iniciar_arraste(self, event):
+        self.animador.parar()
+        self._arraste = (event.x, event.y)
+        self._arrastou = False
+
+    # O conteúdo acompanha o mouse: o deslocamento em pixels vira deslocamento no NCS
+    def _arrastar(self, event):
+        if self._arraste is None:
+            return
+        dx, dy = event.x - self._arraste[0], event.y - self._arraste[1]
+        self._arraste = (event.x, event.y)
+        if dx == 0 and dy == 0:
+            return
+        dx_ncs, dy_ncs = np.linalg.solve(matriz_ncs_viewport(self.viewport)[:2, :2], (dx, dy))
+        self.matriz_visao = translacao(dx_ncs, dy_ncs) @ self.matriz_visao
+        self._atualizar_window()
+        self._arrastou = True
+        self._pedir_quadro(rapido=True)
+
+    def _terminar_arraste(self, event):
+        if self._arraste is not None and self._arrastou:
+            self.historico.registrar(self.matriz_visao, "arrastar")
+            self._pedir_quadro()
+        elif self._arraste is not None:
+            self.selecionar(event.x, event.y)  # Clique sem arrastar
+        self._arraste = None
+
+    # Posição da viewport (pixels do canvas) levada de volta para o mundo
+    def viewport2mundo(self, x, y):
+        mx, my = aplicar_matriz(np.linalg.inv(self.matriz_mundo_viewport()), [(x, y)])[0].tolist()
+        return mx, my
+
+    # Objeto (vista da cena) na posição (x, y) da viewport, ou None
+    def objeto_em(self, x, y, tolerancia=TOLERANCIA_PADRAO):
+        indice = escolher_objeto(self.objetos, self.indice, self.matriz_mundo_viewport(), x, y, tolerancia)
+        return None if indice is None else self.objetos[indice]
+
+    def selecionar(self, x, y):
+        objeto = self.objeto_em(x, y)
+        self.selecionado = None if objeto is None else objeto.indice
+        mx, my = self.viewport2mundo(x, y)
+        if objeto is None:
+            self.status.config(text=f"Nenhum objeto em ({mx:.3f}, {my:.3f})")
+        else:
+            self.status.config(text=f"Selecionado: {self._descrever(objeto)}  em ({mx:.3f}, {my:.3f})")
+
+    def _mover_mouse(self, event):
+        objeto = self.objeto_em(event.x, event.y)
+        self._destacar(None if objeto is None else objeto.indice)
+
+    def _destacar(self, indice):
+        if indice == self.destacado:
+            return
+        self.destacado = indice
+        self.desenhar_destaque()
+        if indice is not None:
+            self.status.config(text=self._descrever(self.objetos[indice]))
+
+    @staticmethod
+    def _descrever(objeto):
+        n = len(objeto.vertices)
+        return f"{type(objeto).__name__} #{objeto.indice}  cor {objeto.cor}  {n} vértice{'s' if n != 1 else ''}"
+
+    # Contorno do objeto destacado por cima da cena; refeito a cada quadro,
+    # já que a visão ou o próprio objeto podem ter mudado
+    def desenhar_destaque(self):
+        if self._item_destaque is not None:
+            self.canvas.delete(self._item_destaque)
+            self._item_destaque = None
+        indice = self.destacado
+        if indice is not None and (indice >= len(self.objetos) or self.objetos.removidos[indice]):
+            indice = self.destacado = None
+        if indice is None:
+            return
+        pontos = self.window2viewport_lote(self.objetos.vertices(indice)).tolist()
+        if not pontos:
+            return
+        tipo = int(self.objetos.tipos[indice])
+        if tipo == TIPO_PONTO or len(pontos) == 1:
+            x, y = pontos[0]
+            r = self.renderizador.raio_ponto + 3
+            self._item_destaque = self.canvas.create_oval(x - r, y - r, x + r, y + r, outline="orange", width=2)
+        elif tipo == TIPO_RETA or len(pontos) == 2:
+            self._item_destaque = self.canvas.create_line(pontos[:2], fill="orange", width=3)
+        else:
+            self._item_destaque = self.canvas.create_polygon(pontos, outline="orange", fill="", width=3)
+
     def zoom_in(self):
         # Aumenta o zoom em 10%
-        self.aplicar_zoom(1.1)
+        self.aplicar_zoom(FATOR_ZOOM)
 
     def zoom_out(self):
-        # Diminui o zoom em 10%
-        self.aplicar_zoom(0.9)
+        # Desfaz um passo do zoom_in
+        self.aplicar_zoom(1 / FATOR_ZOOM)
 
     def criar_interface_zoom(self):
         # Frame para o zoom
@@ -416,36 +965,14 @@ class Visualizador:
         botao_resetar.pack(padx=10)  
 
 
-    def gerar_arquivo_saida(self, caminho):
-        root = et.Element("dados")
-        viewport_elem = et.SubElement(root, "viewport")
-        vpmin_elem = et.SubElement(viewport_elem, "vpmin", x=str(self.viewport[0]), y=str(self.viewport[1]))
-        vpmax_elem = et.SubElement(viewport_elem, "vpmax", x=str(self.viewport[2]), y=str(self.viewport[3]))
-
-        window_elem = et.SubElement(root, "window")
-        wmin_elem = et.SubElement(window_elem, "wmin", x=str(self.window[0]), y=str(self.window[1]))
-        wmax_elem = et.SubElement(window_elem, "wmax", x=str(self.window[2]), y=str(self.window[3]))
-
-        for objeto in self.objetos:
-            if isinstance(objeto, Ponto):
-                ponto_elem = et.SubElement(root, "ponto", x=str(objeto.coordenadas_mundo[0]), y=str(objeto.coordenadas_mundo[1]), cor=objeto.cor)
-            elif isinstance(objeto, Reta):
-                reta_elem = et.SubElement(root, "reta", cor=objeto.cor)
-                for ponto in objeto.coordenadas_mundo:
-                    et.SubElement(reta_elem, "ponto", x=str(ponto[0]), y=str(ponto[1]))
-            elif isinstance(objeto, Poligono):
-                poligono_elem = et.SubElement(root, "poligono", cor=objeto.cor)
-                for ponto in objeto.coordenadas_mundo:
-                    et.SubElement(poligono_elem, "ponto", x=str(ponto[0]), y=str(ponto[1]))
-
-        tree = et.ElementTree(root)
-        tree.write(caminho)
-
-        with open(caminho, "r", encoding="utf-8") as f:
-            xml_str = f.read()
-            reparado = minidom.parseString(xml_str).toprettyxml(indent="  ")
-            with open(caminho, "w", encoding="utf-8") as f:
-                f.write(reparado)
+    def gerar_arquivo_saida(self, caminho, compacto=False):
+        if self.paginado is not None:
+            raise ValueError("um mundo paginado não pode ser salvo como uma cena só")
+        cena = self.objetos.compactada() if self.objetos.n_removidos else self.objetos
+        if caminho.lower().endswith(EXTENSAO):
+            salvar_binario(caminho, cena, self.viewport, self.window)
+        else:
+            salvar_xml(caminho, cena, self.viewport, self.window, compacto)
 
 
 if __name__ == "__main__":
@@ -0,0 +1,138 @@
+import tkinter as tk
+
+import numpy as np
+
+from cena import TIPO_PONTO, TIPO_RETA, TIPO_POLIGONO, faixas
+from rasterizador import (novo_quadro, desenhar_pontos, desenhar_segmentos, arestas_poligonos, png_base64,
+                          retangulo_pixels)
+from transformacoes import matriz_window_viewport, aplicar_matriz
+
+FUNDO = (211, 211, 211)  # lightgrey
+COR_PONTO = (0, 0, 0)
+COR_RETA = (0, 0, 255)
+COR_POLIGONO = (255, 0, 0)
+
+# Margem (pixels) em volta da região suja refeita após edições (raio dos pontos e arredondamento)
+MARGEM_REGIAO = 2
+
+# Mundo usado quando a cena está vazia
+MUNDO_PADRAO = (0, 0, 25, 18.75)
+
+
+# Extensão real da cena (caixa envolvente de todos os objetos), com uma pequena margem
+def extensao_cena(cena, margem=0.05):
+    if len(cena) == 0:
+        return MUNDO_PADRAO
+    caixas = cena.caixas()
+    caixas = caixas[~np.isnan(caixas).any(axis=1)]
+    if len(caixas) == 0:
+        return MUNDO_PADRAO
+    x_min, y_min = caixas[:, :2].min(axis=0)
+    x_max, y_max = caixas[:, 2:].max(axis=0)
+    dx = max(x_max - x_min, 1e-9) * margem
+    dy = max(y_max - y_min, 1e-9) * margem
+    return (float(x_min - dx), float(y_min - dy), float(x_max + dx), float(y_max + dy))
+
+
+# Minimapa com a cena inteira: o conteúdo estático é rasterizado uma vez por
+# versão da cena numa imagem, e a cada quadro só o retângulo da window se move
+class Minimapa:
+    def __init__(self, canvas, largura=150, altura=120):
+        self.canvas = canvas
+        self.largura = largura
+        self.altura = altura
+        self.mundo = MUNDO_PADRAO
+        self._imagem = None  # Referência da PhotoImage (o Tk não guarda a sua)
+        self._quadro = None  # Pixels da imagem (as edições refazem só uma parte)
+        self._item_imagem = None
+        self._retangulo = None
+        self._versao = None  # (geração, versão) da cena rasterizada
+        self._matriz = matriz_window_viewport(self.mundo, (0, 0, largura, altura))
+
+    # Mundo ajustado à proporção do minimapa, para não distorcer a cena
+    def _ajustar_proporcao(self, mundo):
+        x_min, y_min, x_max, y_max = mundo
+        largura, altura = x_max - x_min, y_max - y_min
+        proporcao = self.largura / self.altura
+        if largura / altura < proporcao:
+            extra = (altura * proporcao - largura) / 2
+            return (x_min - extra, y_min, x_max + extra, y_max)
+        extra = (largura / proporcao - altura) / 2
+        return (x_min, y_min - extra, x_max, y_max + extra)
+
+    def rasterizar(self, cena):
+        self.mundo = self._ajustar_proporcao(extensao_cena(cena))
+        self._matriz = matriz_window_viewport(self.mundo, (0, 0, self.largura, self.altura))
+
+        self._quadro = novo_quadro(self.largura, self.altura, FUNDO)
+        if len(cena):
+            self._desenhar_objetos(self._quadro, *self._selecionar(cena, np.flatnonzero(~cena.removidos)
+                                                                   if cena.n_removidos else None))
+        self._exibir()
+        self._versao = (cena.geracao, cena.versao)
+
+    # Depois de edições na cena: só o retângulo do minimapa que cobre a região
+    # suja (no mundo) é apagado e desenhado de novo, com os objetos devolvidos
+    # por consultar(caixa). Se a região sai do mundo mostrado, refaz tudo.
+    def atualizar_regiao(self, cena, regiao, consultar):
+        if self._quadro is None or self._versao is None or self._versao[0] != cena.geracao:
+            self.rasterizar(cena)
+            return
+        if regiao is not None:
+            x_min, y_min, x_max, y_max = self.mundo
+            if regiao[0] < x_min or regiao[1] < y_min or regiao[2] > x_max or regiao[3] > y_max:
+                self.rasterizar(cena)
+                return
+            retangulo = retangulo_pixels(regiao, self._matriz, self.largura, self.altura, MARGEM_REGIAO)
+            if retangulo is not None:
+                # Objetos que alcançam o retângulo: a região ampliada pela margem em pixels
+                x0, y0, x1, y1 = retangulo
+                margem = (MARGEM_REGIAO + 1) * (x_max - x_min) / self.largura
+                indices = consultar((regiao[0] - margem, regiao[1] - margem,
+                                     regiao[2] + margem, regiao[3] + margem))
+                parte = self._quadro[y0:y1, x0:x1]
+                parte[:, :] = FUNDO
+                pixels, offsets, tipos = self._selecionar(cena, indices)
+                self._desenhar_objetos(parte, pixels - (x0, y0), offsets, tipos)
+                self._exibir()
+        self._versao = (cena.geracao, cena.versao)
+
+    # Vértices (em pixels do minimapa), offsets e tipos dos objetos indicados (todos, se None)
+    def _selecionar(self, cena, indices):
+        if indices is None:
+            return aplicar_matriz(self._matriz, cena.coords), cena.offsets, cena.tipos
+        inicios = cena.offsets[indices]
+        tamanhos = cena.offsets[indices + 1] - inicios
+        return (aplicar_matriz(self._matriz, cena.coords[faixas(inicios, tamanhos)]),
+                np.concatenate([[0], np.cumsum(tamanhos)]).astype(np.int64), cena.tipos[indices])
+
+    @staticmethod
+    def _desenhar_objetos(quadro, pixels, offsets, tipos):
+        poligonos = np.flatnonzero(tipos == TIPO_POLIGONO)
+        desenhar_segmentos(quadro, *arestas_poligonos(pixels, offsets, poligonos), COR_POLIGONO)
+
+        retas = offsets[:-1][(tipos == TIPO_RETA) & (np.diff(offsets) >= 2)]
+        desenhar_segmentos(quadro, pixels[retas], pixels[retas + 1], COR_RETA)
+
+        pontos = offsets[:-1][(tipos == TIPO_PONTO) & (np.diff(offsets) >= 1)]
+        desenhar_pontos(quadro, pixels[pontos], COR_PONTO, raio=1)
+
+    def _exibir(self):
+        self._imagem = tk.PhotoImage(master=self.canvas, data=png_base64(self._quadro))
+        if self._item_imagem is None:
+            self._item_imagem = self.canvas.create_image(0, 0, anchor="nw", image=self._imagem)
+        else:
+            self.canvas.itemconfigure(self._item_imagem, image=self._imagem)
+        if self._retangulo is not None:
+            self.canvas.tag_raise(self._retangulo)
+
+    # cantos_window: os quatro cantos da window no mundo (ela pode estar rotacionada)
+    def desenhar(self, cena, cantos_window):
+        if self._versao != (cena.geracao, cena.versao):
+            self.rasterizar(cena)
+
+        cantos = aplicar_matriz(self._matriz, cantos_window).ravel().tolist()
+        if self._retangulo is None:
+            self._retangulo = self.canvas.create_polygon(cantos, outline="black", fill="", width=1, dash=(1, 2))
+        else:
+            self.canvas.coords(self._retangulo, *cantos)
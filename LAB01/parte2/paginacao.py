@@ -0,0 +1,367 @@
+import json
+import os
+import sys
+from collections import OrderedDict
+
+import numpy as np
+
+from arquivo_binario import carregar_binario, carregar_cena, salvar_binario, EXTENSAO
+from cena import Cena, TIPO_POLIGONO, faixas
+from indice_espacial import GradeUniforme
+from simplificacao import simplificar_poligono, MIN_VERTICES_SIMPLIFICAR
+
+# Mundo paginado: a cena dividida numa grade de setores, cada um gravado num
+# arquivo .cena próprio, mais uma visão geral (amostra simplificada de toda a
+# cena) e um manifesto JSON (.mundo) com a caixa de cada setor. Só os setores
+# perto da window ficam na memória.
+EXTENSAO_MUNDO = ".mundo"
+FORMATO = "mundo-paginado-1"
+OBJETOS_POR_SETOR = 200_000
+OBJETOS_VISAO_GERAL = 50_000
+# Objetos lidos por vez ao particionar (as caixas são calculadas em lotes)
+LOTE_PARTICAO = 1_000_000
+# Memória (bytes) reservada aos setores carregados
+MEMORIA_SETORES = 512 * 1024 * 1024
+# Fração do tamanho da window acrescentada em cada lado ao escolher os setores
+MARGEM_PAGINACAO = 0.5
+# Estimativa de memória de um setor carregado: coordenadas, colunas da cena,
+# caixas e entradas no índice espacial
+BYTES_POR_VERTICE = 16
+BYTES_POR_OBJETO = 64
+
+
+def memoria_setor(n_objetos, n_vertices):
+    return n_objetos * BYTES_POR_OBJETO + n_vertices * BYTES_POR_VERTICE
+
+
+# Estimativa de memória da cena exibida pela capacidade dos seus buffers: conta
+# também os setores descartados que ainda estão nela como objetos removidos
+def memoria_cena(cena):
+    return memoria_setor(*cena.capacidade)
+
+
+# Cópia dos objetos indicados de uma cena, com a paleta inteira (os códigos de cor não mudam)
+def extrair(cena, indices):
+    inicios = cena.offsets[indices]
+    tamanhos = cena.offsets[indices + 1] - inicios
+    parte = Cena(0, 0)
+    parte.adotar(np.array(cena.coords[faixas(inicios, tamanhos)], dtype=np.float64).reshape(-1, 2),
+                 np.concatenate([[0], np.cumsum(tamanhos)]).astype(np.int64),
+                 np.array(cena.tipos[indices]), np.array(cena.cores[indices]), cena.paleta)
+    return parte
+
+
+# Divide a cena do arquivo origem (de preferência .cena, que é mapeado da
+# memória e não precisa caber nela) em setores numa grade uniforme: cada objeto
+# vai para o setor que contém o centro da sua caixa, e a caixa do setor é a
+# união das caixas dos seus objetos. Grava os setores, a visão geral e o
+# manifesto em pasta; devolve o caminho do manifesto.
+def particionar_mundo(origem, pasta, objetos_por_setor=OBJETOS_POR_SETOR, objetos_visao_geral=OBJETOS_VISAO_GERAL,
+                      progresso=None):
+    cena = Cena()
+    viewport, window = carregar_cena(origem, cena)
+    n = len(cena)
+    os.makedirs(pasta, exist_ok=True)
+
+    centros = np.full((n, 2), np.nan)
+    for inicio in range(0, n, LOTE_PARTICAO):
+        caixas = cena.caixas(np.arange(inicio, min(n, inicio + LOTE_PARTICAO)))
+        centros[inicio:inicio + len(caixas)] = (caixas[:, :2] + caixas[:, 2:]) / 2
+    validos = ~np.isnan(centros).any(axis=1)
+    if np.any(validos):
+        x_min, y_min = centros[validos].min(axis=0)
+        x_max, y_max = centros[validos].max(axis=0)
+    else:
+        x_min, y_min, x_max, y_max = 0.0, 0.0, 1.0, 1.0
+    largura, altura = max(x_max - x_min, 1e-9), max(y_max - y_min, 1e-9)
+
+    # Grade com a proporção do mundo e uns objetos_por_setor objetos por célula
+    n_setores = max(1, int(np.ceil(n / objetos_por_setor)))
+    nx = max(1, int(round(np.sqrt(n_setores * largura / altura))))
+    ny = max(1, int(np.ceil(n_setores / nx)))
+    cx = np.clip(((centros[:, 0] - x_min) / largura * nx).astype(np.int64, copy=False), 0, nx - 1)
+    cy = np.clip(((centros[:, 1] - y_min) / altura * ny).astype(np.int64, copy=False), 0, ny - 1)
+    setor = np.where(validos, cy * nx + cx, -1)
+    del centros
+
+    # Objetos sem vértices não aparecem em lugar nenhum e ficam de fora
+    ordem = np.argsort(setor, kind="stable")
+    ordem = ordem[setor[ordem] >= 0]
+    inicio_setor = np.searchsorted(setor[ordem], np.arange(nx * ny + 1))
+
+    nome = os.path.splitext(os.path.basename(origem))[0]
+    setores = []
+    limites = None
+    for k in range(nx * ny):
+        if progresso is not None:
+            progresso(k / (nx * ny))
+        indices = ordem[inicio_setor[k]:inicio_setor[k + 1]]
+        if len(indices) == 0:
+            continue
+        parte = extrair(cena, indices)
+        caixas = parte.caixas()
+        caixa = caixas[:, :2].min(axis=0).tolist() + caixas[:, 2:].max(axis=0).tolist()
+        limites = caixa if limites is None else (min(limites[0], caixa[0]), min(limites[1], caixa[1]),
+                                                 max(limites[2], caixa[2]), max(limites[3], caixa[3]))
+        arquivo = f"{nome}_{k}{EXTENSAO}"
+        salvar_binario(os.path.join(pasta, arquivo), parte, viewport, window)
+        setores.append({"arquivo": arquivo, "caixa": caixa, "n_objetos": len(parte), "n_vertices": parte.n_vertices})
+
+    # Visão geral: amostra espaçada dos objetos (a ordem segue os setores, então
+    # a amostra cobre o mundo todo), com os polígonos grandes simplificados
+    passo = max(1, int(np.ceil(len(ordem) / objetos_visao_geral)))
+    visao_geral = extrair(cena, ordem[::passo])
+    if limites is not None:
+        tolerancia = max(limites[2] - limites[0], limites[3] - limites[1]) / 1000
+        visao_geral = simplificar_cena(visao_geral, tolerancia)
+    arquivo_visao_geral = f"{nome}_visao_geral{EXTENSAO}"
+    salvar_binario(os.path.join(pasta, arquivo_visao_geral), visao_geral, viewport, window)
+
+    manifesto = {"formato": FORMATO, "viewport": list(map(float, viewport)), "window": list(map(float, window)),
+                 "mundo": list(limites) if limites is not None else [0.0, 0.0, 1.0, 1.0],
+                 "paleta": list(cena.paleta), "visao_geral": arquivo_visao_geral, "setores": setores}
+    caminho = os.path.join(pasta, nome + EXTENSAO_MUNDO)
+    with open(caminho, "w", encoding="utf-8") as arquivo:
+        json.dump(manifesto, arquivo, indent=1)
+    return caminho
+
+
+# Cópia da cena com os polígonos grandes simplificados (Douglas–Peucker)
+def simplificar_cena(cena, tolerancia):
+    tamanhos = np.diff(cena.offsets)
+    grandes = np.flatnonzero((cena.tipos == TIPO_POLIGONO) & (tamanhos > MIN_VERTICES_SIMPLIFICAR))
+    if len(grandes) == 0:
+        return cena
+    vertices = [cena.vertices(i) for i in range(len(cena))]
+    for i in grandes.tolist():
+        vertices[i] = simplificar_poligono(np.asarray(vertices[i]), tolerancia)
+    tamanhos = np.array([len(v) for v in vertices], dtype=np.int64)
+    simplificada = Cena(0, 0)
+    simplificada.adotar(np.concatenate(vertices).reshape(-1, 2), np.concatenate([[0], np.cumsum(tamanhos)]),
+                        cena.tipos, cena.cores, cena.paleta)
+    return simplificada
+
+
+# Índice espacial da cena exibida de um mundo paginado: uma grade por setor,
+# montada com os índices locais do setor (somados à posição do setor na cena
+# na consulta), para que carregar ou descartar um setor não mexa nos demais.
+# Só consulta (o mundo paginado não é editado); o dicionário é trocado em vez de
+# alterado, então consultas em outras threads não o veem mudar no meio.
+class IndiceSetores:
+    def __init__(self):
+        self._setores = {}  # setor -> (início na cena, caixa do setor, grade)
+
+    def __len__(self):
+        return sum(len(grade) for _, _, grade in self._setores.values())
+
+    def adicionar(self, setor, inicio, caixa, grade):
+        self._setores = {**self._setores, setor: (inicio, caixa, grade)}
+
+    def remover(self, setor):
+        self._setores = {k: s for k, s in self._setores.items() if k != setor}
+
+    def grade(self, setor):
+        return self._setores[setor][2]
+
+    # Devolve (ordenados) os ids dos objetos cuja caixa envolvente intersecta a caixa dada
+    def consultar(self, caixa):
+        x_min, y_min, x_max, y_max = caixa
+        x_min, x_max = min(x_min, x_max), max(x_min, x_max)
+        y_min, y_max = min(y_min, y_max), max(y_min, y_max)
+        # Os setores ocupam faixas disjuntas da cena: na ordem do início, os ids já saem ordenados
+        partes = [grade.consultar(caixa) + inicio for inicio, c, grade in sorted(self._setores.values(),
+                                                                                  key=lambda s: s[0])
+                  if c[0] <= x_max and c[2] >= x_min and c[1] <= y_max and c[3] >= y_min]
+        return np.concatenate(partes) if partes else np.zeros(0, dtype=np.int64)
+
+
+# Mundo paginado aberto: mantém na cena exibida (num LRU limitado por memória)
+# os setores que tocam a window mais uma margem. Setores novos são acrescentados
+# ao fim da cena e os descartados viram objetos removidos, sem mexer nos índices,
+# itens desenhados e caches dos demais. Os removidos continuam ocupando os buffers
+# da cena, então o limite vale para eles também: quando a cena inteira passa do
+# limite, ela é remontada só com os setores carregados. Quando nem os setores
+# necessários cabem na memória (window muito afastada), a cena exibida passa a
+# ser a visão geral.
+class MundoPaginado:
+    def __init__(self, caminho, memoria=MEMORIA_SETORES, margem=MARGEM_PAGINACAO):
+        with open(caminho, encoding="utf-8") as arquivo:
+            manifesto = json.load(arquivo)
+        if manifesto.get("formato") != FORMATO:
+            raise ValueError("não é um manifesto de mundo paginado")
+        self.pasta = os.path.dirname(os.path.abspath(caminho))
+        self.viewport = tuple(manifesto["viewport"])
+        self.window = tuple(manifesto["window"])
+        self.limites = tuple(manifesto["mundo"])
+        self.paleta = list(manifesto["paleta"])
+        self.setores = manifesto["setores"]
+        self.caixas = np.array([s["caixa"] for s in self.setores], dtype=np.float64).reshape(-1, 4)
+        self._memoria_setor = np.array([memoria_setor(s["n_objetos"], s["n_vertices"]) for s in self.setores],
+                                       dtype=np.int64)
+        self.memoria = memoria
+        self.margem = margem
+        # Setores na cena exibida: setor -> (início, quantidade de objetos), do menos para o mais usado
+        self._exibidos = OrderedDict()
+        self._memoria_usada = 0  # Dos setores carregados (sem os descartados ainda na cena)
+        self.usando_visao_geral = False
+
+        self.visao_geral = Cena(0, 0)
+        carregar_binario(os.path.join(self.pasta, manifesto["visao_geral"]), self.visao_geral)
+        self._indice_visao_geral = None
+
+    @property
+    def carregados(self):
+        return list(self._exibidos)
+
+    @property
+    def memoria_usada(self):
+        return self._memoria_usada
+
+    # Setores que tocam a caixa (window) aumentada pela margem
+    def necessarios(self, caixa):
+        x_min, y_min, x_max, y_max = caixa
+        mx, my = (x_max - x_min) * self.margem, (y_max - y_min) * self.margem
+        c = self.caixas
+        return np.flatnonzero((c[:, 0] <= x_max + mx) & (c[:, 2] >= x_min - mx) &
+                              (c[:, 1] <= y_max + my) & (c[:, 3] >= y_min - my))
+
+    # Se a cena exibida precisa mudar para a caixa dada (barato: só compara as
+    # caixas dos setores com a window)
+    def precisa_atualizar(self, caixa):
+        necessarios = self.necessarios(caixa)
+        if self._memoria_setor[necessarios].sum() > self.memoria:
+            return not self.usando_visao_geral
+        return self.usando_visao_geral or any(k not in self._exibidos for k in necessarios.tolist())
+
+    # Lê do disco os setores que faltam para a caixa dada, cada um com a sua
+    # grade, sem mexer na cena exibida (pode rodar em segundo plano). Devolve
+    # (setores necessários, [(setor, cena, grade)]) ou None quando só a visão
+    # geral cabe. progresso(fração) é chamado entre um setor e outro.
+    def ler(self, caixa, progresso=None):
+        necessarios = self.necessarios(caixa).tolist()
+        if self._memoria_setor[necessarios].sum() > self.memoria:
+            if self._indice_visao_geral is None:
+                indice = GradeUniforme()
+                indice.construir(self.visao_geral)
+                self._indice_visao_geral = indice
+            return None
+        exibidos = set() if self.usando_visao_geral else set(self._exibidos)
+        faltando = [k for k in necessarios if k not in exibidos]
+        lidos = []
+        for i, k in enumerate(faltando):
+            if progresso is not None:
+                progresso(i / len(faltando))
+            setor = Cena(0, 0)
+            carregar_binario(os.path.join(self.pasta, self.setores[k]["arquivo"]), setor)
+            grade = GradeUniforme()
+            grade.construir(setor)
+            lidos.append((k, setor, grade))
+        return necessarios, lidos
+
+    # Aplica à cena exibida (cena, indice) o resultado de ler (na thread da
+    # interface): acrescenta os setores lidos, descarta os menos usados que
+    # passaram do limite de memória e devolve (None, None, caixas dos setores
+    # que mudaram). Quando a cena precisa ser trocada (visão geral, cena
+    # compactada), devolve a nova (cena, índice, None) sem mexer na exibida.
+    def aplicar(self, cena, indice, lido):
+        if lido is None:
+            self.usando_visao_geral = True
+            self._exibidos.clear()
+            self._memoria_usada = 0
+            return self.visao_geral, self._indice_visao_geral, None
+        necessarios, lidos = lido
+        if self.usando_visao_geral or not isinstance(indice, IndiceSetores):
+            self.usando_visao_geral = False
+            self._exibidos.clear()
+            self._memoria_usada = 0
+            cena, indice = self._nova_cena(), IndiceSetores()
+            self._acrescentar(cena, indice, lidos)
+            return cena, indice, None
+
+        for k in necessarios:
+            if k in self._exibidos:
+                self._exibidos.move_to_end(k)
+        mudaram = self._acrescentar(cena, indice, lidos)
+        for k in self._descartar_excesso(set(necessarios)):
+            inicio, n = self._exibidos.pop(k)
+            cena.remover(np.arange(inicio, inicio + n))
+            indice.remover(k)
+            mudaram.append(k)
+        if memoria_cena(cena) > self.memoria:
+            cena, indice = self._compactar(cena, indice)
+            return cena, indice, None
+        return None, None, self.caixas[mudaram]
+
+    # Monta a cena exibida a partir de (setores necessários, lidos) de uma
+    # cena vazia; para abrir o mundo. Devolve (cena, índice).
+    def montar(self, lido):
+        cena, indice, _ = self.aplicar(None, None, lido)
+        return cena, indice
+
+    def _nova_cena(self):
+        cena = Cena(0, 0)
+        cena.adotar(np.empty((0, 2)), np.zeros(1, dtype=np.int64), np.zeros(0, dtype=np.uint8),
+                    np.zeros(0, dtype=np.uint16), self.paleta)
+        return cena
+
+    # Acrescenta ao fim da cena os setores lidos; devolve a lista deles
+    def _acrescentar(self, cena, indice, lidos):
+        self._reservar(cena, len(cena) + sum(len(setor) for _, setor, _ in lidos),
+                       cena.n_vertices + sum(setor.n_vertices for _, setor, _ in lidos))
+        for k, setor, grade in lidos:
+            inicio = len(cena)
+            cena.adicionar_lote(setor.tipos, setor.coords, np.diff(setor.offsets), setor.cores, setor.paleta)
+            indice.adicionar(k, inicio, self.caixas[k], grade)
+            self._exibidos[k] = (inicio, len(setor))
+            self._memoria_usada += int(self._memoria_setor[k])
+        return [k for k, _, _ in lidos]
+
+    # Cresce os buffers da cena para objetos/vértices no total. Como na Cena, a
+    # capacidade dobra (para não realocar a cada setor), mas a folga é cortada
+    # para a cena não passar do limite de memória só por ela
+    def _reservar(self, cena, objetos, vertices):
+        capacidade_objetos, capacidade_vertices = cena.capacidade
+        if objetos <= capacidade_objetos and vertices <= capacidade_vertices:
+            return
+        necessaria = memoria_setor(objetos, vertices)
+        folga = max(0, self.memoria - necessaria)
+        fracao_objetos = objetos * BYTES_POR_OBJETO / max(1, necessaria)
+        cena.reservar(objetos + min(objetos, int(folga * fracao_objetos / BYTES_POR_OBJETO)),
+                      vertices + min(vertices, int(folga * (1 - fracao_objetos) / BYTES_POR_VERTICE)))
+
+    # Tira do LRU os setores menos usados (menos os de manter) até caber no
+    # limite de memória; devolve os descartados
+    def _descartar_excesso(self, manter):
+        descartados = []
+        for k in list(self._exibidos):
+            if self._memoria_usada <= self.memoria:
+                break
+            if k not in manter:
+                descartados.append(k)
+                self._memoria_usada -= int(self._memoria_setor[k])
+        return descartados
+
+    # Cena nova só com os setores exibidos, sem folga nos buffers (as grades são
+    # reaproveitadas, só o início de cada setor muda)
+    def _compactar(self, cena, indice):
+        nova, novo_indice = self._nova_cena(), IndiceSetores()
+        offsets = cena.offsets
+        nova.reservar(sum(n for _, n in self._exibidos.values()),
+                      sum(int(offsets[inicio + n] - offsets[inicio]) for inicio, n in self._exibidos.values()))
+        for k, (inicio, n) in list(self._exibidos.items()):
+            grade = indice.grade(k)
+            parte = extrair(cena, np.arange(inicio, inicio + n))
+            self._exibidos[k] = (len(nova), n)
+            novo_indice.adicionar(k, len(nova), self.caixas[k], grade)
+            nova.adicionar_lote(parte.tipos, parte.coords, np.diff(parte.offsets), parte.cores, parte.paleta)
+        return nova, novo_indice
+
+
+if __name__ == "__main__":
+    # Uso: python paginacao.py entrada.cena pasta [objetos_por_setor]
+    if len(sys.argv) not in (3, 4):
+        print("Uso: python paginacao.py entrada.cena pasta [objetos_por_setor]")
+        sys.exit(1)
+    objetos = int(sys.argv[3]) if len(sys.argv) == 4 else OBJETOS_POR_SETOR
+    caminho = particionar_mundo(sys.argv[1], sys.argv[2], objetos)
+    print(f"Mundo paginado gravado em {caminho}")
@@ -0,0 +1,161 @@
+import json
+import os
+import time
+from collections import deque
+from contextlib import contextmanager
+
+# Quadros guardados no buffer circular (cerca de 10 s a 60 FPS)
+CAPACIDADE_PADRAO = 600
+# Quantidade de quadros recentes usada nas médias do painel
+QUADROS_MEDIA = 30
+
+
+# Instrumentação dos caminhos quentes do visualizador. Cada quadro é um registro
+# com o tempo de cada etapa (início e fim em segundos desde a criação do
+# perfilador) e contagens (objetos, vértices, itens do canvas...). Os registros
+# ficam num buffer circular, então o custo de memória é fixo. Eventos avulsos
+# (como a carga de um arquivo) entram no mesmo buffer com tipo próprio.
+class Perfilador:
+    def __init__(self, capacidade=CAPACIDADE_PADRAO):
+        self.registros = deque(maxlen=capacidade)
+        self.quadro_atual = None  # Registro do quadro em andamento
+        self._origem = time.perf_counter()
+
+    def agora(self):
+        return time.perf_counter() - self._origem
+
+    def iniciar_quadro(self):
+        self.quadro_atual = {"tipo": "quadro", "inicio": self.agora(), "fim": None, "etapas": [], "contagens": {}}
+        return self.quadro_atual
+
+    def terminar_quadro(self):
+        quadro = self.quadro_atual
+        if quadro is None:
+            return None
+        quadro["fim"] = max([self.agora()] + [fim for _, _, fim in quadro["etapas"]])
+        self.registros.append(quadro)
+        self.quadro_atual = None
+        return quadro
+
+    # Registra uma etapa já medida. Etapas que terminam depois do quadro (por
+    # exemplo, o recorte em segundo plano) são anexadas ao quadro que as pediu.
+    def registrar_etapa(self, nome, inicio, fim, quadro=None):
+        quadro = quadro or self.quadro_atual
+        if quadro is None:
+            self.registros.append({"tipo": "etapa", "inicio": inicio, "fim": fim,
+                                   "etapas": [(nome, inicio, fim)], "contagens": {}})
+            return
+        quadro["etapas"].append((nome, inicio, fim))
+        if quadro["fim"] is not None:
+            quadro["fim"] = max(quadro["fim"], fim)
+
+    @contextmanager
+    def etapa(self, nome, quadro=None):
+        inicio = self.agora()
+        try:
+            yield
+        finally:
+            self.registrar_etapa(nome, inicio, self.agora(), quadro)
+
+    def contar(self, quadro=None, **contagens):
+        quadro = quadro or self.quadro_atual
+        if quadro is not None:
+            quadro["contagens"].update(contagens)
+
+    # Evento fora dos quadros (carga de arquivo, conversão...)
+    def registrar_evento(self, nome, inicio, fim, **contagens):
+        self.registros.append({"tipo": nome, "inicio": inicio, "fim": fim,
+                               "etapas": [(nome, inicio, fim)], "contagens": contagens})
+
+    def quadros(self, n=None):
+        quadros = [r for r in self.registros if r["tipo"] == "quadro"]
+        return quadros if n is None else quadros[-n:]
+
+    # Quadros por segundo no último segundo com quadros
+    def fps(self, janela=1.0):
+        quadros = self.quadros()
+        if not quadros:
+            return 0.0
+        ultimo = quadros[-1]["inicio"]
+        recentes = [q for q in quadros if q["inicio"] > ultimo - janela]
+        if len(recentes) < 2:
+            return 0.0
+        return (len(recentes) - 1) / max(ultimo - recentes[0]["inicio"], 1e-9)
+
+    # Tempo médio (s) de cada etapa e do quadro inteiro nos últimos n quadros,
+    # e as contagens do quadro mais recente
+    def resumo(self, n=QUADROS_MEDIA):
+        quadros = self.quadros(n)
+        if not quadros:
+            return 0.0, {}, {}
+        totais = {}
+        for quadro in quadros:
+            for nome, inicio, fim in quadro["etapas"]:
+                totais[nome] = totais.get(nome, 0.0) + (fim - inicio)
+        medias = {nome: total / len(quadros) for nome, total in totais.items()}
+        duracao = sum(q["fim"] - q["inicio"] for q in quadros) / len(quadros)
+        return duracao, medias, quadros[-1]["contagens"]
+
+    # Grava o buffer no formato de trace do Chrome (abre em chrome://tracing ou
+    # no Perfetto): uma fatia por quadro e uma por etapa, com as contagens
+    def salvar_trace(self, caminho):
+        eventos = []
+        pid = os.getpid()
+        for registro in self.registros:
+            if registro["fim"] is None:
+                continue
+            eventos.append({"name": registro["tipo"], "ph": "X", "pid": pid, "tid": 0,
+                            "ts": registro["inicio"] * 1e6, "dur": (registro["fim"] - registro["inicio"]) * 1e6,
+                            "args": registro["contagens"]})
+            for nome, inicio, fim in registro["etapas"]:
+                if registro["tipo"] != "quadro" and nome == registro["tipo"]:
+                    continue
+                eventos.append({"name": nome, "ph": "X", "pid": pid, "tid": 1,
+                                "ts": inicio * 1e6, "dur": (fim - inicio) * 1e6})
+            if registro["contagens"]:
+                eventos.append({"name": "contagens", "ph": "C", "pid": pid, "ts": registro["inicio"] * 1e6,
+                                "args": registro["contagens"]})
+        with open(caminho, "w", encoding="utf-8") as arquivo:
+            json.dump({"traceEvents": eventos, "displayTimeUnit": "ms"}, arquivo)
+        return len(eventos)
+
+
+# Painel sobreposto ao canvas com FPS, tempo médio por etapa e contagens do
+# último quadro. Quando escondido, não custa nada além do teste de visibilidade.
+class PainelDesempenho:
+    def __init__(self, canvas, perfilador, tag="painel_desempenho"):
+        self.canvas = canvas
+        self.perfilador = perfilador
+        self.tag = tag
+        self.visivel = False
+        self._texto = None
+        self._fundo = None
+
+    def alternar(self):
+        self.visivel = not self.visivel
+        if self.visivel:
+            self.atualizar()
+        else:
+            self.canvas.delete(self.tag)
+            self._texto = self._fundo = None
+
+    def atualizar(self):
+        if not self.visivel:
+            return
+        duracao, medias, contagens = self.perfilador.resumo()
+        linhas = [f"FPS {self.perfilador.fps():5.1f}   quadro {duracao * 1000:6.2f} ms"]
+        linhas += [f"{nome:<12}{media * 1000:8.2f} ms" for nome, media in medias.items()]
+        linhas += [f"{nome:<12}{valor:>8}" for nome, valor in contagens.items()]
+        texto = "\n".join(linhas)
+
+        if self._texto is None:
+            self._fundo = self.canvas.create_rectangle(0, 0, 0, 0, fill="white", outline="gray", tags=(self.tag,))
+            self._texto = self.canvas.create_text(10, 10, anchor="nw", font=("Courier", 9), fill="black",
+                                                  text=texto, tags=(self.tag,))
+        else:
+            self.canvas.itemconfigure(self._texto, text=texto)
+        caixa = self.canvas.bbox(self._texto)
+        if caixa:
+            x0, y0, x1, y1 = caixa
+            self.canvas.coords(self._fundo, x0 - 4, y0 - 4, x1 + 4, y1 + 4)
+        self.canvas.tag_raise(self.tag)
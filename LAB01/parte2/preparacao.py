@@ -0,0 +1,202 @@
+import os
+import queue
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+from recorte import recortar_objetos, juntar_recortes, chave_recorte
+
+# Quantidade de objetos candidatos por bloco de recorte; com menos que isso o
+# quadro é preparado direto na thread da interface (o custo da fila não compensa)
+OBJETOS_POR_BLOCO = 20000
+# Intervalo (ms) com que a interface verifica se há trabalhos terminados
+INTERVALO_CONSULTA = 5
+
+
+# Sinaliza que um trabalho foi abandonado porque outro mais novo o substituiu
+class TrabalhoCancelado(Exception):
+    pass
+
+
+# Prepara quadros (transformação + recorte) e carrega cenas em segundo plano,
+# num pool de threads (as operações do NumPy liberam o GIL). Os trabalhos nunca
+# tocam no Tk: o que fica pronto vai para uma fila que a thread da interface
+# consulta com after, e só então é entregue. Cada quadro é dividido em blocos
+# recortados em paralelo; o último bloco a terminar junta todos, de modo que a
+# interface sempre troca um quadro inteiro de uma vez (o quadro em exibição
+# continua valendo até lá). Um novo pedido cancela o anterior: os blocos que
+# ainda não começaram desistem e o resultado atrasado é descartado.
+class PreparadorQuadros:
+    def __init__(self, root, trabalhadores=None, objetos_por_bloco=OBJETOS_POR_BLOCO):
+        self.root = root
+        self.objetos_por_bloco = objetos_por_bloco
+        self._executor = ThreadPoolExecutor(max_workers=trabalhadores or os.cpu_count() or 2,
+                                            thread_name_prefix="preparacao")
+        self._prontos = queue.Queue()  # (tipo, id do trabalho, dados)
+        self._trava = threading.Lock()
+        self._id_quadro = 0  # Trabalho de quadro mais recente (os demais estão cancelados)
+        self._id_carga = 0
+        self._quadro = None  # (id, chave, callback) do quadro em preparação
+        self._carga = None  # (id, callback, callback de erro, callback de progresso)
+        self._consulta = None  # id do after de consulta da fila
+        self._chave = None  # Chave do último quadro entregue
+        self._resultado = None
+
+    # Pool de threads, para outros trabalhos em segundo plano que não passam pela
+    # fila da interface (ex.: o cálculo dos níveis de detalhe)
+    @property
+    def executor(self):
+        return self._executor
+
+    @property
+    def ocupado(self):
+        return self._quadro is not None or self._carga is not None
+
+    # Se há um quadro em preparação em segundo plano
+    @property
+    def preparando(self):
+        return self._quadro is not None
+
+    # Se há uma carga em segundo plano
+    @property
+    def carregando(self):
+        return self._carga is not None
+
+    # Pede um novo quadro; ao_terminar(resultado) é chamado na thread da
+    # interface com o ResultadoRecorte completo. Se nada mudou desde o último
+    # quadro, ele é entregue de novo na hora.
+    def preparar(self, cena, matriz_ncs, indices, lod, nivel, ao_terminar):
+        chave = chave_recorte(cena, matriz_ncs, indices, lod, nivel)
+        if self._quadro is not None and self._quadro[1] == chave:
+            self._quadro = (self._quadro[0], chave, ao_terminar)  # O mesmo quadro já está a caminho
+            return
+        self.cancelar_quadro()
+        if chave == self._chave:
+            ao_terminar(self._resultado)
+            return
+
+        indices = np.asarray(indices, dtype=np.int64)
+        if len(indices) <= self.objetos_por_bloco:
+            self._entregar_quadro(chave, recortar_objetos(cena, matriz_ncs, indices, lod, nivel), ao_terminar)
+            return
+
+        with self._trava:
+            self._id_quadro += 1
+            id_quadro = self._id_quadro
+        self._quadro = (id_quadro, chave, ao_terminar)
+
+        blocos = [indices[i:i + self.objetos_por_bloco] for i in range(0, len(indices), self.objetos_por_bloco)]
+        partes = [None] * len(blocos)
+        restantes = [len(blocos)]
+        nivel_detalhe = nivel if lod is not None else None
+
+        def recortar_bloco(k):
+            if self._id_quadro != id_quadro:
+                return
+            partes[k] = recortar_objetos(cena, matriz_ncs, blocos[k], lod, nivel)
+            with self._trava:
+                restantes[0] -= 1
+                ultimo = restantes[0] == 0
+            if ultimo and self._id_quadro == id_quadro:
+                self._prontos.put(("quadro", id_quadro, juntar_recortes(len(cena), partes, nivel_detalhe)))
+
+        for k in range(len(blocos)):
+            self._executor.submit(self._proteger, "quadro", id_quadro, recortar_bloco, k)
+        self._agendar_consulta()
+
+    # Executa carregar(progresso) em segundo plano. ao_terminar(resultado) ou
+    # ao_falhar(erro) e progresso(fração) são chamados na thread da interface.
+    # Uma nova carga cancela a anterior na próxima vez que ela informar progresso.
+    def carregar(self, carregar, ao_terminar, ao_falhar=None, progresso=None):
+        self.cancelar_carga()
+        with self._trava:
+            self._id_carga += 1
+            id_carga = self._id_carga
+        self._carga = (id_carga, ao_terminar, ao_falhar, progresso)
+
+        def informar_progresso(fracao):
+            if self._id_carga != id_carga:
+                raise TrabalhoCancelado()
+            self._prontos.put(("progresso", id_carga, fracao))
+
+        def executar():
+            self._prontos.put(("carga", id_carga, carregar(informar_progresso)))
+
+        self._executor.submit(self._proteger, "carga", id_carga, executar)
+        self._agendar_consulta()
+
+    def cancelar_quadro(self):
+        with self._trava:
+            self._id_quadro += 1
+        self._quadro = None
+
+    def cancelar_carga(self):
+        with self._trava:
+            self._id_carga += 1
+        self._carga = None
+
+    # Descarta o último quadro guardado (por exemplo, quando a cena é trocada)
+    def invalidar(self):
+        self.cancelar_quadro()
+        self._chave = None
+        self._resultado = None
+
+    def encerrar(self):
+        self.cancelar_quadro()
+        self.cancelar_carga()
+        if self._consulta is not None:
+            self.root.after_cancel(self._consulta)
+            self._consulta = None
+        self._executor.shutdown(wait=False)
+
+    # Erros dos trabalhos voltam pela fila, para serem tratados na interface
+    def _proteger(self, tipo, id_trabalho, funcao, *args):
+        try:
+            funcao(*args)
+        except TrabalhoCancelado:
+            pass
+        except Exception as e:
+            self._prontos.put(("erro_" + tipo, id_trabalho, e))
+
+    def _entregar_quadro(self, chave, resultado, ao_terminar):
+        self._chave = chave
+        self._resultado = resultado
+        ao_terminar(resultado)
+
+    def _agendar_consulta(self):
+        if self._consulta is None:
+            self._consulta = self.root.after(INTERVALO_CONSULTA, self._consultar)
+
+    # Roda na thread da interface: entrega o que ficou pronto e ainda vale
+    def _consultar(self):
+        self._consulta = None
+        while True:
+            try:
+                tipo, id_trabalho, dados = self._prontos.get_nowait()
+            except queue.Empty:
+                break
+
+            if tipo in ("quadro", "erro_quadro"):
+                if self._quadro is None or self._quadro[0] != id_trabalho:
+                    continue  # Quadro atrasado: já foi substituído por outro
+                _, chave, ao_terminar = self._quadro
+                self._quadro = None
+                if tipo == "quadro":
+                    self._entregar_quadro(chave, dados, ao_terminar)
+                else:
+                    print(f"Erro ao preparar o quadro: {dados}")
+            elif self._carga is not None and self._carga[0] == id_trabalho:
+                _, ao_terminar, ao_falhar, progresso = self._carga
+                if tipo == "progresso":
+                    if progresso is not None:
+                        progresso(dados)
+                    continue
+                self._carga = None
+                if tipo == "carga":
+                    ao_terminar(dados)
+                elif ao_falhar is not None:
+                    ao_falhar(dados)
+
+        if self.ocupado:
+            self._agendar_consulta()
@@ -0,0 +1,276 @@
+import base64
+import struct
+import zlib
+
+import numpy as np
+
+from cena import TIPO_PONTO, TIPO_RETA, TIPO_POLIGONO, faixas
+from recorte import ResultadoRecorte
+
+
+# Nomes de cor mais usados nas cenas, com os mesmos valores RGB do Tk
+CORES = {
+    "black": (0, 0, 0), "white": (255, 255, 255),
+    "red": (255, 0, 0), "green": (0, 128, 0), "blue": (0, 0, 255),
+    "yellow": (255, 255, 0), "cyan": (0, 255, 255), "magenta": (255, 0, 255),
+    "orange": (255, 165, 0), "purple": (128, 0, 128), "brown": (165, 42, 42), "pink": (255, 192, 203),
+    "gray": (190, 190, 190), "grey": (190, 190, 190),
+    "lightgray": (211, 211, 211), "lightgrey": (211, 211, 211),
+    "darkgray": (169, 169, 169), "darkgrey": (169, 169, 169),
+    "darkgreen": (0, 100, 0), "darkblue": (0, 0, 139), "darkred": (139, 0, 0),
+    "lightblue": (173, 216, 230), "lightgreen": (144, 238, 144), "navy": (0, 0, 128),
+}
+
+
+# Cor RGB de um nome da tabela ou de "#rgb"/"#rrggbb"; cores desconhecidas viram o padrão
+def cor_rgb(nome, padrao=(0, 0, 0)):
+    nome = nome.strip().lower()
+    if nome.startswith("#") and len(nome) in (4, 7):
+        try:
+            digitos = nome[1:] if len(nome) == 7 else "".join(c * 2 for c in nome[1:])
+            return tuple(int(digitos[i:i + 2], 16) for i in (0, 2, 4))
+        except ValueError:
+            return padrao
+    return CORES.get(nome.replace(" ", ""), padrao)
+
+
+# Quadro (framebuffer) RGB de altura x largura, preenchido com a cor de fundo
+def novo_quadro(largura, altura, fundo=(255, 255, 255)):
+    quadro = np.empty((altura, largura, 3), dtype=np.uint8)
+    quadro[:, :] = fundo
+    return quadro
+
+
+# Pinta um quadrado de lado 2*raio+1 centrado em cada ponto (coordenadas de pixel)
+def desenhar_pontos(quadro, pontos, cor, raio=1):
+    altura, largura = quadro.shape[:2]
+    centros = np.rint(np.asarray(pontos, dtype=np.float64).reshape(-1, 2)).astype(np.int64)
+    for dy in range(-raio, raio + 1):
+        for dx in range(-raio, raio + 1):
+            x = centros[:, 0] + dx
+            y = centros[:, 1] + dy
+            dentro = (x >= 0) & (x < largura) & (y >= 0) & (y < altura)
+            quadro[y[dentro], x[dentro]] = cor
+
+
+# Pinta N segmentos de uma vez amostrando cada um com um passo de no máximo um
+# pixel (DDA em lote): todos os pixels de todos os segmentos saem de um único repeat
+def desenhar_segmentos(quadro, p0, p1, cor):
+    altura, largura = quadro.shape[:2]
+    p0 = np.asarray(p0, dtype=np.float64).reshape(-1, 2)
+    p1 = np.asarray(p1, dtype=np.float64).reshape(-1, 2)
+    if len(p0) == 0:
+        return
+
+    passos = np.ceil(np.max(np.abs(p1 - p0), axis=1)).astype(np.int64)
+    passos = np.minimum(passos, 4 * (largura + altura))  # Segmentos enormes: só o que cabe na tela importa
+    amostras = passos + 1
+    segmento = np.repeat(np.arange(len(p0)), amostras)
+    primeiro = np.concatenate([[0], np.cumsum(amostras)[:-1]])
+    k = np.arange(len(segmento)) - primeiro[segmento]
+    t = k / np.maximum(passos[segmento], 1)
+
+    pontos = p0[segmento] + t[:, None] * (p1 - p0)[segmento]
+    x = np.rint(pontos[:, 0]).astype(np.int64)
+    y = np.rint(pontos[:, 1]).astype(np.int64)
+    dentro = (x >= 0) & (x < largura) & (y >= 0) & (y < altura)
+    quadro[y[dentro], x[dentro]] = cor
+
+
+# Bresenham em lote: as extremidades são arredondadas para pixels e o k-ésimo
+# pixel de cada segmento sai direto da forma fechada do erro acumulado
+# (eixo menor = início + floor((2*k*d_menor + d_maior) / (2*d_maior))), só com
+# aritmética inteira. Com espessura > 1 o traço é repetido deslocado no eixo menor.
+# As extremidades devem estar perto do quadro (já recortadas), pois todos os
+# pixels do segmento são gerados.
+def desenhar_segmentos_bresenham(quadro, p0, p1, cor, espessura=1):
+    altura, largura = quadro.shape[:2]
+    p0 = np.rint(np.asarray(p0, dtype=np.float64).reshape(-1, 2)).astype(np.int64)
+    p1 = np.rint(np.asarray(p1, dtype=np.float64).reshape(-1, 2)).astype(np.int64)
+    if len(p0) == 0:
+        return
+
+    d = np.abs(p1 - p0)
+    passo = np.sign(p1 - p0)
+    x_maior = d[:, 0] >= d[:, 1]  # Segmentos mais horizontais que verticais
+    maior = np.where(x_maior, d[:, 0], d[:, 1])
+    menor = np.where(x_maior, d[:, 1], d[:, 0])
+
+    amostras = maior + 1
+    segmento = np.repeat(np.arange(len(p0)), amostras)
+    primeiro = np.concatenate([[0], np.cumsum(amostras)[:-1]])
+    k = np.arange(len(segmento)) - primeiro[segmento]
+    maior_s = maior[segmento]
+    avanco_menor = (2 * k * menor[segmento] + maior_s) // np.maximum(2 * maior_s, 1)
+
+    horizontal = x_maior[segmento]
+    x = p0[segmento, 0] + passo[segmento, 0] * np.where(horizontal, k, avanco_menor)
+    y = p0[segmento, 1] + passo[segmento, 1] * np.where(horizontal, avanco_menor, k)
+    for deslocamento in range(espessura):
+        xs = x + np.where(horizontal, 0, deslocamento)
+        ys = y + np.where(horizontal, deslocamento, 0)
+        dentro = (xs >= 0) & (xs < largura) & (ys >= 0) & (ys < altura)
+        quadro[ys[dentro], xs[dentro]] = cor
+
+
+# Preenche polígonos (vértices em pixels, delimitados por offsets) por varredura
+# com tabela de arestas ativas, calculada para todas as linhas de uma vez: cada
+# aresta não horizontal é ativa nas linhas cujo centro (y + 0.5) fica em
+# [y_min, y_max); as interseções de cada linha são ordenadas por x e tomadas aos
+# pares (regra par-ímpar). Os trechos entram como +1/-1 numa tabela por linha
+# cuja soma acumulada dá a cobertura, então o custo cresce com os pixels, não
+# com a quantidade de polígonos.
+def preencher_poligonos(quadro, vertices, offsets, cor):
+    altura, largura = quadro.shape[:2]
+    offsets = np.asarray(offsets, dtype=np.int64)
+    a, b = arestas_poligonos(np.asarray(vertices, dtype=np.float64), offsets, np.arange(len(offsets) - 1))
+    if len(a) == 0:
+        return
+    poligono = np.repeat(np.arange(len(offsets) - 1), np.maximum(np.diff(offsets), 0))
+
+    nao_horizontal = a[:, 1] != b[:, 1]
+    a, b, poligono = a[nao_horizontal], b[nao_horizontal], poligono[nao_horizontal]
+    y_min = np.minimum(a[:, 1], b[:, 1])
+    y_max = np.maximum(a[:, 1], b[:, 1])
+    primeira = np.clip(np.ceil(y_min - 0.5), 0, altura).astype(np.int64)
+    ultima = np.clip(np.ceil(y_max - 0.5), 0, altura).astype(np.int64)  # Exclusiva
+    linhas_por_aresta = np.maximum(ultima - primeira, 0)
+    total = int(linhas_por_aresta.sum())
+    if total == 0:
+        return
+
+    # Uma entrada (polígono, linha, x) por aresta ativa em cada linha
+    aresta = np.repeat(np.arange(len(a)), linhas_por_aresta)
+    inicio = np.concatenate([[0], np.cumsum(linhas_por_aresta)[:-1]])
+    linha = primeira[aresta] + np.arange(total) - inicio[aresta]
+    a_, b_ = a[aresta], b[aresta]
+    x = a_[:, 0] + (linha + 0.5 - a_[:, 1]) * (b_[:, 0] - a_[:, 0]) / (b_[:, 1] - a_[:, 1])
+
+    ordem = np.lexsort((x, linha, poligono[aresta]))
+    x, linha = x[ordem], linha[ordem]
+    x_inicio = np.clip(np.ceil(x[0::2] - 0.5), 0, largura).astype(np.int64)
+    x_fim = np.clip(np.ceil(x[1::2] - 0.5), 0, largura).astype(np.int64)
+    linha = linha[0::2]
+
+    cobertura = np.zeros((altura, largura + 1), dtype=np.int32)
+    np.add.at(cobertura, (linha, x_inicio), 1)
+    np.add.at(cobertura, (linha, x_fim), -1)
+    quadro[np.cumsum(cobertura, axis=1)[:, :largura] > 0] = cor
+
+
+# Segmentos (início, fim) de todas as arestas dos polígonos indicados, incluindo
+# a aresta que fecha cada anel
+def arestas_poligonos(coords, offsets, indices):
+    inicios = offsets[indices]
+    tamanhos = offsets[indices + 1] - inicios
+    tamanhos = np.where(tamanhos > 0, tamanhos, 0)
+    total = int(tamanhos.sum())
+    if total == 0:
+        vazio = np.empty((0, 2))
+        return vazio, vazio
+    deslocamento = np.concatenate([[0], np.cumsum(tamanhos)[:-1]])
+    atual = np.repeat(inicios - deslocamento, tamanhos) + np.arange(total)
+    proximo = atual + 1
+    ultimos = np.cumsum(tamanhos)[tamanhos > 0] - 1
+    proximo[ultimos] = inicios[tamanhos > 0]
+    return coords[atual], coords[proximo]
+
+
+# Rasteriza no quadro os objetos visíveis de um recorte, dados os vértices
+# recortados já em pixels do quadro. Os objetos são agrupados por tipo e cor e
+# cada grupo é desenhado de uma vez: polígonos (preenchidos, se pedido), depois
+# retas, depois pontos.
+def rasterizar_recorte(quadro, cena, recorte, pixels, raio_ponto=2, largura_poligono=2, preencher=False):
+    posicoes = np.flatnonzero(recorte.visivel)
+    indices = recorte.indices[posicoes]
+    tipos = cena.tipos[indices]
+    cores = cena.cores[indices]
+    inicios = recorte.offsets[posicoes]
+
+    for tipo in (TIPO_POLIGONO, TIPO_RETA, TIPO_PONTO):
+        do_tipo = tipos == tipo
+        for codigo in np.unique(cores[do_tipo]).tolist():
+            grupo = do_tipo & (cores == codigo)
+            rgb = cor_rgb(cena.paleta[codigo])
+            if tipo == TIPO_POLIGONO:
+                selecionados = posicoes[grupo]
+                if preencher:
+                    tamanhos = recorte.offsets[selecionados + 1] - recorte.offsets[selecionados]
+                    vertices = pixels[faixas(recorte.offsets[selecionados], tamanhos)]
+                    preencher_poligonos(quadro, vertices, np.concatenate([[0], np.cumsum(tamanhos)]), rgb)
+                p0, p1 = arestas_poligonos(pixels, recorte.offsets, selecionados)
+                desenhar_segmentos_bresenham(quadro, p0, p1, rgb, largura_poligono)
+            elif tipo == TIPO_RETA:
+                desenhar_segmentos_bresenham(quadro, pixels[inicios[grupo]], pixels[inicios[grupo] + 1], rgb)
+            else:
+                desenhar_pontos(quadro, pixels[inicios[grupo]], rgb, raio=raio_ponto)
+
+
+# Retângulo de pixels [x0, x1) x [y0, y1), dentro de um quadro de largura x
+# altura, que cobre uma caixa do mundo (com uma margem em pixels), dada a
+# matriz mundo -> pixels do quadro. None se ficar fora do quadro.
+def retangulo_pixels(caixa, matriz, largura, altura, margem=0):
+    x_min, y_min, x_max, y_max = caixa
+    cantos = matriz[:2, :2] @ np.array([[x_min, x_min, x_max, x_max], [y_min, y_max, y_min, y_max]]) + matriz[:2, 2:]
+    x0 = max(0, int(np.floor(cantos[0].min())) - margem)
+    y0 = max(0, int(np.floor(cantos[1].min())) - margem)
+    x1 = min(largura, int(np.ceil(cantos[0].max())) + margem + 1)
+    y1 = min(altura, int(np.ceil(cantos[1].max())) + margem + 1)
+    if x0 >= x1 or y0 >= y1:
+        return None
+    return x0, y0, x1, y1
+
+
+# Refaz só um retângulo (x0, y0, x1, y1) do quadro: pinta o fundo e rasteriza de
+# novo, recortados no retângulo, os objetos do recorte cuja caixa em pixels
+# chega nele. Os demais pixels do quadro ficam como estavam.
+def rasterizar_regiao(quadro, retangulo, fundo, cena, recorte, pixels, raio_ponto=2, largura_poligono=2,
+                      preencher=False):
+    x0, y0, x1, y1 = retangulo
+    parte = quadro[y0:y1, x0:x1]
+    parte[:, :] = fundo
+
+    # Objetos invisíveis não têm vértices, então os visíveis são faixas seguidas de pixels
+    posicoes = np.flatnonzero(recorte.visivel & (np.diff(recorte.offsets) > 0))
+    if len(posicoes) == 0:
+        return
+    inicios = recorte.offsets[posicoes]
+    minimos = np.minimum.reduceat(pixels, inicios, axis=0)
+    maximos = np.maximum.reduceat(pixels, inicios, axis=0)
+    margem = max(raio_ponto, largura_poligono) + 1
+    toca = ((maximos[:, 0] >= x0 - margem) & (minimos[:, 0] < x1 + margem) &
+            (maximos[:, 1] >= y0 - margem) & (minimos[:, 1] < y1 + margem))
+
+    visivel = np.zeros(len(recorte.indices), dtype=bool)
+    visivel[posicoes[toca]] = True
+    filtrado = ResultadoRecorte(len(cena), recorte.indices, visivel, recorte.completo, recorte.coords,
+                                recorte.offsets, recorte.nivel_detalhe)
+    rasterizar_recorte(parte, cena, filtrado, pixels - (x0, y0), raio_ponto, largura_poligono, preencher)
+
+
+# Codifica o quadro como PNG (RGB, 8 bits) usando só zlib
+def codificar_png(quadro):
+    altura, largura = quadro.shape[:2]
+    linhas = np.concatenate([np.zeros((altura, 1), dtype=np.uint8),
+                             np.ascontiguousarray(quadro, dtype=np.uint8).reshape(altura, largura * 3)], axis=1)
+
+    def bloco(tipo, dados):
+        return (struct.pack(">I", len(dados)) + tipo + dados +
+                struct.pack(">I", zlib.crc32(tipo + dados) & 0xFFFFFFFF))
+
+    return (b"\x89PNG\r\n\x1a\n" +
+            bloco(b"IHDR", struct.pack(">IIBBBBB", largura, altura, 8, 2, 0, 0, 0)) +
+            bloco(b"IDAT", zlib.compress(linhas.tobytes(), 6)) +
+            bloco(b"IEND", b""))
+
+
+# Quadro no formato PPM binário, que o PhotoImage do Tk lê sem compressão
+# (bem mais rápido que PNG para trocar a imagem a cada quadro)
+def codificar_ppm(quadro):
+    altura, largura = quadro.shape[:2]
+    return b"P6 %d %d 255\n" % (largura, altura) + np.ascontiguousarray(quadro, dtype=np.uint8).tobytes()
+
+
+# PNG em base64, no formato aceito por tk.PhotoImage(data=...)
+def png_base64(quadro):
+    return base64.b64encode(codificar_png(quadro)).decode("ascii")
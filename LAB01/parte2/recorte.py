@@ -0,0 +1,237 @@
+import numpy as np
+
+from cena import TIPO_PONTO, TIPO_RETA, TIPO_POLIGONO, faixas
+from transformacoes import aplicar_matriz
+
+# Limites da região de recorte no NCS
+NCS_MIN = -1.0
+NCS_MAX = 1.0
+
+
+# Resultado do recorte de um conjunto de objetos da cena. Segue o mesmo formato
+# colunar da Cena: as coordenadas recortadas (no NCS) do i-ésimo objeto recortado
+# ficam em coords[offsets[i]:offsets[i+1]]; objetos invisíveis ficam com zero vértices.
+class ResultadoRecorte:
+    def __init__(self, n_objetos_cena, indices, visivel, completo, coords, offsets, nivel_detalhe=None):
+        self.indices = indices  # Índices (na cena) dos objetos recortados
+        self.visivel = visivel  # Se sobrou alguma parte do objeto dentro da window
+        self.completo = completo  # Se o objeto está inteiro dentro da window (não foi cortado)
+        self.coords = coords
+        self.offsets = offsets
+        self.nivel_detalhe = nivel_detalhe  # Nível de simplificação usado nos polígonos (None: originais)
+        self._n_objetos_cena = n_objetos_cena
+        self._posicao = None  # Posição de cada objeto da cena no resultado (montada sob demanda)
+
+    def coordenadas_ncs(self, indice):
+        if self._posicao is None:
+            self._posicao = np.full(self._n_objetos_cena, -1, dtype=np.int64)
+            self._posicao[self.indices] = np.arange(len(self.indices))
+        if indice >= len(self._posicao) or self._posicao[indice] < 0:
+            return None
+        i = self._posicao[indice]
+        if not self.visivel[i]:
+            return None
+        return self.coords[self.offsets[i]:self.offsets[i + 1]]
+
+
+# Teste de pertinência para pontos: máscara dos pontos dentro da window
+def recortar_pontos(pontos):
+    return np.all((pontos >= NCS_MIN) & (pontos <= NCS_MAX), axis=1)
+
+
+# Liang–Barsky aplicado a N retas de uma vez; devolve a máscara de visíveis e
+# as extremidades recortadas
+def recortar_retas(p0, p1):
+    d = p1 - p0
+    p = np.stack([-d[:, 0], d[:, 0], -d[:, 1], d[:, 1]], axis=1)
+    q = np.stack([p0[:, 0] - NCS_MIN, NCS_MAX - p0[:, 0],
+                  p0[:, 1] - NCS_MIN, NCS_MAX - p0[:, 1]], axis=1)
+
+    # Reta paralela a uma borda e fora dela é descartada
+    rejeitada = np.any((p == 0) & (q < 0), axis=1)
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        t = q / p
+    u1 = np.max(np.where(p < 0, t, 0.0), axis=1)
+    u2 = np.min(np.where(p > 0, t, 1.0), axis=1)
+
+    visivel = ~rejeitada & (u1 <= u2)
+    novo_p0 = p0 + u1[:, None] * d
+    novo_p1 = p0 + u2[:, None] * d
+    return visivel, novo_p0, novo_p1
+
+
+# Sutherland–Hodgman em lote: recorta vários polígonos (vértices concatenados,
+# delimitados por offsets) contra cada uma das quatro bordas, processando todas
+# as arestas de todos os polígonos de uma vez. Devolve os novos vértices e offsets.
+def recortar_poligonos(vertices, offsets):
+    n_poligonos = len(offsets) - 1
+    for eixo, limite, dentro_se_menor in ((0, NCS_MIN, False), (0, NCS_MAX, True),
+                                          (1, NCS_MIN, False), (1, NCS_MAX, True)):
+        if len(vertices) == 0:
+            break
+
+        # O vértice anterior do primeiro vértice de cada polígono é o último dele
+        tamanhos = np.diff(offsets)
+        poligono_de = np.repeat(np.arange(n_poligonos), tamanhos)
+        indice_anterior = np.arange(len(vertices)) - 1
+        com_vertices = tamanhos > 0
+        indice_anterior[offsets[:-1][com_vertices]] = offsets[1:][com_vertices] - 1
+
+        atual = vertices
+        anterior = vertices[indice_anterior]
+        if dentro_se_menor:
+            dentro_atual = atual[:, eixo] <= limite
+            dentro_anterior = anterior[:, eixo] <= limite
+        else:
+            dentro_atual = atual[:, eixo] >= limite
+            dentro_anterior = anterior[:, eixo] >= limite
+
+        # Interseção da aresta (anterior -> atual) com a borda
+        delta = atual[:, eixo] - anterior[:, eixo]
+        with np.errstate(divide="ignore", invalid="ignore"):
+            t = np.where(delta != 0, (limite - anterior[:, eixo]) / delta, 0.0)
+        intersecao = anterior + t[:, None] * (atual - anterior)
+        intersecao[:, eixo] = limite
+
+        # Para cada aresta a saída é [interseção?, vértice atual?], nessa ordem
+        mascara = np.stack([dentro_atual != dentro_anterior, dentro_atual], axis=1)
+        candidatos = np.stack([intersecao, atual], axis=1)
+        vertices = candidatos[mascara]
+
+        novos_tamanhos = np.bincount(poligono_de, weights=mascara.sum(axis=1), minlength=n_poligonos)
+        offsets = np.concatenate([[0], np.cumsum(novos_tamanhos)]).astype(np.int64)
+
+    return vertices, offsets
+
+
+# Recorta os objetos indicados da cena (todos, se indices for None) contra a
+# window, dada a matriz mundo -> NCS, sem alterar a cena (pode rodar fora da
+# thread da interface). Com um cache de níveis de detalhe (lod), os polígonos
+# grandes são recortados na versão simplificada do nível indicado.
+def recortar_objetos(cena, matriz_ncs, indices=None, lod=None, nivel=None):
+    if indices is None:
+        indices = np.flatnonzero(~cena.removidos)
+    indices = np.asarray(indices, dtype=np.int64)
+
+    offsets = cena.offsets
+    inicios = offsets[indices]
+    tamanhos = offsets[indices + 1] - inicios
+    tipos = cena.tipos[indices]
+
+    n = len(indices)
+    visivel = np.zeros(n, dtype=bool)
+    completo = np.zeros(n, dtype=bool)
+    tamanhos_saida = np.zeros(n, dtype=np.int64)
+
+    # Pontos: teste de pertinência
+    sel_pontos = np.flatnonzero((tipos == TIPO_PONTO) & (tamanhos >= 1))
+    pontos = aplicar_matriz(matriz_ncs, cena.coords[inicios[sel_pontos]])
+    dentro = recortar_pontos(pontos)
+    visivel[sel_pontos] = dentro
+    completo[sel_pontos] = dentro
+    sel_pontos, pontos = sel_pontos[dentro], pontos[dentro]
+    tamanhos_saida[sel_pontos] = 1
+
+    # Retas: Liang–Barsky em lote
+    sel_retas = np.flatnonzero((tipos == TIPO_RETA) & (tamanhos >= 2))
+    p0 = aplicar_matriz(matriz_ncs, cena.coords[inicios[sel_retas]])
+    p1 = aplicar_matriz(matriz_ncs, cena.coords[inicios[sel_retas] + 1])
+    vis, q0, q1 = recortar_retas(p0, p1)
+    visivel[sel_retas] = vis
+    completo[sel_retas] = vis & recortar_pontos(p0) & recortar_pontos(p1)
+    sel_retas, q0, q1 = sel_retas[vis], q0[vis], q1[vis]
+    tamanhos_saida[sel_retas] = 2
+
+    # Polígonos: descarte/aceite trivial pela caixa envolvente, Sutherland–Hodgman no resto
+    sel_poligonos = np.flatnonzero((tipos == TIPO_POLIGONO) & (tamanhos >= 1))
+    if lod is not None:
+        vertices, tamanhos_poligonos = lod.vertices_poligonos(cena, indices[sel_poligonos], nivel)
+    else:
+        tamanhos_poligonos = tamanhos[sel_poligonos]
+        vertices = cena.coords[faixas(inicios[sel_poligonos], tamanhos_poligonos)]
+    vertices = aplicar_matriz(matriz_ncs, vertices)
+    inicio_vertices = np.concatenate([[0], np.cumsum(tamanhos_poligonos)]).astype(np.int64)
+    if len(sel_poligonos):
+        minimos = np.minimum.reduceat(vertices, inicio_vertices[:-1], axis=0)
+        maximos = np.maximum.reduceat(vertices, inicio_vertices[:-1], axis=0)
+        fora = np.any((maximos < NCS_MIN) | (minimos > NCS_MAX), axis=1)
+        dentro = np.all((minimos >= NCS_MIN) & (maximos <= NCS_MAX), axis=1)
+
+        completo[sel_poligonos] = dentro
+        visivel[sel_poligonos] = dentro
+        tamanhos_saida[sel_poligonos[dentro]] = tamanhos_poligonos[dentro]
+
+        # Os que cruzam a borda são recortados todos juntos
+        parciais = np.flatnonzero(~fora & ~dentro)
+        tamanhos_parciais = tamanhos_poligonos[parciais]
+        recortados, offsets_recortados = recortar_poligonos(
+            vertices[faixas(inicio_vertices[parciais], tamanhos_parciais)],
+            np.concatenate([[0], np.cumsum(tamanhos_parciais)]).astype(np.int64))
+        parciais = sel_poligonos[parciais]
+        tamanhos_recortados = np.diff(offsets_recortados)
+        visivel[parciais] = tamanhos_recortados > 0
+        tamanhos_saida[parciais] = tamanhos_recortados
+    else:
+        dentro = np.zeros(0, dtype=bool)
+        parciais = np.zeros(0, dtype=np.int64)
+        recortados = np.empty((0, 2))
+
+    # Monta o buffer de saída espalhando cada grupo na sua posição
+    offsets_saida = np.concatenate([[0], np.cumsum(tamanhos_saida)]).astype(np.int64)
+    coords = np.empty((offsets_saida[-1], 2), dtype=np.float64)
+    coords[offsets_saida[sel_pontos]] = pontos
+    coords[offsets_saida[sel_retas]] = q0
+    coords[offsets_saida[sel_retas] + 1] = q1
+
+    inteiros = sel_poligonos[dentro]
+    origem = faixas(inicio_vertices[:-1][dentro], tamanhos_saida[inteiros])
+    coords[faixas(offsets_saida[inteiros], tamanhos_saida[inteiros])] = vertices[origem]
+    coords[faixas(offsets_saida[parciais], tamanhos_saida[parciais])] = recortados
+
+    return ResultadoRecorte(len(cena), indices, visivel, completo, coords, offsets_saida,
+                            nivel if lod is not None else None)
+
+
+# Junta os resultados do recorte de partes disjuntas da cena num só, na ordem dada
+def juntar_recortes(n_objetos_cena, partes, nivel_detalhe=None):
+    if len(partes) == 1:
+        return partes[0]
+    deslocamentos = np.cumsum([0] + [parte.offsets[-1] for parte in partes[:-1]])
+    offsets = np.concatenate([[0]] + [parte.offsets[1:] + deslocamento
+                                      for parte, deslocamento in zip(partes, deslocamentos)])
+    return ResultadoRecorte(n_objetos_cena,
+                            np.concatenate([parte.indices for parte in partes]),
+                            np.concatenate([parte.visivel for parte in partes]),
+                            np.concatenate([parte.completo for parte in partes]),
+                            np.concatenate([parte.coords for parte in partes]),
+                            offsets.astype(np.int64), nivel_detalhe)
+
+
+# Troca, num resultado de recorte, as entradas dos objetos indicados pelas de um
+# recorte parcial (objetos editados); os indicados que não estão no parcial
+# (por exemplo, removidos da cena) simplesmente saem do resultado
+def substituir_recortes(resultado, parcial, indices, n_objetos_cena):
+    manter = np.flatnonzero(~np.isin(resultado.indices, indices))
+    inicios = resultado.offsets[manter]
+    tamanhos = resultado.offsets[manter + 1] - inicios
+    mantido = ResultadoRecorte(n_objetos_cena, resultado.indices[manter], resultado.visivel[manter],
+                               resultado.completo[manter], resultado.coords[faixas(inicios, tamanhos)],
+                               np.concatenate([[0], np.cumsum(tamanhos)]).astype(np.int64))
+    return juntar_recortes(n_objetos_cena, [mantido, parcial], resultado.nivel_detalhe)
+
+
+# Aplica à cena um resultado de recorte: atualiza cena.visivel e cena.recorte
+def aplicar_recorte(cena, resultado):
+    cena.visivel[:] = False
+    cena.visivel[resultado.indices] = resultado.visivel
+    cena.recorte = resultado
+
+
+# Identifica um recorte: mesma cena (e versão), mesma window, mesmos objetos e
+# mesmo nível. O recorte fica em cache até a window ou a cena mudarem: o
+# PreparadorQuadros (preparacao.py) guarda o último resultado com esta chave e
+# o entrega de novo sem recortar enquanto ela for a mesma.
+def chave_recorte(cena, matriz_ncs, indices=None, lod=None, nivel=None):
+    return (id(cena), cena.versao, matriz_ncs.tobytes(),
+            None if indices is None else np.asarray(indices).tobytes(), id(lod), nivel)
@@ -0,0 +1,198 @@
+import numpy as np
+
+from cena import TIPO_PONTO, TIPO_RETA, TIPO_POLIGONO
+from lote_canvas import LoteCanvas
+from transformacoes import aplicar_matriz
+
+# Tolerância para decidir se a mudança de matriz entre dois quadros é só translação/escala
+EPSILON = 1e-9
+
+
+# Renderizador em modo retido: mantém um item do canvas por objeto visível da
+# cena (índice do objeto -> id do item) e, a cada quadro, só cria itens para
+# objetos que entraram na window, apaga os que saíram e atualiza os demais.
+# Quando a window só foi deslocada ou escalada, os itens que não foram cortados
+# pelo recorte são ajustados de uma vez com canvas.move/canvas.scale.
+class RenderizadorRetido:
+    recorte_proprio = False  # Desenha a partir do recorte da window feito pelo Visualizador
+    def __init__(self, canvas, raio_ponto=2, largura_poligono=2, tag="cena"):
+        self.canvas = canvas
+        self.raio_ponto = raio_ponto
+        self.largura_poligono = largura_poligono
+        self.tag = tag
+        self.itens = {}  # índice do objeto na cena -> id do item no canvas
+        self._cores = {}  # índice do objeto -> índice da cor com que o item foi desenhado
+        self._revisoes = {}  # índice do objeto -> revisão da geometria com que o item foi desenhado
+        self._completos = set()  # objetos desenhados sem corte no último quadro
+        self._matriz = None  # Matriz mundo -> viewport do último quadro
+        self._nivel_detalhe = None  # Nível de simplificação dos polígonos no último quadro
+        self._pontos_distorcidos = False  # Pontos escalados por um quadro provisório
+        self._lote = LoteCanvas(canvas)  # Comandos do quadro, enviados ao Tcl em lote
+        self._estilos = {}  # (tipo, cor) -> (tipo do item, opções)
+
+    @property
+    def n_itens(self):
+        return len(self.itens)
+
+    def limpar(self):
+        self.canvas.delete(self.tag)
+        self.itens.clear()
+        self._cores.clear()
+        self._revisoes.clear()
+        self._completos.clear()
+        self._matriz = None
+        self._nivel_detalhe = None
+        self._pontos_distorcidos = False
+
+    # Aplica a todos os itens, com um único comando, a transformação que leva a
+    # matriz do quadro anterior à nova. Devolve "translacao", "escala" ou None
+    # (quando há rotação e cada item precisa ser recalculado).
+    def _transformar_em_bloco(self, matriz):
+        if self._matriz is None:
+            return None
+        delta = matriz @ np.linalg.inv(self._matriz)
+        if abs(delta[0, 1]) > EPSILON or abs(delta[1, 0]) > EPSILON:
+            return None
+
+        sx, sy = delta[0, 0], delta[1, 1]
+        tx, ty = delta[0, 2], delta[1, 2]
+        if abs(sx - 1) <= EPSILON and abs(sy - 1) <= EPSILON:
+            if abs(tx) > EPSILON or abs(ty) > EPSILON:
+                self.canvas.move(self.tag, tx, ty)
+            return "translacao"
+
+        self.canvas.scale(self.tag, 0, 0, sx, sy)
+        self.canvas.move(self.tag, tx, ty)
+        return "escala"
+
+    # Quadro provisório (durante animações e arrastes): só ajusta os itens que já
+    # existem com o move/scale em bloco, sem recortar nem criar/apagar itens. O
+    # próximo desenhar completo corrige o que ficou para trás. Devolve False
+    # quando não há como (rotação ou nenhum quadro anterior).
+    def transformar_rapido(self, matriz):
+        modo = self._transformar_em_bloco(matriz)
+        if modo is None:
+            return False
+        self._matriz = matriz
+        if modo == "escala":
+            self._pontos_distorcidos = True
+        return True
+
+    # Tipo do item do canvas e opções de cada estilo
+    def _estilo(self, tipo, cor):
+        estilo = self._estilos.get((tipo, cor))
+        if estilo is None:
+            if tipo == TIPO_PONTO:
+                estilo = ("oval", ("-fill", cor, "-tags", self.tag))
+            elif tipo == TIPO_RETA:
+                estilo = ("line", ("-fill", cor, "-tags", self.tag))
+            else:
+                estilo = ("polygon", ("-outline", cor, "-fill", "", "-width", self.largura_poligono, "-tags", self.tag))
+            self._estilos[(tipo, cor)] = estilo
+        return estilo
+
+    def _coords(self, tipo, pontos):
+        if tipo == TIPO_PONTO:
+            x, y = pontos[0]
+            r = self.raio_ponto
+            return (x - r, y - r, x + r, y + r)
+        return [c for p in pontos for c in p]
+
+    # Criações, atualizações e remoções de itens vão para o lote e só chegam ao
+    # canvas no _enviar, em poucas chamadas agrupadas por estilo
+    def _criar(self, indice, tipo, pontos, cor):
+        item, opcoes = self._estilo(tipo, cor)
+        self._lote.criar(item, self._coords(tipo, pontos), opcoes, indice)
+
+    def _atualizar(self, item, tipo, pontos):
+        self._lote.mover_para(item, self._coords(tipo, pontos))
+
+    def _recolorir(self, item, tipo, cor):
+        self._lote.configurar(item, "-outline" if tipo == TIPO_POLIGONO else "-fill", cor)
+
+    def _descartar(self, indice):
+        item = self.itens.pop(indice, None)
+        if item is not None:
+            self._lote.apagar(item)
+        self._cores.pop(indice, None)
+        self._revisoes.pop(indice, None)
+        self._completos.discard(indice)
+
+    def _enviar(self):
+        self.itens.update(self._lote.enviar())
+
+    def remover(self, indice):
+        self._descartar(indice)
+        self._enviar()
+
+    # Desenha o resultado do recorte; matriz_ncs_viewport leva o NCS para a
+    # viewport e matriz é a transformação mundo -> viewport completa do quadro
+    def desenhar(self, cena, recorte, matriz_ncs_viewport, matriz):
+        posicoes = np.flatnonzero(recorte.visivel)
+
+        # Objetos que saíram da window
+        agora = set(recorte.indices[posicoes].tolist())
+        for indice in [i for i in self.itens if i not in agora]:
+            self._descartar(indice)
+
+        modo = self._transformar_em_bloco(matriz)
+        self._matriz = matriz
+        pontos_distorcidos = self._pontos_distorcidos
+        self._pontos_distorcidos = False
+
+        # Se o nível de detalhe mudou, os polígonos têm outros vértices e precisam ser refeitos
+        mesmo_nivel = recorte.nivel_detalhe == self._nivel_detalhe
+        self._nivel_detalhe = recorte.nivel_detalhe
+        self._sincronizar(cena, recorte, posicoes, matriz_ncs_viewport, modo, pontos_distorcidos, mesmo_nivel)
+
+    # Atualiza só os itens dos objetos editados (indices), sem mexer nos demais:
+    # parcial é o recorte apenas desses objetos, na mesma visão do último quadro.
+    # Os editados que não ficaram visíveis (ou foram removidos) perdem o item.
+    def desenhar_parcial(self, cena, recorte, parcial, indices, regiao, matriz_ncs_viewport, matriz):
+        posicoes = np.flatnonzero(parcial.visivel)
+        agora = set(parcial.indices[posicoes].tolist())
+        for indice in indices.tolist():
+            if indice not in agora:
+                self._descartar(indice)
+        self._sincronizar(cena, parcial, posicoes, matriz_ncs_viewport, None, False, True)
+
+    # Cria ou atualiza os itens dos objetos nas posições dadas do recorte. modo
+    # é o ajuste em bloco já feito nos itens ("translacao", "escala" ou None).
+    def _sincronizar(self, cena, recorte, posicoes, matriz_ncs_viewport, modo, pontos_distorcidos, mesmo_nivel):
+        indices_visiveis = recorte.indices[posicoes]
+        vertices_vp = aplicar_matriz(matriz_ncs_viewport, recorte.coords).tolist()
+        offsets = recorte.offsets.tolist()
+        completos = recorte.completo[posicoes].tolist()
+        tipos = cena.tipos[indices_visiveis].tolist()
+        cores = cena.cores[indices_visiveis].tolist()
+        revisoes = cena.revisoes[indices_visiveis].tolist()
+
+        for posicao, indice, completo, tipo, cor, revisao in zip(posicoes.tolist(), indices_visiveis.tolist(),
+                                                                 completos, tipos, cores, revisoes):
+            pontos = vertices_vp[offsets[posicao]:offsets[posicao + 1]]
+
+            item = self.itens.get(indice)
+            if item is None:
+                self._criar(indice, tipo, pontos, cena.paleta[cor])
+                self._cores[indice] = cor
+            else:
+                # Já ajustado pelo move/scale em bloco se continua inteiro na window
+                # (pontos não podem ser escalados, o raio mudaria) e não foi editado
+                ajustado = (modo == "translacao" or (modo == "escala" and tipo != TIPO_PONTO))
+                if tipo == TIPO_PONTO and pontos_distorcidos:
+                    ajustado = False
+                if tipo == TIPO_POLIGONO and not mesmo_nivel:
+                    ajustado = False
+                if not (ajustado and completo and indice in self._completos and
+                        self._revisoes.get(indice) == revisao):
+                    self._atualizar(item, tipo, pontos)
+                if self._cores[indice] != cor:
+                    self._recolorir(item, tipo, cena.paleta[cor])
+                    self._cores[indice] = cor
+            self._revisoes[indice] = revisao
+
+            if completo:
+                self._completos.add(indice)
+            else:
+                self._completos.discard(indice)
+        self._enviar()
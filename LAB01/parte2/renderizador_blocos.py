@@ -0,0 +1,294 @@
+import tkinter as tk
+from collections import OrderedDict
+
+import numpy as np
+
+from rasterizador import novo_quadro, rasterizar_recorte, cor_rgb, codificar_ppm
+from recorte import recortar_objetos
+from renderizador import EPSILON
+from transformacoes import aplicar_matriz, translacao
+
+# Lado (pixels) de cada bloco
+TAMANHO_BLOCO = 256
+# Memória máxima (bytes) das imagens guardadas no cache
+MEMORIA_PADRAO = 64 * 1024 * 1024
+# Pixels rasterizados além da borda de cada bloco e depois descartados: as
+# arestas criadas pelo recorte ficam nessa margem e não aparecem nas emendas
+MARGEM_BLOCO = 8
+# Diferença relativa máxima entre duas escalas tratadas como o mesmo nível de
+# zoom (só absorve o erro de arredondamento de zooms que voltam à mesma escala)
+TOLERANCIA_ESCALA = 1e-9
+# Níveis de zoom lembrados antes de descartar os que não têm blocos no cache
+MAX_NIVEIS = 64
+
+
+# Matriz que leva um retângulo de largura x altura pixels (origem no canto
+# superior esquerdo, y para baixo) ao NCS
+def matriz_pixels_ncs(largura, altura):
+    return np.array([[2.0 / largura, 0.0, -1.0],
+                     [0.0, -2.0 / altura, 1.0],
+                     [0.0, 0.0, 1.0]])
+
+
+# Rasteriza a parte do mundo que cai num retângulo de largura x altura pixels,
+# dada a matriz mundo -> pixels do retângulo: consulta o índice espacial pela
+# caixa do retângulo no mundo, recorta só esses objetos e os desenha num quadro.
+def rasterizar_janela(cena, consultar, lod, matriz, largura, altura, fundo=(255, 255, 255), raio_ponto=2,
+                      largura_poligono=2, preencher=False):
+    quadro = novo_quadro(largura, altura, fundo)
+    cantos = aplicar_matriz(np.linalg.inv(matriz), [(0, 0), (largura, 0), (0, altura), (largura, altura)])
+    candidatos = consultar(tuple(cantos.min(axis=0).tolist()) + tuple(cantos.max(axis=0).tolist()))
+    if len(candidatos) == 0:
+        return quadro
+    pixels_ncs = matriz_pixels_ncs(largura, altura)
+    recorte = recortar_objetos(cena, pixels_ncs @ matriz, candidatos, lod, lod.nivel_para(matriz))
+    pixels = aplicar_matriz(np.linalg.inv(pixels_ncs), recorte.coords)
+    rasterizar_recorte(quadro, cena, recorte, pixels, raio_ponto, largura_poligono, preencher)
+    return quadro
+
+
+# Renderizador por blocos: o mundo é dividido, em cada escala, numa grade fixa
+# de blocos quadrados rasterizados uma vez e guardados num cache LRU limitado
+# por memória. Com a escala (e a rotação) igual, a grade é a mesma: deslocar a
+# visão só move as imagens já no canvas e encaixa blocos do cache, e apenas os
+# que nunca foram vistos são rasterizados. Edições invalidam só os blocos que
+# cobrem a região alterada. Depois de cada quadro, os blocos seguintes na
+# direção do movimento são preparados em segundo plano (nos intervalos ociosos
+# do Tk). Visões rotacionadas não têm grade alinhada: são desenhadas como uma
+# imagem só, sem cache.
+class RenderizadorBlocos:
+    recorte_proprio = True  # Consulta e recorta por conta própria (não usa o recorte da window)
+
+    def __init__(self, canvas, consultar, lod, raio_ponto=2, largura_poligono=2, preencher=False, fundo="white",
+                 tamanho=TAMANHO_BLOCO, memoria=MEMORIA_PADRAO, tag="blocos"):
+        self.canvas = canvas
+        self.consultar = consultar  # consultar(caixa) -> índices dos objetos (índice espacial atual)
+        self.lod = lod
+        self.raio_ponto = raio_ponto
+        self.largura_poligono = largura_poligono
+        self.preencher = preencher
+        self.fundo = cor_rgb(fundo, (255, 255, 255))
+        self.tamanho = tamanho
+        self.memoria = memoria
+        self.tag = tag
+        self._cache = OrderedDict()  # (nível, i, j) -> PhotoImage, do menos para o mais usado
+        self._bytes_por_bloco = tamanho * tamanho * 4
+        self._itens = {}  # (nível, i, j) -> item do canvas dos blocos exibidos
+        self._niveis = {}  # Nível de zoom -> escala (sx, sy) com que os seus blocos são rasterizados
+        self._proximo_nivel = 0
+        self._imagem_unica = None  # (PhotoImage, item) da visão rotacionada
+        self._matriz = None  # Matriz mundo -> viewport do quadro exibido
+        self._viewport = None  # Retângulo (x0, y0, x1, y1) da viewport no canvas
+        self._geracao = None
+        self._cena = None
+        self._direcao = (0, 0)  # Sentido do último deslocamento, em blocos
+        self._pendentes = []  # Blocos a preparar antecipadamente
+        self._antecipacao = None  # id do after_idle da preparação antecipada
+        self.rasterizados = 0  # Blocos rasterizados (o resto veio do cache)
+
+    @property
+    def n_itens(self):
+        return len(self._itens) + (self._imagem_unica is not None)
+
+    def limpar(self):
+        self.canvas.delete(self.tag)
+        self._cache.clear()
+        self._itens.clear()
+        self._niveis.clear()
+        self._imagem_unica = None
+        self._matriz = None
+        self._parar_antecipacao()
+
+    # Não há itens por objeto; os blocos do objeto são invalidados pela região editada
+    def remover(self, indice):
+        pass
+
+    # Descarta do cache (e da tela) os blocos, de qualquer escala, que cobrem a caixa dada do mundo
+    def invalidar_regiao(self, regiao):
+        if regiao is None:
+            return
+        for chave in [c for c in self._cache if self._bloco_toca(c, regiao)]:
+            del self._cache[chave]
+            item = self._itens.pop(chave, None)
+            if item is not None:
+                self.canvas.delete(item)
+        self._pendentes = [c for c in self._pendentes if c in self._cache or not self._bloco_toca(c, regiao)]
+
+    def _bloco_toca(self, chave, regiao):
+        nivel, i, j = chave
+        sx, sy = self._niveis[nivel]
+        margem = MARGEM_BLOCO + max(self.raio_ponto, self.largura_poligono)
+        x = (np.array([i * self.tamanho - margem, (i + 1) * self.tamanho + margem])) / sx
+        y = (np.array([j * self.tamanho - margem, (j + 1) * self.tamanho + margem])) / sy
+        return (x.min() <= regiao[2] and x.max() >= regiao[0] and
+                y.min() <= regiao[3] and y.max() >= regiao[1])
+
+    # Nível de zoom de uma matriz sem rotação (None se houver rotação). Cada
+    # escala (pixels por unidade do mundo em x e y) vista ganha um nível, e uma
+    # escala a menos de TOLERANCIA_ESCALA de uma já vista reusa o nível dela (e
+    # os seus blocos, rasterizados com a escala registrada): voltar a um zoom
+    # por produtos de fatores em ponto flutuante cai na mesma grade.
+    def _nivel_zoom(self, matriz):
+        if abs(matriz[0, 1]) > EPSILON or abs(matriz[1, 0]) > EPSILON:
+            return None
+        sx, sy = float(matriz[0, 0]), float(matriz[1, 1])
+        for nivel, (nx, ny) in self._niveis.items():
+            if abs(sx - nx) <= TOLERANCIA_ESCALA * abs(nx) and abs(sy - ny) <= TOLERANCIA_ESCALA * abs(ny):
+                return nivel
+        if len(self._niveis) >= MAX_NIVEIS:
+            # Esquece os níveis sem nenhum bloco guardado (ex.: passos de animações)
+            usados = {c[0] for c in self._cache} | {c[0] for c in self._itens} | {c[0] for c in self._pendentes}
+            self._niveis = {n: e for n, e in self._niveis.items() if n in usados}
+        nivel = self._proximo_nivel
+        self._proximo_nivel += 1
+        self._niveis[nivel] = (sx, sy)
+        return nivel
+
+    def desenhar(self, cena, recorte, matriz_ncs_viewport, matriz):
+        if self._geracao != cena.geracao:
+            self.limpar()
+            self._geracao = cena.geracao
+        self._cena = cena
+        (x0, y0), (x1, y1) = aplicar_matriz(matriz_ncs_viewport, [(-1.0, 1.0), (1.0, -1.0)]).tolist()
+        viewport = (min(x0, x1), min(y0, y1), max(x0, x1), max(y0, y1))
+        anterior = self._matriz
+        self._matriz = matriz
+        self._viewport = viewport
+
+        nivel = self._nivel_zoom(matriz)
+        if nivel is None:
+            self._desenhar_rotacionada(cena, matriz, viewport)
+            return
+        if anterior is not None and self._nivel_zoom(anterior) == nivel:
+            dx, dy = matriz[0, 2] - anterior[0, 2], matriz[1, 2] - anterior[1, 2]
+            if abs(dx) > EPSILON or abs(dy) > EPSILON:
+                # O conteúdo anda ao contrário da window: blocos novos surgem do lado oposto
+                self._direcao = (-int(np.sign(dx)), -int(np.sign(dy)))
+        self._compor(matriz, nivel, viewport, rasterizar=True)
+        self._agendar_antecipacao(nivel, viewport, matriz)
+
+    # Quadro provisório: mesma escala, só deslocamento. Move os blocos na tela e
+    # encaixa os que já estão no cache; os que faltam ficam para o quadro
+    # completo. Numa mudança de escala (zoom animado) a imagem fica como está
+    # até o zoom terminar, já que blocos de escalas intermediárias não seriam
+    # reaproveitados.
+    def transformar_rapido(self, matriz):
+        if self._matriz is None or self._viewport is None:
+            return False
+        nivel = self._nivel_zoom(matriz)
+        if nivel is None or self._imagem_unica is not None:
+            return False
+        if nivel != self._nivel_zoom(self._matriz):
+            return True
+        self._matriz = matriz
+        self._compor(matriz, nivel, self._viewport, rasterizar=False)
+        return True
+
+    # Objetos editados: os blocos afetados já foram invalidados, basta compor de novo
+    def desenhar_parcial(self, cena, recorte, parcial, indices, regiao, matriz_ncs_viewport, matriz):
+        self.desenhar(cena, recorte, matriz_ncs_viewport, matriz)
+
+    # Intervalo de blocos (i0, j0, i1, j1) que cobre a viewport
+    def _faixa_blocos(self, matriz, viewport):
+        t = self.tamanho
+        x0, y0, x1, y1 = viewport
+        tx, ty = matriz[0, 2], matriz[1, 2]
+        return (int(np.floor((x0 - tx) / t)), int(np.floor((y0 - ty) / t)),
+                int(np.ceil((x1 - tx) / t)) - 1, int(np.ceil((y1 - ty) / t)) - 1)
+
+    def _compor(self, matriz, nivel, viewport, rasterizar):
+        if self._imagem_unica is not None:
+            self.canvas.delete(self._imagem_unica[1])
+            self._imagem_unica = None
+        t = self.tamanho
+        tx, ty = matriz[0, 2], matriz[1, 2]
+        i0, j0, i1, j1 = self._faixa_blocos(matriz, viewport)
+        visiveis = {(nivel, i, j) for i in range(i0, i1 + 1) for j in range(j0, j1 + 1)}
+
+        for chave in [c for c in self._itens if c not in visiveis]:
+            self.canvas.delete(self._itens.pop(chave))
+        for chave in sorted(visiveis, key=lambda c: (c[2], c[1])):
+            _, i, j = chave
+            imagem = self._cache.get(chave)
+            if imagem is None:
+                if not rasterizar:
+                    continue
+                imagem = self._rasterizar_bloco(chave)
+            else:
+                self._cache.move_to_end(chave)
+            x, y = tx + i * t, ty + j * t
+            item = self._itens.get(chave)
+            if item is None:
+                self._itens[chave] = self.canvas.create_image(x, y, anchor="nw", image=imagem, tags=(self.tag,))
+            else:
+                self.canvas.coords(item, x, y)
+        self._limitar_memoria(visiveis)
+
+    def _rasterizar_bloco(self, chave):
+        nivel, i, j = chave
+        sx, sy = self._niveis[nivel]
+        t, m = self.tamanho, MARGEM_BLOCO
+        matriz = np.array([[sx, 0.0, m - i * t], [0.0, sy, m - j * t], [0.0, 0.0, 1.0]])
+        quadro = rasterizar_janela(self._cena, self.consultar, self.lod, matriz, t + 2 * m, t + 2 * m, self.fundo,
+                                   self.raio_ponto, self.largura_poligono, self.preencher)
+        imagem = tk.PhotoImage(master=self.canvas, data=codificar_ppm(quadro[m:m + t, m:m + t]), format="PPM")
+        self._cache[chave] = imagem
+        self.rasterizados += 1
+        return imagem
+
+    # Descarta os blocos menos usados até caber na memória (os exibidos ficam)
+    def _limitar_memoria(self, manter=()):
+        excesso = len(self._cache) - max(self.memoria // self._bytes_por_bloco, len(manter))
+        for chave in list(self._cache):
+            if excesso <= 0:
+                break
+            if chave not in manter:
+                del self._cache[chave]
+                excesso -= 1
+
+    def _desenhar_rotacionada(self, cena, matriz, viewport):
+        self.canvas.delete(self.tag)
+        self._itens.clear()
+        x0, y0, x1, y1 = viewport
+        largura, altura = max(1, int(round(x1 - x0))), max(1, int(round(y1 - y0)))
+        quadro = rasterizar_janela(cena, self.consultar, self.lod, translacao(-x0, -y0) @ matriz, largura, altura,
+                                   self.fundo, self.raio_ponto, self.largura_poligono, self.preencher)
+        imagem = tk.PhotoImage(master=self.canvas, data=codificar_ppm(quadro), format="PPM")
+        self._imagem_unica = (imagem, self.canvas.create_image(x0, y0, anchor="nw", image=imagem,
+                                                               tags=(self.tag,)))
+
+    # Preparação antecipada: a próxima coluna/linha de blocos no sentido do
+    # movimento, um bloco por intervalo ocioso
+    def _agendar_antecipacao(self, nivel, viewport, matriz):
+        self._parar_antecipacao()
+        di, dj = self._direcao
+        if di == 0 and dj == 0:
+            return
+        i0, j0, i1, j1 = self._faixa_blocos(matriz, viewport)
+        pendentes = []
+        if di:
+            i = i1 + 1 if di > 0 else i0 - 1
+            pendentes += [(nivel, i, j) for j in range(j0, j1 + 1)]
+        if dj:
+            j = j1 + 1 if dj > 0 else j0 - 1
+            pendentes += [(nivel, i, j) for i in range(i0, i1 + 1)]
+        self._pendentes = [c for c in pendentes if c not in self._cache]
+        if self._pendentes:
+            self._antecipacao = self.canvas.after_idle(self._antecipar)
+
+    def _antecipar(self):
+        self._antecipacao = None
+        if not self._pendentes or self._cena is None:
+            return
+        chave = self._pendentes.pop(0)
+        if chave not in self._cache:
+            self._rasterizar_bloco(chave)
+            self._limitar_memoria(set(self._itens))
+        if self._pendentes:
+            self._antecipacao = self.canvas.after_idle(self._antecipar)
+
+    def _parar_antecipacao(self):
+        if self._antecipacao is not None:
+            self.canvas.after_cancel(self._antecipacao)
+            self._antecipacao = None
+        self._pendentes = []
@@ -0,0 +1,101 @@
+import tkinter as tk
+
+import numpy as np
+
+from rasterizador import (novo_quadro, rasterizar_recorte, rasterizar_regiao, retangulo_pixels, cor_rgb,
+                          codificar_ppm)
+from renderizador import EPSILON
+from transformacoes import aplicar_matriz, translacao
+
+
+# Renderizador alternativo, com a mesma interface do RenderizadorRetido: em vez
+# de um item do canvas por objeto, desenha tudo num quadro (array RGB) do
+# tamanho da viewport e o mostra como uma única imagem. O custo do quadro
+# depende da quantidade de pixels, não da de objetos.
+class RenderizadorQuadro:
+    recorte_proprio = False  # Desenha a partir do recorte da window feito pelo Visualizador
+    def __init__(self, canvas, raio_ponto=2, largura_poligono=2, preencher=False, fundo="white", tag="quadro"):
+        self.canvas = canvas
+        self.raio_ponto = raio_ponto
+        self.largura_poligono = largura_poligono
+        self.preencher = preencher  # Preenche os polígonos com a sua cor (varredura)
+        self.fundo = cor_rgb(fundo, (255, 255, 255))
+        self.tag = tag
+        self._imagem = None  # Referência da PhotoImage (o Tk não guarda a sua)
+        self._item = None
+        self._matriz = None  # Matriz mundo -> viewport da imagem exibida
+        self._quadro = None  # Pixels da imagem exibida (refeitos só em parte nas edições)
+        self._origem = (0.0, 0.0)  # Posição do canto superior esquerdo da imagem no canvas
+
+    @property
+    def n_itens(self):
+        return 0 if self._item is None else 1
+
+    def limpar(self):
+        self.canvas.delete(self.tag)
+        self._imagem = None
+        self._item = None
+        self._matriz = None
+        self._quadro = None
+
+    # Quadro provisório: se a visão só foi deslocada, move a última imagem em vez
+    # de rasterizar de novo. Devolve False quando isso não basta.
+    def transformar_rapido(self, matriz):
+        if self._item is None or self._matriz is None:
+            return False
+        delta = matriz @ np.linalg.inv(self._matriz)
+        if np.abs(delta[:2, :2] - np.eye(2)).max() > EPSILON:
+            return False
+        self.canvas.move(self._item, delta[0, 2], delta[1, 2])
+        self._matriz = matriz
+        return True
+
+    # Não há itens por objeto: o próximo quadro já sai sem ele
+    def remover(self, indice):
+        pass
+
+    def desenhar(self, cena, recorte, matriz_ncs_viewport, matriz):
+        self._matriz = matriz
+        # Canto superior esquerdo e tamanho da viewport no canvas
+        (x0, y0), (x1, y1) = aplicar_matriz(matriz_ncs_viewport, [(-1.0, 1.0), (1.0, -1.0)]).tolist()
+        largura = max(1, int(round(abs(x1 - x0))))
+        altura = max(1, int(round(abs(y1 - y0))))
+        esquerda, topo = min(x0, x1), min(y0, y1)
+
+        quadro = novo_quadro(largura, altura, self.fundo)
+        pixels = aplicar_matriz(matriz_ncs_viewport, recorte.coords) - (esquerda, topo)
+        rasterizar_recorte(quadro, cena, recorte, pixels, self.raio_ponto, self.largura_poligono, self.preencher)
+        self._quadro = quadro
+        self._origem = (esquerda, topo)
+        self._exibir(quadro, esquerda, topo, largura, altura)
+
+    # Edição de objetos: só o retângulo da imagem que cobre a região suja (no
+    # mundo) é rasterizado de novo, com o recorte completo já atualizado
+    def desenhar_parcial(self, cena, recorte, parcial, indices, regiao, matriz_ncs_viewport, matriz):
+        if self._quadro is None:
+            self.desenhar(cena, recorte, matriz_ncs_viewport, matriz)
+            return
+        if regiao is None:
+            return
+        esquerda, topo = self._origem
+        altura, largura = self._quadro.shape[:2]
+        retangulo = retangulo_pixels(regiao, translacao(-esquerda, -topo) @ matriz, largura, altura,
+                                     max(self.raio_ponto, self.largura_poligono) + 1)
+        if retangulo is None:
+            return
+        pixels = aplicar_matriz(matriz_ncs_viewport, recorte.coords) - (esquerda, topo)
+        rasterizar_regiao(self._quadro, retangulo, self.fundo, cena, recorte, pixels, self.raio_ponto,
+                          self.largura_poligono, self.preencher)
+        self._exibir(self._quadro, esquerda, topo, largura, altura)
+
+    def _exibir(self, quadro, esquerda, topo, largura, altura):
+        dados = codificar_ppm(quadro)
+        if self._imagem is None or (self._imagem.width(), self._imagem.height()) != (largura, altura):
+            self._imagem = tk.PhotoImage(master=self.canvas, data=dados, format="PPM")
+        else:
+            self._imagem.configure(data=dados, format="PPM")
+        if self._item is None:
+            self._item = self.canvas.create_image(esquerda, topo, anchor="nw", image=self._imagem, tags=(self.tag,))
+        else:
+            self.canvas.coords(self._item, esquerda, topo)
+            self.canvas.itemconfigure(self._item, image=self._imagem)
@@ -0,0 +1,70 @@
+import numpy as np
+
+from cena import TIPO_PONTO, TIPO_RETA, TIPO_POLIGONO, faixas
+from transformacoes import aplicar_matriz
+
+# Distância máxima (pixels) entre o cursor e um objeto para que ele seja escolhido
+TOLERANCIA_PADRAO = 4.0
+
+
+# Distância do ponto (x, y) a cada segmento (ax[i], ay[i])-(bx[i], by[i])
+def distancia_segmentos(x, y, ax, ay, bx, by):
+    dx, dy = bx - ax, by - ay
+    comprimento2 = dx * dx + dy * dy
+    t = ((x - ax) * dx + (y - ay) * dy) / np.where(comprimento2 > 0, comprimento2, 1.0)
+    t = np.clip(t, 0.0, 1.0)
+    return np.hypot(x - ax - t * dx, y - ay - t * dy)
+
+
+# Objeto sob a posição (x, y) da viewport, ou None. A posição é levada para o
+# mundo pela inversa da matriz mundo -> viewport e o índice espacial devolve só
+# os objetos perto dela; esses poucos candidatos são testados exatamente, em
+# pixels. Todo objeto é tratado como um anel de arestas (um ponto é uma aresta
+# degenerada e uma reta, a mesma aresta ida e volta), então uma única conta dá
+# a distância do cursor a cada objeto; nos polígonos, um cursor dentro (regra
+# par-ímpar) conta como distância zero.
+def escolher_objeto(cena, indice, matriz, x, y, tolerancia=TOLERANCIA_PADRAO):
+    cantos = aplicar_matriz(np.linalg.inv(matriz), [(x - tolerancia, y - tolerancia), (x + tolerancia, y - tolerancia),
+                                                    (x - tolerancia, y + tolerancia), (x + tolerancia, y + tolerancia)])
+    candidatos = indice.consultar(tuple(cantos.min(axis=0).tolist()) + tuple(cantos.max(axis=0).tolist()))
+    if len(candidatos) == 0:
+        return None
+
+    inicios = cena.offsets[candidatos]
+    tamanhos = cena.offsets[candidatos + 1] - inicios
+    tipos = cena.tipos[candidatos]
+    # Pontos usam só o primeiro vértice e retas só os dois primeiros (como no recorte)
+    tamanhos = np.where(tipos == TIPO_PONTO, np.minimum(tamanhos, 1),
+                        np.where(tipos == TIPO_RETA, np.where(tamanhos >= 2, 2, 0), tamanhos))
+    offsets = np.concatenate([[0], np.cumsum(tamanhos)]).astype(np.int64)
+    if offsets[-1] == 0:
+        return None
+    pixels = aplicar_matriz(matriz, cena.coords[faixas(inicios, tamanhos)])
+
+    # Aresta de cada vértice até o seguinte do mesmo anel (o último volta ao primeiro)
+    com_vertices = tamanhos > 0
+    primeiros = offsets[:-1][com_vertices]
+    proximo = np.arange(1, len(pixels) + 1)
+    proximo[offsets[1:][com_vertices] - 1] = primeiros
+    ax, ay = pixels[:, 0], pixels[:, 1]
+    bx, by = ax[proximo], ay[proximo]
+
+    distancia = np.full(len(candidatos), np.inf)
+    distancia[com_vertices] = np.minimum.reduceat(distancia_segmentos(x, y, ax, ay, bx, by), primeiros)
+
+    # Raio horizontal a partir do cursor: cruzamentos ímpares = dentro
+    cruza = (ay > y) != (by > y)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        cruza &= x < ax + (y - ay) * (bx - ax) / (by - ay)
+    dono = np.repeat(np.arange(len(candidatos)), tamanhos)
+    dentro = (np.bincount(dono[cruza], minlength=len(candidatos)) % 2 == 1) & (tipos == TIPO_POLIGONO)
+    distancia[dentro] = 0.0
+
+    acertos = np.flatnonzero(distancia <= tolerancia)
+    if len(acertos) == 0:
+        return None
+    # Com vários objetos sob o cursor: pontos antes de retas e retas antes de
+    # polígonos (a ordem dos códigos de tipo), depois o mais perto e, no
+    # empate, o criado por último
+    melhor = np.lexsort((-candidatos[acertos], distancia[acertos], tipos[acertos]))[0]
+    return int(candidatos[acertos[melhor]])
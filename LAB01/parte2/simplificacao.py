@@ -0,0 +1,306 @@
+import math
+import threading
+
+import numpy as np
+
+from cena import TIPO_POLIGONO, faixas
+
+# Polígonos com até essa quantidade de vértices são sempre desenhados inteiros
+MIN_VERTICES_SIMPLIFICAR = 64
+# Um polígono só é simplificado num nível se tiver mais que isso de vértices por
+# pixel do maior lado da sua caixa (medido com a tolerância do nível)
+VERTICES_POR_PIXEL = 2
+
+
+# Distância de cada ponto ao segmento a-b
+def distancia_segmento(pontos, a, b):
+    ab = b - a
+    comprimento2 = float(ab @ ab)
+    if comprimento2 == 0:
+        return np.hypot(*(pontos - a).T)
+    t = np.clip((pontos - a) @ ab / comprimento2, 0.0, 1.0)
+    projecao = a + t[:, None] * ab
+    return np.hypot(*(pontos - projecao).T)
+
+
+# Douglas–Peucker iterativo numa polilinha aberta; devolve a máscara dos vértices mantidos
+def douglas_peucker(pontos, tolerancia):
+    n = len(pontos)
+    manter = np.zeros(n, dtype=bool)
+    if n == 0:
+        return manter
+    manter[0] = manter[-1] = True
+
+    pilha = [(0, n - 1)]
+    while pilha:
+        i, j = pilha.pop()
+        if j <= i + 1:
+            continue
+        distancias = distancia_segmento(pontos[i + 1:j], pontos[i], pontos[j])
+        k = int(np.argmax(distancias))
+        if distancias[k] > tolerancia:
+            meio = i + 1 + k
+            manter[meio] = True
+            pilha.append((i, meio))
+            pilha.append((meio, j))
+    return manter
+
+
+# Douglas–Peucker num polígono fechado: o anel é cortado no primeiro vértice e
+# no vértice mais distante dele, e cada metade é simplificada como polilinha
+def simplificar_poligono(vertices, tolerancia):
+    n = len(vertices)
+    if n <= 3:
+        return vertices
+    oposto = int(np.argmax(np.hypot(*(vertices - vertices[0]).T)))
+    if oposto == 0:
+        return vertices[:1]
+
+    primeira = douglas_peucker(vertices[:oposto + 1], tolerancia)
+    segunda = douglas_peucker(np.concatenate([vertices[oposto:], vertices[:1]]), tolerancia)
+    manter = np.concatenate([primeira, segunda[1:-1]])
+    return vertices[manter]
+
+
+# Importância de cada vértice de uma polilinha aberta para o Douglas–Peucker:
+# com tolerância t, o algoritmo mantém exatamente os vértices de importância
+# maior que t. A importância de um vértice é a sua distância ao segmento que
+# ele divide, limitada pela do vértice que gerou esse segmento (ele só é
+# alcançado se o pai também foi mantido). As pontas têm importância infinita;
+# vértices abaixo de tolerancia_minima ficam com 0 (a descida para ali).
+def importancia_vertices(pontos, tolerancia_minima, importancia):
+    n = len(pontos)
+    importancia[0] = importancia[n - 1] = np.inf
+    pilha = [(0, n - 1, np.inf)]
+    while pilha:
+        i, j, limite = pilha.pop()
+        if j <= i + 1:
+            continue
+        distancias = distancia_segmento(pontos[i + 1:j], pontos[i], pontos[j])
+        k = int(np.argmax(distancias))
+        if distancias[k] > tolerancia_minima:
+            meio = i + 1 + k
+            valor = min(float(distancias[k]), limite)
+            importancia[meio] = valor
+            pilha.append((i, meio, valor))
+            pilha.append((meio, j, valor))
+
+
+# Importâncias dos vértices de um polígono fechado, cortado como no
+# simplificar_poligono: vertices[importancia > t] == simplificar_poligono(vertices, t)
+def importancia_poligono(vertices, tolerancia_minima):
+    n = len(vertices)
+    importancia = np.zeros(n, dtype=np.float64)
+    if n <= 3:
+        importancia[:] = np.inf
+        return importancia
+    oposto = int(np.argmax(np.hypot(*(vertices - vertices[0]).T)))
+    importancia[0] = np.inf
+    if oposto == 0:
+        return importancia
+
+    importancia_vertices(vertices[:oposto + 1], tolerancia_minima, importancia[:oposto + 1])
+    segunda = np.zeros(n - oposto + 1, dtype=np.float64)
+    importancia_vertices(np.concatenate([vertices[oposto:], vertices[:1]]), tolerancia_minima, segunda)
+    importancia[oposto + 1:] = segunda[1:-1]
+    return importancia
+
+
+# Níveis de detalhe dos polígonos grandes. O nível k usa tolerância
+# tolerancia_base * 2**k (em unidades do mundo); o nível escolhido é o mais
+# grosseiro cuja tolerância ainda fica abaixo de um pixel da viewport.
+#
+# Em vez de uma cópia simplificada por nível, cada vértice guarda uma vez a sua
+# importância no Douglas–Peucker (importancia_poligono), calculada em lote para
+# a cena inteira, em segundo plano (executor), quando a cena é carregada; a
+# versão de qualquer nível sai então de uma comparação vetorizada. Enquanto um
+# polígono não tem importâncias calculadas (ou foi editado depois do cálculo,
+# o que se vê pela revisão), ele é desenhado com a geometria original.
+# Só polígonos com mais de VERTICES_POR_PIXEL vértices por pixel do seu tamanho
+# na tela são simplificados; nos demais a simplificação não compensa o custo.
+#
+# Só os polígonos com mais de MIN_VERTICES_SIMPLIFICAR vértices têm entrada: as
+# importâncias (float32) ficam juntas num buffer, e uma tabela ordenada pelo
+# índice do polígono diz onde começam as de cada um. Não há descarte por uso:
+# como não há nada por nível, a memória é no máximo 4 bytes por vértice desses
+# polígonos (um quarto das suas coordenadas), mais o espaço das importâncias
+# substituídas por edições, que é recuperado quando passa do que está em uso.
+class CacheNiveisDetalhe:
+    def __init__(self, tolerancia_base=1e-3, max_nivel=24, executor=None):
+        self.tolerancia_base = tolerancia_base
+        self.max_nivel = max_nivel
+        self.executor = executor
+        self._trava = threading.Lock()
+        self._calculando = False  # Cálculo em segundo plano em andamento
+        self._repetir = None  # Cena pedida durante um cálculo (recalcula ao terminar)
+        self.limpar()
+
+    def limpar(self):
+        self._geracao = None
+        self._importancia = np.zeros(0, dtype=np.float32)  # Buffer das importâncias
+        self._usado = 0  # Posições ocupadas do buffer (válidas ou substituídas)
+        self._substituido = 0  # Posições com importâncias que não valem mais
+        # Tabela por polígono, ordenada pelo índice na cena
+        self._poligonos = np.zeros(0, dtype=np.int64)
+        self._inicios = np.zeros(0, dtype=np.int64)  # Início das importâncias no buffer
+        self._tamanhos = np.zeros(0, dtype=np.int64)
+        self._revisoes = np.zeros(0, dtype=np.uint32)  # Revisão do polígono no cálculo
+        self._extensao = np.zeros(0, dtype=np.float64)  # Maior lado da caixa do polígono
+
+    # Quantidade de polígonos com níveis calculados
+    def __len__(self):
+        return len(self._poligonos)
+
+    # Bytes ocupados pelas importâncias e pela tabela
+    @property
+    def memoria(self):
+        return self._importancia.nbytes + sum(a.nbytes for a in (self._poligonos, self._inicios, self._tamanhos,
+                                                                   self._revisoes, self._extensao))
+
+    # Nível para uma matriz mundo -> viewport (None: sem simplificação)
+    def nivel_para(self, matriz):
+        escala = math.sqrt(abs(np.linalg.det(matriz[:2, :2])))
+        if escala == 0:
+            return None
+        tamanho_pixel = 1.0 / escala
+        nivel = math.ceil(math.log2(tamanho_pixel / self.tolerancia_base)) - 1
+        if nivel < 0:
+            return None
+        return min(nivel, self.max_nivel)
+
+    # Calcula (na thread atual) as importâncias dos polígonos grandes que ainda
+    # não as têm ou que foram editados desde o último cálculo, e descarta as
+    # dos removidos
+    def preparar(self, cena):
+        geracao = cena.geracao
+        # A revisão é lida antes dos vértices: um objeto editado durante o
+        # cálculo fica com revisão diferente e continua sem níveis
+        revisoes = np.array(cena.revisoes)
+        offsets = np.array(cena.offsets)
+        coords = cena.coords
+        tamanhos = np.diff(offsets)
+        grandes = np.flatnonzero((cena.tipos[:len(revisoes)] == TIPO_POLIGONO) & (tamanhos > MIN_VERTICES_SIMPLIFICAR) &
+                                 ~cena.removidos[:len(revisoes)])
+        with self._trava:
+            if self._geracao != geracao:
+                self.limpar()
+                self._geracao = geracao
+            alvo = grandes[~self._validos(grandes, revisoes[grandes])]
+            self._descartar(np.isin(self._poligonos, grandes, invert=True))
+        if len(alvo) == 0:
+            return
+
+        importancias = []
+        extensoes = np.empty(len(alvo), dtype=np.float64)
+        for k, indice in enumerate(alvo.tolist()):
+            vertices = np.array(coords[offsets[indice]:offsets[indice + 1]])
+            importancias.append(importancia_poligono(vertices, self.tolerancia_base))
+            extensoes[k] = float(np.max(np.ptp(vertices, axis=0)))
+
+        with self._trava:
+            if self._geracao != geracao:
+                return  # A cena foi trocada durante o cálculo
+            # Os que já tinham entrada (editados) perdem a antiga; todos vão para o fim do buffer
+            self._descartar(np.isin(self._poligonos, alvo))
+            inicios = self._acrescentar(np.concatenate(importancias).astype(np.float32))
+            inicios += np.concatenate([[0], np.cumsum(tamanhos[alvo])[:-1]]).astype(np.int64)
+            posicoes = np.searchsorted(self._poligonos, alvo)
+            self._poligonos = np.insert(self._poligonos, posicoes, alvo)
+            self._inicios = np.insert(self._inicios, posicoes, inicios)
+            self._tamanhos = np.insert(self._tamanhos, posicoes, tamanhos[alvo])
+            self._revisoes = np.insert(self._revisoes, posicoes, revisoes[alvo])
+            self._extensao = np.insert(self._extensao, posicoes, extensoes)
+
+    # Pede o cálculo em segundo plano (sem executor, não faz nada: os polígonos
+    # são desenhados inteiros até alguém chamar preparar)
+    def agendar(self, cena):
+        if self.executor is None:
+            return
+        with self._trava:
+            if self._calculando:
+                self._repetir = cena
+                return
+            self._calculando = True
+        self.executor.submit(self._calcular, cena)
+
+    def _calcular(self, cena):
+        try:
+            self.preparar(cena)
+        except Exception as e:
+            print(f"Erro ao calcular os níveis de detalhe: {e}")
+        with self._trava:
+            self._calculando = False
+            repetir, self._repetir = self._repetir, None
+        if repetir is not None:
+            self.agendar(repetir)
+
+    # Tira da tabela as entradas marcadas (máscara sobre a tabela)
+    def _descartar(self, mascara):
+        if not mascara.any():
+            return
+        self._substituido += int(self._tamanhos[mascara].sum())
+        manter = ~mascara
+        self._poligonos, self._inicios, self._tamanhos = (self._poligonos[manter], self._inicios[manter],
+                                                          self._tamanhos[manter])
+        self._revisoes, self._extensao = self._revisoes[manter], self._extensao[manter]
+
+    # Põe as importâncias no fim do buffer (que dobra quando enche, ou é
+    # compactado quando as substituídas passam das válidas); devolve o início
+    def _acrescentar(self, importancias):
+        if self._substituido > self._usado - self._substituido:
+            validas = self._importancia[faixas(self._inicios, self._tamanhos)]
+            self._inicios = np.concatenate([[0], np.cumsum(self._tamanhos)[:-1]]).astype(np.int64)
+            self._importancia, self._usado, self._substituido = validas, len(validas), 0
+        if self._usado + len(importancias) > len(self._importancia):
+            buffer = np.empty(max(2 * len(self._importancia), self._usado + len(importancias)), dtype=np.float32)
+            buffer[:self._usado] = self._importancia[:self._usado]
+            self._importancia = buffer
+        inicio = self._usado
+        self._importancia[inicio:inicio + len(importancias)] = importancias
+        self._usado += len(importancias)
+        return inicio
+
+    # Posição na tabela de cada um dos polígonos indicados, ou -1 se eles não
+    # têm importâncias calculadas com a revisão atual
+    def _posicoes(self, indices, revisoes):
+        posicoes = np.searchsorted(self._poligonos, indices)
+        achados = posicoes < len(self._poligonos)
+        achados[achados] = self._poligonos[posicoes[achados]] == indices[achados]
+        achados[achados] = self._revisoes[posicoes[achados]] == revisoes[achados]
+        return np.where(achados, posicoes, -1)
+
+    def _validos(self, indices, revisoes):
+        return self._posicoes(indices, revisoes) >= 0
+
+    # Vértices (concatenados) e tamanhos dos polígonos indicados, no nível dado
+    def vertices_poligonos(self, cena, indices, nivel):
+        offsets = cena.offsets
+        inicios = offsets[indices]
+        tamanhos = offsets[indices + 1] - inicios
+        grandes = np.flatnonzero(tamanhos > MIN_VERTICES_SIMPLIFICAR) if nivel is not None else indices[:0]
+        if len(grandes) == 0:
+            return cena.coords[faixas(inicios, tamanhos)], tamanhos
+
+        tolerancia = self.tolerancia_base * 2 ** nivel
+        with self._trava:
+            if self._geracao == cena.geracao:
+                posicoes = self._posicoes(indices[grandes], cena.revisoes[indices[grandes]])
+            else:
+                posicoes = np.full(len(grandes), -1, dtype=np.int64)
+            pendentes = bool((posicoes < 0).any())
+            grandes, posicoes = grandes[posicoes >= 0], posicoes[posicoes >= 0]
+            # Só compensa com bem mais vértices que pixels no tamanho do polígono
+            compensa = tamanhos[grandes] > VERTICES_POR_PIXEL * self._extensao[posicoes] / tolerancia
+            grandes, posicoes = grandes[compensa], posicoes[compensa]
+            manter = self._importancia[faixas(self._inicios[posicoes], tamanhos[grandes])] > tolerancia
+        if pendentes:
+            self.agendar(cena)
+        if len(grandes) == 0:
+            return cena.coords[faixas(inicios, tamanhos)], tamanhos
+
+        inicio_saida = np.concatenate([[0], np.cumsum(tamanhos)[:-1]])
+        mascara = np.ones(int(tamanhos.sum()), dtype=bool)
+        mascara[faixas(inicio_saida[grandes], tamanhos[grandes])] = manter
+        novos_tamanhos = tamanhos.copy()
+        novos_tamanhos[grandes] = np.add.reduceat(manter, np.concatenate([[0], np.cumsum(tamanhos[grandes])[:-1]]))
+        return cena.coords[faixas(inicios, tamanhos)[mascara]], novos_tamanhos
@@ -0,0 +1,149 @@
+import types
+
+import numpy as np
+import pytest
+
+from alimentacao import (DecodificadorQuadros, consolidar, quadro_adicionar, quadro_cor, quadro_mover,
+                         quadro_recolorir, quadro_remover, OP_ADICIONAR, OP_MOVER, OP_RECOLORIR, OP_REMOVER,
+                         COR_PADRAO)
+from cena import Cena, TIPO_PONTO, TIPO_RETA, TIPO_POLIGONO
+from indice_espacial import GradeUniforme
+
+QUADRADO = [(0, 0), (1, 0), (1, 1), (0, 1)]
+
+
+def _fluxo():
+    return b"".join([
+        quadro_cor(1, "red"),
+        quadro_adicionar(7, TIPO_POLIGONO, QUADRADO, cor=1),
+        quadro_adicionar(8, TIPO_PONTO, [(5, 5)], cor=2),  # Código não definido: cor padrão
+        quadro_mover(7, 0.5, -0.25),
+        quadro_cor(2, "verde"),
+        quadro_recolorir(8, 2),
+        quadro_remover(7),
+    ])
+
+
+def _comparavel(mensagens):
+    return [tuple(m.tolist() if isinstance(m, np.ndarray) else m for m in mensagem) for mensagem in mensagens]
+
+
+# Um quadro pode chegar partido em qualquer ponto, inclusive no meio do tamanho
+@pytest.mark.parametrize("semente", range(5))
+def test_quadros_partidos_em_leituras_aleatorias(semente):
+    dados = _fluxo()
+    gerador = np.random.default_rng(semente)
+    decodificador = DecodificadorQuadros()
+    mensagens = []
+    posicao = 0
+    while posicao < len(dados):
+        passo = int(gerador.integers(1, 12))
+        mensagens += decodificador.alimentar(dados[posicao:posicao + passo])
+        posicao += passo
+    assert _comparavel(mensagens) == [
+        (OP_ADICIONAR, 7, TIPO_POLIGONO, [list(p) for p in QUADRADO], "red"),
+        (OP_ADICIONAR, 8, TIPO_PONTO, [[5.0, 5.0]], COR_PADRAO),
+        (OP_MOVER, 7, 0.5, -0.25),
+        (OP_RECOLORIR, 8, "verde"),
+        (OP_REMOVER, 7),
+    ]
+    assert decodificador.erro is None
+
+
+def test_quadro_invalido_guarda_as_mensagens_anteriores():
+    decodificador = DecodificadorQuadros()
+    invalido = (5).to_bytes(4, "little") + bytes([9, 0, 0, 0, 0])
+    mensagens = decodificador.alimentar(quadro_remover(1) + invalido + quadro_remover(2))
+    assert mensagens == [(OP_REMOVER, 1)]
+    assert isinstance(decodificador.erro, ValueError)
+    with pytest.raises(ValueError):
+        decodificador.alimentar(quadro_remover(3))
+
+
+@pytest.mark.parametrize("dados", [
+    (0).to_bytes(4, "little"),  # Tamanho zero
+    quadro_adicionar(1, 9, [(0, 0)]),  # Tipo desconhecido
+    quadro_adicionar(1, TIPO_RETA, [(0, 0), (1, 1)])[:-8],  # Vértice pela metade
+])
+def test_quadros_invalidos(dados):
+    decodificador = DecodificadorQuadros()
+    if len(dados) > 4:
+        dados = (len(dados) - 4).to_bytes(4, "little") + dados[4:]
+    assert decodificador.alimentar(dados) == []
+    assert decodificador.erro is not None
+
+
+# Estado final por id: [geometria, cor, dx, dy, remover]
+def test_consolidar_segue_a_ordem_das_mensagens():
+    estados = consolidar([
+        (OP_ADICIONAR, 1, TIPO_RETA, np.array([[0.0, 0.0], [1.0, 1.0]]), "red"),
+        (OP_MOVER, 1, 1.0, 2.0),  # Depois de ADICIONAR: entra na geometria
+        (OP_MOVER, 2, 1.0, 0.0),
+        (OP_MOVER, 2, 0.5, 1.0),  # Objeto já existente: deslocamentos somados
+        (OP_ADICIONAR, 3, TIPO_PONTO, np.array([[0.0, 0.0]]), "red"),
+        (OP_MOVER, 3, 1.0, 1.0),
+        (OP_REMOVER, 3),  # ADICIONAR -> MOVER -> REMOVER: só a remoção vale
+        (OP_REMOVER, 4),
+        (OP_MOVER, 4, 1.0, 1.0),  # Depois da remoção: ignorados
+        (OP_RECOLORIR, 4, "blue"),
+        (OP_REMOVER, 5),
+        (OP_ADICIONAR, 5, TIPO_PONTO, np.array([[2.0, 2.0]]), "blue"),  # Recriado depois de removido
+    ])
+    assert list(estados) == [1, 2, 3, 4, 5]
+    geometria, cor, dx, dy, remover = estados[1]
+    assert geometria[0] == TIPO_RETA and geometria[1].tolist() == [[1.0, 2.0], [2.0, 3.0]]
+    assert (cor, dx, dy, remover) == ("red", 0.0, 0.0, False)
+    assert estados[2] == [None, None, 1.5, 1.0, False]
+    assert estados[3] == [None, None, 0.0, 0.0, True]
+    assert estados[4] == [None, None, 0.0, 0.0, True]
+    assert estados[5][0][1].tolist() == [[2.0, 2.0]] and estados[5][4] is False
+
+
+# Só as partes do Visualizador que aplicar_mensagens usa (sem Tk)
+def _visualizador():
+    cena = Cena()
+    indice = GradeUniforme()
+    indice.construir(cena)
+    editados = []
+    visualizador = types.SimpleNamespace(objetos=cena, indice=indice, _ids_alimentacao={}, editados=editados)
+    visualizador._antes_de_editar = lambda: None
+    visualizador._editado = lambda indices, *caixas: editados.append(np.asarray(indices).tolist())
+    return visualizador
+
+
+def _aplicar(visualizador, *quadros):
+    main = pytest.importorskip("main")
+    decodificador = DecodificadorQuadros()
+    main.Visualizador.aplicar_mensagens(visualizador, decodificador.alimentar(b"".join(quadros)))
+
+
+def test_troca_de_geometria_com_o_mesmo_tamanho_mantem_o_objeto():
+    visualizador = _visualizador()
+    _aplicar(visualizador, quadro_adicionar(7, TIPO_POLIGONO, QUADRADO), quadro_adicionar(8, TIPO_PONTO, [(9, 9)]))
+    cena, ids = visualizador.objetos, visualizador._ids_alimentacao
+    indice, revisao = ids[7], int(cena.revisoes[ids[7]])
+
+    _aplicar(visualizador, quadro_cor(1, "red"),
+             quadro_adicionar(7, TIPO_POLIGONO, [(x + 10, y) for x, y in QUADRADO], cor=1))
+    assert ids[7] == indice and len(cena) == 2
+    assert cena.vertices(indice).tolist() == [[x + 10.0, y] for x, y in QUADRADO]
+    assert cena.paleta[cena.cores[indice]] == "red" and cena.revisoes[indice] > revisao
+    assert visualizador.indice.consultar((10, 0, 11, 1)).tolist() == [indice]
+    assert visualizador.indice.consultar((0, 0, 0.5, 0.5)).tolist() == []
+
+
+def test_troca_de_geometria_com_outro_tamanho_recria_o_objeto():
+    visualizador = _visualizador()
+    _aplicar(visualizador, quadro_adicionar(7, TIPO_POLIGONO, QUADRADO), quadro_adicionar(8, TIPO_PONTO, [(9, 9)]))
+    cena, ids = visualizador.objetos, visualizador._ids_alimentacao
+    antigo = ids[7]
+
+    _aplicar(visualizador, quadro_adicionar(7, TIPO_POLIGONO, QUADRADO + [(0.5, 2)]), quadro_mover(8, 1, 0))
+    assert cena.removidos[antigo] and ids[7] == 2 and len(cena.vertices(ids[7])) == 5
+    assert cena.vertices(ids[8]).tolist() == [[10.0, 9.0]]
+    assert visualizador.indice.consultar((0, 0, 1, 2)).tolist() == [ids[7]]
+    assert sorted(visualizador.editados[-1]) == [antigo, ids[8], ids[7]]
+
+    _aplicar(visualizador, quadro_remover(7), quadro_remover(99))
+    assert 7 not in ids and cena.removidos[2]
+    assert visualizador.indice.consultar((0, 0, 1, 2)).tolist() == []
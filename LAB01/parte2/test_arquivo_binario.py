@@ -0,0 +1,48 @@
+import os
+
+import numpy as np
+
+from arquivo_binario import carregar_binario, salvar_binario
+from cena import Cena, TIPO_PONTO, TIPO_RETA, TIPO_POLIGONO
+
+
+def _cena_exemplo():
+    cena = Cena()
+    cena.adicionar(TIPO_PONTO, [(1, 2)], "red")
+    cena.adicionar(TIPO_RETA, [(0, 0), (3, 4)], "blue")
+    cena.adicionar(TIPO_POLIGONO, [(0, 0), (1, 0), (1, 1), (0, 1)], "green")
+    return cena
+
+
+def test_salvar_e_carregar(tmp_path):
+    caminho = str(tmp_path / "a.cena")
+    cena = _cena_exemplo()
+    salvar_binario(caminho, cena, (0, 0, 800, 600), (0, 0, 10, 7.5))
+
+    lida = Cena()
+    viewport, window = carregar_binario(caminho, lida)
+    assert viewport == (0, 0, 800, 600) and window == (0, 0, 10, 7.5)
+    assert np.array_equal(lida.coords, cena.coords)
+    assert np.array_equal(lida.offsets, cena.offsets)
+    assert np.array_equal(lida.tipos, cena.tipos)
+    assert [lida.paleta[c] for c in lida.cores] == ["red", "blue", "green"]
+
+
+# A cena carregada aponta para o arquivo mapeado; salvá-la (editada) no mesmo
+# caminho não pode destruir os dados que estão sendo gravados
+def test_salvar_sobre_o_arquivo_carregado(tmp_path):
+    caminho = str(tmp_path / "a.cena")
+    salvar_binario(caminho, _cena_exemplo(), (0, 0, 800, 600), (0, 0, 10, 7.5))
+    cena = Cena()
+    carregar_binario(caminho, cena)
+    cena.mover(1, 1, 1)
+    cena.recolorir(0, "black")
+    esperado = np.array(cena.coords)
+
+    salvar_binario(caminho, cena, (0, 0, 800, 600), (0, 0, 10, 7.5))
+
+    lida = Cena()
+    carregar_binario(caminho, lida)
+    assert np.array_equal(lida.coords, esperado)
+    assert lida.paleta[lida.cores[0]] == "black"
+    assert os.listdir(tmp_path) == ["a.cena"]  # Sem temporários sobrando
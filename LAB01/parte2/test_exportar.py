@@ -0,0 +1,23 @@
+import os
+
+import pytest
+
+from exportar import destinos_lote
+
+
+def test_destinos_sem_colisao_usam_o_nome_do_arquivo():
+    destinos = destinos_lote(["cenas/a.xml", "cenas/b.cena"], "saida", "png")
+    assert destinos == {"cenas/a.xml": os.path.join("saida", "a.png"), "cenas/b.cena": os.path.join("saida", "b.png")}
+
+
+# Dois processos gravando o mesmo arquivo de saída: os nomes que colidem
+# ganham a extensão e a pasta de origem
+def test_destinos_que_colidem_sao_diferenciados():
+    destinos = destinos_lote(["x/a.xml", "x/a.cena", "x/cena.xml", "y/cena.xml", "x/a.xml"], "saida", "svg")
+    assert sorted(os.path.basename(d) for d in destinos.values()) == ["a_cena.svg", "a_xml.svg",
+                                                                        "x_cena_xml.svg", "y_cena_xml.svg"]
+
+
+def test_destino_repetido_que_sobra_e_erro():
+    with pytest.raises(ValueError, match="mesmo destino"):
+        destinos_lote(["x/a.xml", "x/a.cena", "x/a_xml.xml"], "saida", "png")
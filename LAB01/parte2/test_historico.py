@@ -0,0 +1,96 @@
+import numpy as np
+
+from historico import HistoricoVisao
+
+
+def _visao(dx, escala=1.0):
+    return np.array([[escala, 0.0, dx], [0.0, escala, 0.0], [0.0, 0.0, 1.0]])
+
+
+def _dx(matriz):
+    return float(matriz[0, 2])
+
+
+def test_desfazer_e_refazer_voltam_as_visoes():
+    historico = HistoricoVisao(intervalo_agrupar=0)
+    historico.reiniciar(_visao(0))
+    historico.registrar(_visao(1), "mover")
+    historico.registrar(_visao(2, 2.0), "zoom")
+    assert len(historico) == 3 and not historico.pode_refazer
+
+    assert np.array_equal(historico.desfazer(), _visao(1))
+    assert np.array_equal(historico.desfazer(), _visao(0))
+    assert historico.desfazer() is None and not historico.pode_desfazer
+    assert np.array_equal(historico.refazer(), _visao(1))
+    assert np.array_equal(historico.refazer(), _visao(2, 2.0))
+    assert historico.refazer() is None
+
+
+def test_registrar_descarta_o_que_podia_ser_refeito():
+    historico = HistoricoVisao(intervalo_agrupar=0)
+    historico.reiniciar(_visao(0))
+    historico.registrar(_visao(1))
+    historico.registrar(_visao(2))
+    historico.desfazer()
+    historico.desfazer()
+    historico.registrar(_visao(5))
+    assert len(historico) == 2 and not historico.pode_refazer
+    assert _dx(historico.desfazer()) == 0
+
+
+def test_visao_repetida_nao_vira_estado():
+    historico = HistoricoVisao()
+    historico.reiniciar(_visao(0))
+    historico.registrar(_visao(0), "mover")
+    historico.registrar(_visao(1))
+    historico.registrar(_visao(1))
+    assert len(historico) == 2
+
+
+# Segurar uma tecla de movimento: as operações iguais seguidas viram um estado
+def test_operacoes_iguais_seguidas_sao_agrupadas():
+    historico = HistoricoVisao(intervalo_agrupar=60)
+    historico.reiniciar(_visao(0))
+    for dx in range(1, 6):
+        historico.registrar(_visao(dx), "mover")
+    assert len(historico) == 2
+    historico.registrar(_visao(6), "zoom")
+    historico.registrar(_visao(7), "zoom")
+    assert len(historico) == 3
+    assert [_dx(historico.desfazer()) for _ in range(2)] == [5, 0]
+
+    historico = HistoricoVisao(intervalo_agrupar=0)
+    historico.reiniciar(_visao(0))
+    historico.registrar(_visao(1), "mover")
+    historico.registrar(_visao(2), "mover")
+    assert len(historico) == 3  # Fora do intervalo: estados separados
+
+
+def test_desfazer_interrompe_o_agrupamento():
+    historico = HistoricoVisao(intervalo_agrupar=60)
+    historico.reiniciar(_visao(0))
+    historico.registrar(_visao(1), "zoom")
+    historico.registrar(_visao(2), "mover")
+    historico.desfazer()
+    historico.registrar(_visao(3), "mover")  # Não pode substituir a visão 1
+    assert len(historico) == 3
+    assert _dx(historico.desfazer()) == 1
+
+
+def test_limite_descarta_as_visoes_mais_antigas():
+    historico = HistoricoVisao(limite=3, intervalo_agrupar=0)
+    historico.reiniciar(_visao(0))
+    for dx in range(1, 6):
+        historico.registrar(_visao(dx))
+    assert len(historico) == 3
+    assert [_dx(historico.desfazer()) for _ in range(2)] == [4, 3]
+    assert historico.desfazer() is None
+
+
+def test_marcadores_nao_entram_no_historico():
+    historico = HistoricoVisao()
+    historico.reiniciar(_visao(0))
+    historico.marcar("casa", _visao(3, 0.5))
+    assert len(historico) == 1
+    assert np.array_equal(historico.marcador("casa"), _visao(3, 0.5))
+    assert historico.marcador("outro") is None
@@ -0,0 +1,55 @@
+import numpy as np
+
+from arquivo_binario import salvar_binario
+from cena import Cena, TIPO_PONTO, TIPO_POLIGONO
+from indice_espacial import GradeUniforme
+from paginacao import MundoPaginado, particionar_mundo, memoria_setor
+
+BUFFERS = ("_coords", "_offsets", "_tipos", "_cores", "_visivel", "_revisoes", "_removidos")
+
+
+def _mundo(tmp_path):
+    gerador = np.random.default_rng(1)
+    cena = Cena()
+    for x, y in gerador.uniform(0, 40, (4000, 2)).tolist():
+        if gerador.random() < 0.5:
+            cena.adicionar(TIPO_PONTO, [(x, y)], "red")
+        else:
+            n = int(gerador.integers(3, 40))
+            angulos = np.linspace(0, 2 * np.pi, n, endpoint=False)
+            cena.adicionar(TIPO_POLIGONO, np.c_[x + 0.3 * np.cos(angulos), y + 0.3 * np.sin(angulos)], "blue")
+    origem = str(tmp_path / "cena.cena")
+    salvar_binario(origem, cena, (0, 0, 800, 600), (0, 0, 4, 3))
+    return cena, particionar_mundo(origem, str(tmp_path / "mundo"), objetos_por_setor=100)
+
+
+def _chaves(cena, indices):
+    return sorted((int(cena.tipos[i]), cena.vertices(i).tobytes()) for i in indices.tolist())
+
+
+# Setores descartados continuam nos buffers da cena até ela ser compactada: o
+# limite de memória tem de valer para os bytes de fato alocados, não só para os
+# setores carregados
+def test_paginar_respeita_o_limite_de_memoria(tmp_path):
+    cheia, caminho = _mundo(tmp_path)
+    indice_cheio = GradeUniforme()
+    indice_cheio.construir(cheia)
+    mundo = MundoPaginado(caminho, memoria=memoria_setor(800, 8000))
+    window = (0.0, 0.0, 4.0, 3.0)
+    cena, indice = mundo.montar(mundo.ler(window))
+
+    descartes = 0
+    for passo in range(60):
+        dx, dy = (1.5, 1.0) if (passo // 15) % 2 == 0 else (-1.5, -1.0)
+        window = (window[0] + dx, window[1] + dy, window[2] + dx, window[3] + dy)
+        if mundo.precisa_atualizar(window):
+            antes = set(mundo.carregados)
+            nova, novo_indice, _ = mundo.aplicar(cena, indice, mundo.ler(window))
+            if nova is not None:
+                cena, indice = nova, novo_indice
+            descartes += len(antes - set(mundo.carregados))
+        assert not mundo.usando_visao_geral
+        assert sum(getattr(cena, nome).nbytes for nome in BUFFERS) <= mundo.memoria
+        assert mundo.memoria_usada <= mundo.memoria
+        assert _chaves(cena, indice.consultar(window)) == _chaves(cheia, indice_cheio.consultar(window))
+    assert descartes > 0
@@ -0,0 +1,79 @@
+import numpy as np
+
+from cena import Cena, TIPO_PONTO, TIPO_RETA, TIPO_POLIGONO
+from recorte import aplicar_recorte, recortar_objetos
+from transformacoes import matriz_window_ncs
+
+# Window (0, 0)-(10, 10): no NCS, x' = x / 5 - 1 (e o mesmo para y)
+WINDOW = (0, 0, 10, 10)
+
+
+def _cena():
+    cena = Cena()
+    cena.adicionar(TIPO_PONTO, [(5, 5)], "black")  # 0: dentro
+    cena.adicionar(TIPO_PONTO, [(11, 5)], "black")  # 1: fora
+    cena.adicionar(TIPO_RETA, [(-5, 5), (5, 5)], "blue")  # 2: cruza a borda esquerda
+    cena.adicionar(TIPO_RETA, [(-5, -5), (-1, 20)], "blue")  # 3: fora
+    cena.adicionar(TIPO_POLIGONO, [(1, 1), (2, 1), (2, 2), (1, 2)], "red")  # 4: dentro
+    cena.adicionar(TIPO_POLIGONO, [(5, 5), (15, 5), (15, 15), (5, 15)], "red")  # 5: cruza o canto
+    cena.adicionar(TIPO_POLIGONO, [(20, 20), (30, 20), (25, 30)], "red")  # 6: fora
+    cena.adicionar(TIPO_POLIGONO, [(-2, 5), (5, -2), (12, 5), (5, 12)], "red")  # 7: losango que corta os cantos
+    return cena
+
+
+def _mundo(ncs):
+    return (np.asarray(ncs) + 1) * 5
+
+
+def _area(pontos):
+    x, y = np.asarray(pontos).T
+    return abs(np.dot(x, np.roll(y, -1)) - np.dot(y, np.roll(x, -1))) / 2
+
+
+def _por_objeto(resultado, indice):
+    posicao = resultado.indices.tolist().index(indice)
+    vertices = resultado.coords[resultado.offsets[posicao]:resultado.offsets[posicao + 1]]
+    return bool(resultado.visivel[posicao]), bool(resultado.completo[posicao]), _mundo(vertices)
+
+
+def test_visibilidade_e_objetos_inteiros():
+    resultado = recortar_objetos(_cena(), matriz_window_ncs(WINDOW))
+    estados = [_por_objeto(resultado, i)[:2] for i in range(8)]
+    assert estados == [(True, True), (False, False), (True, False), (False, False),
+                       (True, True), (True, False), (False, False), (True, False)]
+    _, _, quadrado = _por_objeto(resultado, 4)
+    assert np.allclose(quadrado, [(1, 1), (2, 1), (2, 2), (1, 2)])
+
+
+def test_reta_cortada_na_borda():
+    _, _, reta = _por_objeto(recortar_objetos(_cena(), matriz_window_ncs(WINDOW)), 2)
+    assert np.allclose(reta, [(0, 5), (5, 5)])
+
+
+# Os polígonos que cruzam a borda são recortados juntos (Sutherland–Hodgman em
+# lote); o resultado é a interseção com a window
+def test_poligonos_cortados_pela_window():
+    resultado = recortar_objetos(_cena(), matriz_window_ncs(WINDOW))
+    _, _, canto = _por_objeto(resultado, 5)
+    assert np.all((canto >= -1e-9) & (canto <= 10 + 1e-9))
+    assert np.isclose(_area(canto), 25)
+    _, _, losango = _por_objeto(resultado, 7)
+    assert np.isclose(_area(losango), 100 - 4 * 4.5)  # A window sem os quatro cantos (catetos 3)
+
+
+def test_objetos_removidos_e_indices_dados():
+    cena = _cena()
+    cena.remover([0, 5])
+    resultado = recortar_objetos(cena, matriz_window_ncs(WINDOW))
+    assert 0 not in resultado.indices and 5 not in resultado.indices
+    resultado = recortar_objetos(cena, matriz_window_ncs(WINDOW), indices=[2, 4])
+    assert resultado.indices.tolist() == [2, 4] and resultado.visivel.all()
+
+
+def test_aplicar_recorte_preenche_as_vistas():
+    cena = _cena()
+    aplicar_recorte(cena, recortar_objetos(cena, matriz_window_ncs(WINDOW), indices=[0, 1, 2]))
+    assert cena.visivel.tolist() == [True, False, True] + [False] * 5
+    assert cena[0].coordenadas_ncs == [(0.0, 0.0)]
+    assert cena[1].coordenadas_ncs is None
+    assert np.allclose(cena[2].coordenadas_ncs, [(-1, 0), (0, 0)])
@@ -0,0 +1,96 @@
+import numpy as np
+
+
+# Matriz homogênea 3x3 que leva coordenadas do mundo (window) para a viewport.
+# O eixo y é invertido porque no canvas o y cresce para baixo.
+def matriz_window_viewport(window, viewport):
+    wx_min, wy_min, wx_max, wy_max = window
+    vx_min, vy_min, vx_max, vy_max = viewport
+
+    sx = (vx_max - vx_min) / (wx_max - wx_min)
+    sy = (vy_max - vy_min) / (wy_max - wy_min)
+
+    return np.array([
+        [sx, 0.0, vx_min - wx_min * sx],
+        [0.0, -sy, vy_min + wy_max * sy],
+        [0.0, 0.0, 1.0],
+    ])
+
+
+# Aplica uma matriz homogênea a um array (N, 2) de pontos de uma só vez
+def aplicar_matriz(matriz, pontos):
+    pontos = np.asarray(pontos, dtype=np.float64).reshape(-1, 2)
+    return pontos @ matriz[:2, :2].T + matriz[:2, 2]
+
+
+# Normalização: leva a window para o quadrado [-1, 1] x [-1, 1] do NCS
+def matriz_window_ncs(window):
+    wx_min, wy_min, wx_max, wy_max = window
+
+    sx = 2.0 / (wx_max - wx_min)
+    sy = 2.0 / (wy_max - wy_min)
+
+    return np.array([
+        [sx, 0.0, -1.0 - wx_min * sx],
+        [0.0, sy, -1.0 - wy_min * sy],
+        [0.0, 0.0, 1.0],
+    ])
+
+
+# Leva o NCS para a viewport (com o y invertido do canvas)
+def matriz_ncs_viewport(viewport):
+    return matriz_window_viewport((-1.0, -1.0, 1.0, 1.0), viewport)
+
+
+# Matrizes homogêneas elementares
+def translacao(dx, dy):
+    return np.array([
+        [1.0, 0.0, dx],
+        [0.0, 1.0, dy],
+        [0.0, 0.0, 1.0],
+    ])
+
+
+def escala(sx, sy):
+    return np.array([
+        [sx, 0.0, 0.0],
+        [0.0, sy, 0.0],
+        [0.0, 0.0, 1.0],
+    ])
+
+
+def rotacao(angulo_rad):
+    c, s = np.cos(angulo_rad), np.sin(angulo_rad)
+    return np.array([
+        [c, -s, 0.0],
+        [s, c, 0.0],
+        [0.0, 0.0, 1.0],
+    ])
+
+
+# Cantos da window (no mundo) descrita por uma matriz mundo -> NCS, na ordem
+# (-1,-1), (1,-1), (1,1), (-1,1) do NCS
+def cantos_window(matriz_ncs):
+    cantos_ncs = [(-1.0, -1.0), (1.0, -1.0), (1.0, 1.0), (-1.0, 1.0)]
+    return aplicar_matriz(np.linalg.inv(matriz_ncs), cantos_ncs)
+
+
+# Visão intermediária entre duas matrizes mundo -> NCS, para t em [0, 1]. A
+# window é descrita pelo centro c e pelos semi-eixos u e v no mundo: c anda em
+# linha reta e u, v giram e mudam de tamanho juntos (como números complexos,
+# u(t) = u0 * (u1/u0)**t), então zoom e rotação ficam uniformes ao longo do caminho.
+def interpolar_visao(matriz_inicio, matriz_fim, t):
+    inicio = np.linalg.inv(matriz_inicio)
+    fim = np.linalg.inv(matriz_fim)
+    centro = inicio[:2, 2] + (fim[:2, 2] - inicio[:2, 2]) * t
+
+    u0 = complex(inicio[0, 0], inicio[1, 0])
+    u1 = complex(fim[0, 0], fim[1, 0])
+    fator = (u1 / u0) ** t if u0 != 0 else 1.0
+    u = u0 * fator
+    v = complex(inicio[0, 1], inicio[1, 1]) * fator
+    return np.linalg.inv(np.array([
+        [u.real, v.real, centro[0]],
+        [u.imag, v.imag, centro[1]],
+        [0.0, 0.0, 1.0],
+    ]))